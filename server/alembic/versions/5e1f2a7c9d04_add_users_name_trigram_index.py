@@ -0,0 +1,26 @@
+"""add users name trigram index
+
+Revision ID: 5e1f2a7c9d04
+Revises: af7f0d4890ee
+Create Date: 2026-10-17 10:12:44.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_utils import create_trigram_index, drop_trigram_index
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1f2a7c9d04'
+down_revision = 'af7f0d4890ee'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    create_trigram_index('users', 'name', concurrently=True)
+
+
+def downgrade() -> None:
+    drop_trigram_index('users', 'name', concurrently=True)
@@ -0,0 +1,56 @@
+"""consolidate auth_token indexes
+
+Revision ID: 8c3d61f0a2b7
+Revises: 5e1f2a7c9d04
+Create Date: 2026-10-17 17:05:12.904113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_utils import log_relation_sizes
+
+
+# revision identifiers, used by Alembic.
+revision = '8c3d61f0a2b7'
+down_revision = '5e1f2a7c9d04'
+branch_labels = None
+depends_on = None
+
+UNIQUE_CONSTRAINT = 'auth_token_access_token_user_id_token_type_is_active_key'
+
+
+def upgrade() -> None:
+    # access_token is unique on its own, the composite unique constraint
+    # and the (access_token, created_at) index only cost writes
+    log_relation_sizes('auth_token', 'before')
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_auth_token_user_id_expires_at',
+            'auth_token',
+            ['user_id', sa.text('expires_at DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'idx_auth_token_access_token_created_at',
+            table_name='auth_token',
+            postgresql_concurrently=True,
+        )
+    op.drop_constraint(UNIQUE_CONSTRAINT, 'auth_token', type_='unique')
+    log_relation_sizes('auth_token', 'after')
+
+
+def downgrade() -> None:
+    op.create_unique_constraint(
+        UNIQUE_CONSTRAINT,
+        'auth_token',
+        ['access_token', 'user_id', 'token_type', 'is_active'],
+    )
+    op.create_index(
+        'idx_auth_token_access_token_created_at',
+        'auth_token',
+        ['access_token', sa.text('created_at DESC')],
+        unique=False,
+    )
+    op.drop_index('idx_auth_token_user_id_expires_at', table_name='auth_token')
@@ -1,17 +1,44 @@
 from fastapi import APIRouter, Depends
 from pydantic.annotated_types import Any
-from sqlalchemy.orm import Session
 from sqlalchemy import text
-from app.core import deps
+from sqlalchemy.orm import Session
 
 from app.auth.api import router as auth_router
+from app.core import deps
+from app.core.hashing import password_hasher
+from app.db.session import async_db_registry, db_registry, statement_cache_stats
+from app.users.api import router as users_router
 
 api_router = APIRouter(prefix="/api/v1")
 
 api_router.include_router(auth_router, tags=["Authorization"])
+api_router.include_router(users_router, tags=["Users"])
 
 
 @api_router.get("/health")
 def get_api_status(db: Session = Depends(deps.get_db)) -> Any:
     db.execute(text("SELECT 1;"))
     return dict(status="Ok")
+
+
+# The detailed statuses expose internals, only to authenticated users
+@api_router.get("/health/db-pool")
+def get_db_pool_status(_: str = Depends(deps.get_current_active_user_id)) -> Any:
+    return {
+        "sync": db_registry.pool_stats(),
+        "async": async_db_registry.pool_stats(),
+    }
+
+
+@api_router.get("/health/statement-cache")
+def get_statement_cache_status(
+    _: str = Depends(deps.get_current_active_user_id),
+) -> Any:
+    return statement_cache_stats.as_dict()
+
+
+@api_router.get("/health/password-hashing")
+def get_password_hashing_status(
+    _: str = Depends(deps.get_current_active_user_id),
+) -> Any:
+    return password_hasher.stats()
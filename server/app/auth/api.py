@@ -1,11 +1,18 @@
 
 from fastapi import APIRouter, Depends
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
+from app.auth.cache import CachedToken
 from app.auth.dao import token_dao
 from app.auth.serializer import LoginSerializer, LoginResponseSerializer
 from app.core import deps
-from app.exceptions.custom import HttpErrorException, DaoException
+from app.db.fast_serializer import FastJSONResponse, fast_response
+from app.exceptions.custom import (
+    DaoException,
+    HttpErrorException,
+    ServiceOverloadedException,
+)
 
 router = APIRouter()
 
@@ -15,12 +22,30 @@ def login(
         db: Session = Depends(deps.get_db),
         *,
         obj_in: LoginSerializer,
-) -> LoginResponseSerializer:
+) -> FastJSONResponse:
     try:
-        return token_dao.login(db, obj_in=obj_in)
+        token = token_dao.login(db, obj_in=obj_in)
     except DaoException:
         raise HttpErrorException(
             status_code=403,
             error_code="INVALID CREDENTIALS",
             error_message="Invalid credentials"
         )
+    except ServiceOverloadedException:
+        raise HttpErrorException(
+            status_code=503,
+            error_code="SERVICE OVERLOADED",
+            error_message="Too many login attempts in progress, retry shortly"
+        )
+    # The user is already loaded, serialize without validating again
+    return fast_response(token, LoginResponseSerializer)
+
+
+@router.post("/logout")
+def logout(
+        db: Session = Depends(deps.get_db),
+        _: CachedToken = Depends(deps.get_current_token),
+        credentials: HTTPAuthorizationCredentials = Depends(deps.bearer_scheme),
+) -> dict:
+    token_dao.revoke_token(db, credentials.credentials)
+    return dict(status="Ok")
@@ -0,0 +1,97 @@
+import logging
+from datetime import datetime
+from typing import Any, NamedTuple, Optional, Sequence
+
+from redis.exceptions import RedisError
+
+from app.core.config import get_app_settings
+from app.db.entity_cache import create_redis_client
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class CachedToken(NamedTuple):
+    token_id: str
+    user_id: str
+    expires_at: datetime
+
+
+settings = get_app_settings()
+
+# Access token -> owner, per worker. Entries never outlive the token.
+token_cache: TTLCache[CachedToken] = TTLCache(
+    maxsize=settings.AUTH_TOKEN_CACHE_SIZE, ttl=settings.AUTH_TOKEN_CACHE_TTL
+)
+
+
+class TokenRevocations(object):
+    """
+    Ids of revoked tokens, shared by the workers through Redis. Each
+    worker only evicts its own `token_cache`, so a cache hit is checked
+    against these before it's trusted. An id only needs to be kept as long
+    as a cache entry lives, `ttl` seconds.
+
+    When Redis fails, cached tokens count as revoked and are resolved from
+    the database again.
+    """
+
+    def __init__(
+        self, client: Any = None, *, ttl: int, prefix: str = "auth:revoked"
+    ) -> None:
+        self._client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            self._client = create_redis_client()
+        return self._client
+
+    def key(self, token_id: str) -> str:
+        return f"{self.prefix}:{token_id}"
+
+    def revoke(self, token_ids: Sequence[str]) -> None:
+        if not token_ids:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for token_id in token_ids:
+            pipe.set(self.key(token_id), b"1", ex=self.ttl)
+        try:
+            pipe.execute()
+        except RedisError as e:
+            logger.warning("Token revocations not shared: %s", e)
+
+    def is_revoked(self, token_id: str) -> bool:
+        try:
+            return self.client.get(self.key(token_id)) is not None
+        except RedisError as e:
+            logger.warning("Token revocations unavailable: %s", e)
+            return True
+
+
+revocations = TokenRevocations(ttl=settings.AUTH_TOKEN_CACHE_TTL)
+
+
+def cache_token(access_token: str, token: CachedToken) -> None:
+    remaining = (token.expires_at - datetime.utcnow()).total_seconds()
+    token_cache.set(access_token, token, ttl=min(token_cache.ttl, remaining))
+
+
+def get_cached_token(access_token: str) -> Optional[CachedToken]:
+    token = token_cache.get(access_token)
+    if token is None:
+        return None
+    if token.expires_at < datetime.utcnow() or revocations.is_revoked(token.token_id):
+        token_cache.pop(access_token)
+        return None
+    return token
+
+
+def invalidate_token(access_token: str) -> None:
+    token_cache.pop(access_token)
+
+
+def invalidate_user_tokens(user_id: str) -> int:
+    return token_cache.pop_where(lambda _, token: token.user_id == user_id)
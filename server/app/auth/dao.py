@@ -1,22 +1,36 @@
 from datetime import datetime, timedelta
-
-from sqlalchemy.orm import Session, load_only, noload, selectinload
-
+from typing import Optional
+
+from sqlalchemy import and_, insert, select, update
+from sqlalchemy.orm import Session, load_only, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql import Select
+
+from app.auth.cache import (
+    CachedToken,
+    cache_token,
+    get_cached_token,
+    invalidate_token,
+    invalidate_user_tokens,
+    revocations,
+)
 from app.auth.models import AuthToken
-from app.core.security import create_access_token
+from app.core.security import create_access_token, verify_and_update_password
 from app.auth.serializer import (
     TokenCreateSerializer,
     TokenGrantType,
-    TokenInDBInDBBaseSerializer, LoginSerializer,
+    TokenInDBInDBBaseSerializer,
+    LoginSerializer,
 )
 
+from app.db.base_class import generate_uuid
 from app.db.dao import CRUDDao
+from app.db.session import commit_without_expiring
 from app.exceptions.custom import DaoException
+from app.users.models import User
 
 
-class TokenDao(
-    CRUDDao[AuthToken, TokenCreateSerializer, TokenInDBInDBBaseSerializer]
-):
+class TokenDao(CRUDDao[AuthToken, TokenCreateSerializer, TokenInDBInDBBaseSerializer]):
     def on_pre_create(
         self, db: Session, pk: str, values: dict, orig_values: dict
     ) -> None:
@@ -42,12 +56,57 @@ class TokenDao(
         )
         return token_dao.create(db, obj_in=obj_in)
 
+    def resolve_token(self, db: Session, token: str) -> Optional[CachedToken]:
+        """
+        Returns the owner of an active, unexpired access token. Only queries
+        on a cache miss, so authenticated requests usually cost no query.
+        """
+        cached = get_cached_token(token)
+        if cached is not None:
+            return cached
+
+        row = db.execute(
+            select(AuthToken.id, AuthToken.user_id, AuthToken.expires_at)
+            .where(AuthToken.access_token == token, AuthToken.is_active.is_(True))
+            .limit(1)
+        ).first()
+        if row is None or row.expires_at < datetime.utcnow():
+            return None
+
+        resolved = CachedToken(
+            token_id=row.id, user_id=row.user_id, expires_at=row.expires_at
+        )
+        cache_token(token, resolved)
+        return resolved
+
     def is_token_valid(self, db: Session, token: str) -> bool:
-        token_obj = self.get(
-            db, load_options=[load_only(AuthToken.expires_at)], access_token=token
+        return self.resolve_token(db, token) is not None
+
+    def revoke_token(self, db: Session, token: str) -> None:
+        token_ids = db.scalars(
+            select(AuthToken.id).where(AuthToken.access_token == token)
+        ).all()
+        self.update_where(
+            db, filters={"access_token": token}, values={"is_active": False}
         )
-        token_eat = token_obj.expires_at if token_obj else None
-        return token_eat is not None and token_eat >= datetime.utcnow()
+        invalidate_token(token)
+        # The other workers may still have the token cached
+        revocations.revoke(token_ids)
+
+    def revoke_user_tokens(self, db: Session, user_id: str) -> None:
+        token_ids = db.scalars(
+            select(AuthToken.id).where(
+                AuthToken.user_id == user_id, AuthToken.is_active.is_(True)
+            )
+        ).all()
+        if not token_ids:
+            return
+        # Only the tokens selected above, so every revoked one is shared
+        self.update_where(
+            db, filters={"id__in": token_ids}, values={"is_active": False}
+        )
+        invalidate_user_tokens(user_id)
+        revocations.revoke(token_ids)
 
     def is_refresh_token_valid(self, db: Session, token: str) -> bool:
         token_obj = self.get(
@@ -69,6 +128,7 @@ class TokenDao(
         if is_refresh:
             data = {"refresh_token": token_data["refresh_token"]}
         else:
+            invalidate_token(auth_token.access_token)
             data = {
                 "access_token": token_data["access_token"],
                 "expires_in": token_data["expires_in"],
@@ -78,21 +138,106 @@ class TokenDao(
             }
         return self.update(db, db_obj=auth_token, obj_in=data)
 
-    def login(self, db: Session, obj_in: LoginSerializer) -> AuthToken:
-        from app.users.dao import user_dao
+    def build_login_query(self, email: str, now: datetime) -> Select:
+        """
+        The user with `email` next to its latest active, unexpired token,
+        the token columns are all NULL when it has none.
+        """
+        query = (
+            select(User, AuthToken)
+            .outerjoin(
+                AuthToken,
+                and_(
+                    AuthToken.user_id == User.id,
+                    AuthToken.is_active.is_(True),
+                    AuthToken.expires_at > now,
+                ),
+            )
+            .where(User.email == email)
+            .order_by(AuthToken.expires_at.desc().nullslast())
+            .limit(1)
+        )
+        return self.label_query(query, "login")
+
+    def issue_token(
+        self, db: Session, *, user: User, token_type: TokenGrantType
+    ) -> AuthToken:
+        """
+        Inserts a new active token for `user` with INSERT ... RETURNING and
+        commits. The token's `user` is set to `user`, nothing is reselected.
+        """
+        values: dict = {}
+        token_id = generate_uuid()
+        self.on_pre_create(
+            db,
+            pk=token_id,
+            values=values,
+            orig_values={"user_id": user.id, "token_type": token_type},
+        )
+        stmt = insert(AuthToken.__table__).values(id=token_id, **values)
+        token = db.scalars(
+            select(AuthToken).from_statement(stmt.returning(*AuthToken.__table__.c))
+        ).one()
+        commit_without_expiring(db)
+        set_committed_value(token, "user", user)
+        return token
 
-        user = user_dao.authenticate(db, email=obj_in.email, password=obj_in.password)
-        if not user:
+    def login(self, db: Session, obj_in: LoginSerializer) -> AuthToken:
+        """
+        Returns an active token of the user, with its `user` loaded. The
+        user and a still valid token come from one joined query, a missing
+        token costs a single INSERT ... RETURNING. Upgrading an outdated
+        password hash is the only extra write, in the same transaction.
+        """
+        row = db.execute(
+            self.build_login_query(obj_in.email, datetime.utcnow())
+        ).first()
+        user = row.User if row else None
+        if user is None or not user.hashed_password:
             raise DaoException(
-                resource="AUTH",
-                message="Authentication failed, confirm credentials"
+                resource="AUTH", message="Authentication failed, confirm credentials"
             )
 
-        token = self.get(db, user_id=user.id)
-        if not token:
-            token = self.create(db, obj_in=TokenCreateSerializer(user_id=user.id, token_type=TokenGrantType.AUTHORIZATION_CODE))
+        is_valid, new_hash = verify_and_update_password(
+            obj_in.password, user.hashed_password
+        )
+        if not is_valid:
+            raise DaoException(
+                resource="AUTH", message="Authentication failed, confirm credentials"
+            )
+        if new_hash:
+            # Hashed with an outdated cost. A commit that expires would
+            # reselect the user and the token, the commit below doesn't
+            updated_at = db.scalar(
+                update(User)
+                .where(User.id == user.id)
+                .values(hashed_password=new_hash)
+                .returning(User.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+            set_committed_value(user, "hashed_password", new_hash)
+            set_committed_value(user, "updated_at", updated_at)
 
+        token = row.AuthToken
+        if token is None:
+            token = self.issue_token(
+                db, user=user, token_type=TokenGrantType.AUTHORIZATION_CODE
+            )
+        else:
+            if new_hash:
+                commit_without_expiring(db)
+            set_committed_value(token, "user", user)
+
+        # The client uses the token right away, spare that request a query
+        cache_token(
+            token.access_token,
+            CachedToken(
+                token_id=token.id, user_id=token.user_id, expires_at=token.expires_at
+            ),
+        )
         return token
 
 
-token_dao = TokenDao(AuthToken, load_options=[selectinload(AuthToken.user)])
+token_dao = TokenDao(
+    AuthToken, load_options=[selectinload(AuthToken.user)], use_returning=True
+)
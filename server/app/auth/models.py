@@ -1,7 +1,7 @@
 from app.db.base_class import Base
 from datetime import datetime
 from sqlalchemy.orm import relationship
-from sqlalchemy import Column, String, ForeignKey, DateTime, Integer, Boolean, Index, UniqueConstraint
+from sqlalchemy import Column, String, ForeignKey, DateTime, Integer, Boolean, Index
 
 
 class AuthToken(Base):
@@ -20,19 +20,16 @@ class AuthToken(Base):
         foreign_keys=[user_id],
     )
 
-    __table_args__ = (
-        UniqueConstraint("access_token", "user_id", "token_type", "is_active"),
-    )
-
     @property
     def is_invalid(self) -> bool:
         return (not self.is_active) or (datetime.utcnow() > self.expires_at)
 
 
-# We fetch an auth_token in descending by default filtered by
-# the access token value
+# Tokens are looked up by the unique access token. This one serves the
+# login lookup of a user's latest token, revoking a user's tokens and
+# the users foreign key.
 Index(
-    "idx_auth_token_access_token_created_at",
-    AuthToken.access_token,
-    AuthToken.created_at.desc(),
+    "idx_auth_token_user_id_expires_at",
+    AuthToken.user_id,
+    AuthToken.expires_at.desc(),
 )
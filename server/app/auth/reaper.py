@@ -0,0 +1,172 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import Delete
+
+from app.auth.cache import invalidate_token
+from app.auth.models import AuthToken
+from app.core.config import get_app_settings
+from app.core.settings import Settings
+from app.db.session import db_registry
+
+logger = logging.getLogger(__name__)
+
+# Held while reaping, so the workers of a deployment take turns
+REAPER_LOCK_ID = 7_462_018_311
+
+
+class ReapStats(NamedTuple):
+    deleted: int
+    batches: int
+    seconds: float
+
+
+def reap_grace(settings: Settings) -> timedelta:
+    """
+    How long an expired token is kept. Defaults to how long its refresh
+    token outlives it, so expired tokens can still be refreshed.
+    """
+    if settings.AUTH_TOKEN_REAPER_GRACE is not None:
+        return timedelta(seconds=settings.AUTH_TOKEN_REAPER_GRACE)
+    return timedelta(
+        seconds=max(
+            settings.REFRESH_TOKEN_EXPIRY_IN_SECONDS
+            - settings.ACCESS_TOKEN_EXPIRY_IN_SECONDS,
+            0,
+        )
+    )
+
+
+def build_reap_statement(
+    cutoff: datetime, after_id: Optional[str], batch_size: int
+) -> Delete:
+    """
+    Deletes the next `batch_size` revoked tokens, or tokens expired before
+    `cutoff`, in primary key order after `after_id`. Returns the id and
+    access token of each deleted row.
+    """
+    table = AuthToken.__table__
+    ids = (
+        select(table.c.id)
+        .where(or_(table.c.is_active.is_(False), table.c.expires_at < cutoff))
+        .order_by(table.c.id)
+        .limit(batch_size)
+    )
+    if after_id is not None:
+        ids = ids.where(table.c.id > after_id)
+    return (
+        delete(table)
+        .where(table.c.id.in_(ids.scalar_subquery()))
+        .returning(table.c.id, table.c.access_token)
+    )
+
+
+def reap_tokens(
+    engine: Engine,
+    *,
+    batch_size: int,
+    pause: float = 0.0,
+    grace: Optional[timedelta] = None,
+    now: Optional[datetime] = None,
+) -> ReapStats:
+    """
+    Deletes revoked and expired auth tokens, one short transaction per
+    batch with `pause` seconds in between so the deletes never hold locks
+    or the WAL for long. Returns at once when another worker is reaping.
+    """
+    grace = reap_grace(get_app_settings()) if grace is None else grace
+    cutoff = (now or datetime.utcnow()) - grace
+    start = time.perf_counter()
+    deleted = batches = 0
+
+    with engine.connect() as conn:
+        locked = conn.scalar(select(func.pg_try_advisory_lock(REAPER_LOCK_ID)))
+        conn.commit()
+        if not locked:
+            return ReapStats(0, 0, 0.0)
+
+        try:
+            after_id = None
+            while True:
+                rows = conn.execute(
+                    build_reap_statement(cutoff, after_id, batch_size)
+                ).all()
+                conn.commit()
+                if not rows:
+                    break
+
+                batches += 1
+                deleted += len(rows)
+                after_id = max(row.id for row in rows)
+                for row in rows:
+                    invalidate_token(row.access_token)
+                if len(rows) < batch_size:
+                    break
+                time.sleep(pause)
+        finally:
+            # A failed batch leaves its transaction aborted, unlocking in it
+            # would fail too and keep the lock held by the pooled connection
+            conn.rollback()
+            conn.execute(select(func.pg_advisory_unlock(REAPER_LOCK_ID)))
+            conn.commit()
+
+    stats = ReapStats(deleted, batches, time.perf_counter() - start)
+    logger.info(
+        "Reaped %d auth tokens in %d batches, %.1fs",
+        stats.deleted,
+        stats.batches,
+        stats.seconds,
+    )
+    return stats
+
+
+class TokenReaper:
+    """
+    Runs `reap_tokens` every `interval` seconds on a daemon thread of the
+    worker. An interval of 0 disables it.
+    """
+
+    def __init__(self, interval: float, batch_size: int, pause: float = 0.0) -> None:
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="auth-token-reaper", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                reap_tokens(
+                    db_registry.engine, batch_size=self.batch_size, pause=self.pause
+                )
+            except Exception:
+                logger.exception("Reaping auth tokens failed")
+
+
+settings = get_app_settings()
+
+token_reaper = TokenReaper(
+    interval=settings.AUTH_TOKEN_REAPER_INTERVAL,
+    batch_size=settings.AUTH_TOKEN_REAPER_BATCH_SIZE,
+    pause=settings.AUTH_TOKEN_REAPER_PAUSE,
+)
@@ -1,14 +1,47 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator, Optional
 
-from app.db.session import get_session, get_engine
-from sqlalchemy.engine import Engine
 from fastapi import Depends
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.orm import Session
 
+from app.auth.cache import CachedToken
+from app.auth.dao import token_dao
+from app.db.session import async_db_registry, db_registry
+from app.exceptions.custom import HttpErrorException
 
-def get_db(engine: Engine = Depends(get_engine)) -> Generator:
-    with get_session(engine=engine) as db:
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def get_db() -> Generator:
+    with db_registry.session() as db:
+        yield db
+
+
+async def get_async_db() -> AsyncGenerator:
+    async with async_db_registry.session() as db:
         yield db
 
 
-def get_current_active_user_id() -> str:
-    return "ROOT"
+def get_current_token(
+    db: Session = Depends(get_db),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> CachedToken:
+    if credentials is None:
+        raise HttpErrorException(
+            status_code=401,
+            error_code="NOT AUTHENTICATED",
+            error_message="A bearer token is required",
+        )
+
+    token = token_dao.resolve_token(db, credentials.credentials)
+    if token is None:
+        raise HttpErrorException(
+            status_code=401,
+            error_code="INVALID TOKEN",
+            error_message="The token is invalid or has expired",
+        )
+    return token
+
+
+def get_current_active_user_id(token: CachedToken = Depends(get_current_token)) -> str:
+    return token.user_id
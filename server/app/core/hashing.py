@@ -0,0 +1,185 @@
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from passlib.context import CryptContext
+from passlib.hash import bcrypt
+
+from app.core.config import get_app_settings
+from app.exceptions.custom import ServiceOverloadedException
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def build_password_context(rounds: Optional[int] = None) -> CryptContext:
+    """
+    bcrypt context hashing with `rounds`. Hashes of a lower cost are
+    reported by `needs_update`, so they get rehashed on the next login.
+    """
+    options = {}
+    if rounds:
+        options = {"bcrypt__default_rounds": rounds, "bcrypt__min_rounds": rounds}
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", **options)
+
+
+# Built on import, so every pool worker hashes with the same cost
+pwd_context = build_password_context(get_app_settings().PASSWORD_HASH_ROUNDS)
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Returns whether `password` matches, and a new hash when the old one is outdated"""
+    if not pwd_context.verify(password, hashed_password):
+        return False, None
+    if pwd_context.needs_update(hashed_password):
+        return True, pwd_context.hash(password)
+    return True, None
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a process pool of its own. Hashing then neither holds
+    the GIL nor ties up more than `max_pending` threads of the server
+    threadpool, calls past that fail fast with ServiceOverloadedException
+    instead of queueing behind a login burst.
+    With `workers=0` hashing runs inline, which suits scripts.
+    """
+
+    def __init__(self, workers: int, max_pending: int, timeout: float) -> None:
+        self.workers = workers
+        self.max_pending = max(max_pending, 1)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned, forking a threaded server process isn't safe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        if not self.workers:
+            return fn(*args)
+
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                logger.warning("Password hashing overloaded, rejecting a call")
+                raise ServiceOverloadedException(
+                    message=f"{self.pending} password hashes already pending"
+                )
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+            pool = self._get_pool()
+
+        start = time.perf_counter()
+        try:
+            future = pool.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        # Released when the work is done, not when the caller gives up on
+        # it, so `pending` also counts timed out hashes still running
+        future.add_done_callback(self._release)
+
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise ServiceOverloadedException(
+                message=f"Password hashing took longer than {self.timeout}s"
+            )
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.completed += 1
+            self.total_time += elapsed
+            self.max_time = max(self.max_time, elapsed)
+        return result
+
+    def _release(self, future: Optional[Future] = None) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password)
+
+    def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return self._run(_verify, password, hashed_password)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "peak_pending": self.peak_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "avg_seconds": round(self.total_time / self.completed, 6)
+                if self.completed
+                else 0.0,
+                "max_seconds": round(self.max_time, 6),
+            }
+
+
+def calibrate_rounds(
+    target_ms: float, min_rounds: int = 10, max_rounds: int = 16, samples: int = 3
+) -> Tuple[int, List[Tuple[int, float]]]:
+    """
+    Times bcrypt for every cost from `min_rounds` on, stopping once past
+    `target_ms`. Returns the highest cost within the target (at least
+    `min_rounds`) and the (rounds, milliseconds) measured.
+    """
+    timings: List[Tuple[int, float]] = []
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        handler = bcrypt.using(rounds=rounds)
+        start = time.perf_counter()
+        for _ in range(samples):
+            handler.hash("calibration password")
+        elapsed_ms = (time.perf_counter() - start) * 1000 / samples
+        timings.append((rounds, elapsed_ms))
+        if elapsed_ms > target_ms:
+            break
+        chosen = rounds
+    return chosen, timings
+
+
+settings = get_app_settings()
+
+# Per worker process, started on the first hash
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    timeout=settings.PASSWORD_HASH_TIMEOUT,
+)
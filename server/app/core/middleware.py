@@ -0,0 +1,43 @@
+import time
+from typing import Awaitable, Callable
+
+from fastapi import Request, Response
+
+from app.core.config import get_app_settings
+from app.db.session import ReadRouting, read_routing
+
+# Unix time until which the client reads from the primary
+PRIMARY_PIN_COOKIE = "db_primary_until"
+
+
+def _pinned_until(request: Request) -> float:
+    try:
+        return float(request.cookies.get(PRIMARY_PIN_COOKIE, 0))
+    except ValueError:
+        return 0.0
+
+
+async def pin_writers_to_primary(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """
+    Sets the replica routing of the request. A request that writes pins
+    its client to the primary for DB_REPLICA_STICKY_SECONDS, so the
+    client reads its own writes while the replicas catch up.
+    """
+    routing = ReadRouting(pinned=_pinned_until(request) > time.time())
+    token = read_routing.set(routing)
+    try:
+        response = await call_next(request)
+    finally:
+        read_routing.reset(token)
+
+    window = get_app_settings().DB_REPLICA_STICKY_SECONDS
+    if routing.wrote and window > 0:
+        response.set_cookie(
+            PRIMARY_PIN_COOKIE,
+            str(int(time.time()) + window),
+            max_age=window,
+            httponly=True,
+        )
+    return response
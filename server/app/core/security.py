@@ -1,19 +1,16 @@
 import datetime
 from hashlib import md5
-from typing import Any, Dict, Union
+from typing import Any, Dict, Optional, Tuple, Union
 
 from jose import jwt
-from passlib.context import CryptContext
 from pydantic.main import BaseModel
 from sqlalchemy.orm import selectinload
 from sqlalchemy.orm.session import Session
 
 from app.core.config import get_app_settings
+from app.core.hashing import password_hasher
 from app.users.models import User
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
 ALGORITHM = "HS256"
 
 
@@ -58,11 +55,18 @@ def create_access_token(
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.verify(plain_password, hashed_password)[0]
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Verifies the password, also returns a new hash when the stored one is outdated"""
+    return password_hasher.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
 
 
 def get_request_hash(request_str: str) -> str:
@@ -40,10 +40,91 @@ class Settings(BaseSettings):
             path=f"/{values.get('POSTGRES_DB') or ''}",
         )
 
+    ASYNC_SQLALCHEMY_DATABASE_URI: Optional[PostgresDsn] = None
+
+    @validator("ASYNC_SQLALCHEMY_DATABASE_URI", pre=True)
+    def assemble_async_db_connection(
+        cls, v: Optional[str], values: Dict[str, Any]
+    ) -> Any:
+        if isinstance(v, str):
+            return v
+        return PostgresDsn.build(
+            scheme="postgresql+asyncpg",
+            user=values.get("POSTGRES_USER"),
+            password=values.get("POSTGRES_PASSWORD"),
+            host=values.get("POSTGRES_SERVER"),
+            path=f"/{values.get('POSTGRES_DB') or ''}",
+        )
+
+    # Read replicas, list and search reads of the daos are spread over
+    # them, `round_robin` or `least_connections`. A client that wrote
+    # reads from the primary for DB_REPLICA_STICKY_SECONDS after, tracked
+    # with a cookie. Both take comma separated URIs or a JSON list.
+    SQLALCHEMY_REPLICA_URIS: Union[str, List[PostgresDsn]] = []
+    ASYNC_SQLALCHEMY_REPLICA_URIS: Union[str, List[PostgresDsn]] = []
+    DB_REPLICA_BALANCING: str = "round_robin"
+    DB_REPLICA_STICKY_SECONDS: int = 5
+
+    @validator("SQLALCHEMY_REPLICA_URIS", pre=True)
+    def split_replica_uris(cls, v: Union[str, List[str]]) -> List[str]:
+        if isinstance(v, str) and not v.startswith("["):
+            return [i.strip() for i in v.split(",") if i.strip()]
+        return v
+
+    @validator("ASYNC_SQLALCHEMY_REPLICA_URIS", pre=True)
+    def assemble_async_replica_uris(
+        cls, v: Union[str, List[str]], values: Dict[str, Any]
+    ) -> List[str]:
+        if isinstance(v, str) and not v.startswith("["):
+            return [i.strip() for i in v.split(",") if i.strip()]
+        if v:
+            return v
+        return [
+            str(uri).replace("postgresql://", "postgresql+asyncpg://", 1)
+            for uri in values.get("SQLALCHEMY_REPLICA_URIS") or []
+        ]
+
+    # Connection pool settings, these apply to each worker process.
+    # When DB_MAX_CONNECTIONS is set the per-worker pool is capped so that
+    # all WEB_CONCURRENCY workers together stay within that budget.
+    WEB_CONCURRENCY: int = 1
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 60 * 30
+    DB_MAX_CONNECTIONS: Optional[int] = None
+    DB_STATEMENT_TIMEOUT_MS: int = 10000
+    DB_IDLE_IN_TRANSACTION_TIMEOUT_MS: int = 60000
+    # Compiled statements kept per engine, every filter shape is one entry
+    DB_QUERY_CACHE_SIZE: int = 1200
+
+    # Used by the `capped` and `cached` pagination count strategies
+    PAGINATION_COUNT_CAP: int = 1000
+    PAGINATION_COUNT_CACHE_TTL: int = 60
+
     ACCESS_TOKEN_EXPIRY_IN_SECONDS: int = 60 * 60 * 24 * 7
     REFRESH_TOKEN_EXPIRY_IN_SECONDS: int = 60 * 60 * 24 * 7
+    # Per worker cache of access tokens, an entry never outlives its token.
+    # Revoked token ids are shared through Redis and checked on every hit.
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+    AUTH_TOKEN_CACHE_TTL: int = 60 * 5
+    # Revoked tokens, and expired ones past the grace, are deleted in
+    # batches every REAPER_INTERVAL seconds, 0 disables the reaper. The
+    # grace defaults to how long refresh tokens outlive access tokens.
+    AUTH_TOKEN_REAPER_INTERVAL: int = 60 * 60
+    AUTH_TOKEN_REAPER_BATCH_SIZE: int = 500
+    AUTH_TOKEN_REAPER_PAUSE: float = 0.1
+    AUTH_TOKEN_REAPER_GRACE: Optional[int] = None
     SECRET_KEY: str = "secret-key"
 
+    # Password hashing runs on a process pool of its own per worker, with
+    # 0 workers it runs inline. Hashes past MAX_PENDING are rejected.
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 16
+    PASSWORD_HASH_TIMEOUT: float = 5.0
+    # bcrypt cost, pick one with scripts/calibrate_password_hash.py
+    PASSWORD_HASH_ROUNDS: int = 12
+
     SMTP_TLS: bool = True
     SMTP_PORT: Optional[int] = 1234
     SMTP_HOST: Optional[str] = "test"
@@ -58,6 +139,32 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0
     REDIS_PASSWORD: Optional[str] = None
     REDIS_SOCKET_TIMEOUT: Optional[float] = None
+    REDIS_URI: Optional[RedisDsn] = None
+
+    @validator("REDIS_URI", pre=True)
+    def assemble_redis_uri(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
+        if isinstance(v, str):
+            return v
+
+        return AnyUrl.build(
+            scheme="redis",
+            password=values.get("REDIS_PASSWORD"),
+            host=values.get("REDIS_HOST"),
+            port=f"{values.get('REDIS_PORT') or 6379}",
+            path=f"/{values.get('REDIS_DB') or ''}",
+        )
+
+    # Seconds a row stays in the entity cache of daos that enable it
+    ENTITY_CACHE_TTL: int = 300
+    # Invalidated rows can't be cached again for this long, so a read that
+    # raced the invalidating write can't put the old row back
+    ENTITY_CACHE_TOMBSTONE_TTL: int = 10
+
+    # Per worker cache of typeahead results, keyed by the typed prefix
+    TYPEAHEAD_CACHE_SIZE: int = 5000
+    TYPEAHEAD_CACHE_TTL: int = 30
+    TYPEAHEAD_MIN_LENGTH: int = 1
+    TYPEAHEAD_MAX_LIMIT: int = 50
 
     # Celery settings
     CELERY_BROKER: Optional[RedisDsn] = None
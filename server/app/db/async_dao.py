@@ -0,0 +1,755 @@
+from functools import partial
+from typing import (
+    Any,
+    AsyncGenerator,
+    Dict,
+    Generic,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Type,
+    Union,
+)
+
+from fastapi.responses import StreamingResponse
+from fastapi_pagination.bases import AbstractPage
+from pydantic import BaseModel
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.db.base_class import generate_uuid
+from app.db.dao import (
+    BaseReadDao,
+    ChangedObjState,
+    CreateSerializer,
+    LoadOption,
+    ModelType,
+    TransitionDao,
+    UpdateSerializer,
+    build_conflict_rows_query,
+    build_update_where_statement,
+    build_upsert_statements,
+    changes_from_rows,
+    conflict_key,
+    order_upserted,
+    prepare_create_rows,
+    prepare_update_data,
+    prepare_update_where_values,
+    reject_state_transitions,
+    upsert_changes,
+    upserted_columns,
+)
+from app.db.entity_cache import AsyncEntityCache
+from app.db.export import (
+    ExportWriter,
+    async_stream_query,
+    export_response,
+    get_export_include,
+)
+from app.db.filters import BaseSort, FilterType
+from app.db.model_registry import get_model_info
+from app.db.pagination import (
+    CountStrategy,
+    CursorPaginationQueryParams,
+    OrderColumns,
+    Page,
+    Pagination,
+    PaginationQueryParams,
+    async_paginate,
+    async_paginate_keyset,
+)
+from app.db.serializer import ExportFormat, ExportParam, SearchParam
+from app.db.session import async_commit_without_expiring, read_from_replica
+from app.db.typeahead import (
+    TypeaheadResults,
+    evict_typeahead,
+    normalize_prefix,
+    typeahead_cache,
+)
+from app.db.utils import (
+    ChunkProgress,
+    build_insert_many,
+    chunked,
+    filter_create_values,
+    filter_update_values,
+    parse_query_filters,
+    track_changed_values,
+    with_row_size,
+)
+from app.exceptions.custom import InvalidStateException
+
+
+async def async_reload_returned(
+    dao: Any,
+    db: AsyncSession,
+    db_objs: Sequence[ModelType],
+    label: str,
+    chunk_size: int = 1000,
+) -> None:
+    """Async `reload_returned`"""
+    if not dao.has_load_options:
+        relationships = list(get_model_info(dao.model).relationships)
+        if relationships:
+            for db_obj in db_objs:
+                db.expire(db_obj, relationships)
+        return
+
+    for chunk in chunked([db_obj.id for db_obj in db_objs], chunk_size):
+        (await db.scalars(dao.build_reload_query(list(chunk), label))).unique().all()
+
+
+class AsyncRelationshipsDao(Generic[ModelType]):
+    def __init__(self, model: ModelType, **kwargs: Any):
+        super(AsyncRelationshipsDao, self).__init__(model, **kwargs)  # type: ignore [call-arg]
+
+    async def on_relationship(
+        self,
+        db: AsyncSession,
+        *,
+        pk: str,
+        values: dict,
+        db_obj: Optional[ModelType] = None,
+        create: bool = True,
+    ) -> None:
+        pass
+
+    async def on_relationship_many(
+        self, db: AsyncSession, *, pks: List[str], values: List[dict]
+    ) -> None:
+        for pk, row_values in zip(pks, values):
+            await self.on_relationship(db, pk=pk, values=row_values)
+
+    async def on_unknown_field(
+        self, db: AsyncSession, *, db_obj: ModelType, key: str, value: Any
+    ) -> None:
+        pass
+
+
+class AsyncCreateDao(Generic[ModelType, CreateSerializer]):
+    def __init__(
+        self,
+        model: Type[ModelType],
+        *,
+        use_returning: bool = False,
+        **kwargs: Any,
+    ):
+        super(AsyncCreateDao, self).__init__(model, use_returning=use_returning, **kwargs)  # type: ignore [call-arg]
+        self.model = model
+        self.use_returning = use_returning
+
+    async def create(
+        self: Any, db: AsyncSession, *, obj_in: CreateSerializer
+    ) -> ModelType:
+        obj_in_data = obj_in.dict(exclude_none=True)
+        orig_data = obj_in_data.copy()
+        obj_in_data = filter_create_values(self.model, obj_in_data)
+
+        try:
+            obj_id = obj_in_data.pop("id", None) or generate_uuid()
+            await self.on_pre_create(
+                db, pk=obj_id, values=obj_in_data, orig_values=orig_data
+            )
+            stmt = insert(self.model.__table__).values(id=obj_id, **obj_in_data)
+            if self.use_returning:
+                db_obj = (await db.scalars(self.build_returning_query(stmt))).one()
+            else:
+                await db.execute(stmt)
+
+            if hasattr(self, "on_relationship"):
+                await self.on_relationship(db, pk=obj_id, values=orig_data)
+
+            if self.use_returning:
+                await async_reload_returned(self, db, [db_obj], "create")
+                await async_commit_without_expiring(db)
+                return db_obj
+
+            await db.commit()
+
+            return await self.get_not_none(db, id=obj_id)
+
+        except IntegrityError:
+            await db.rollback()
+            raise
+
+    async def create_many(
+        self: Any,
+        db: AsyncSession,
+        *,
+        objs_in: Sequence[CreateSerializer],
+        chunk_size: int = 1000,
+    ) -> List[ModelType]:
+        if not objs_in:
+            return []
+
+        ids, rows, orig_rows = prepare_create_rows(self.model, objs_in)
+        db_objs = {}
+
+        try:
+            await self.on_pre_create_many(
+                db, pks=ids, values=rows, orig_values=orig_rows
+            )
+            for obj_id, row in zip(ids, rows):
+                row["id"] = obj_id
+
+            for stmt in build_insert_many(self.model.__table__, rows, chunk_size):
+                if self.use_returning:
+                    result = await db.scalars(self.build_returning_query(stmt))
+                    for db_obj in result:
+                        db_objs[db_obj.id] = db_obj
+                else:
+                    await db.execute(stmt)
+
+            if hasattr(self, "on_relationship_many"):
+                await self.on_relationship_many(db, pks=ids, values=orig_rows)
+
+            if self.use_returning:
+                await async_reload_returned(
+                    self, db, list(db_objs.values()), "create_many", chunk_size
+                )
+                await async_commit_without_expiring(db)
+            else:
+                await db.commit()
+
+        except IntegrityError:
+            await db.rollback()
+            raise
+
+        if not self.use_returning:
+            for chunk in chunked(ids, chunk_size):
+                result = await db.scalars(
+                    self.build_get_by_ids_query(list(chunk), "create_many")
+                )
+                for db_obj in result.unique():
+                    db_objs[db_obj.id] = db_obj
+
+        created = [db_objs[obj_id] for obj_id in ids]
+        await self.on_post_create(db, created)
+        return created
+
+    async def on_pre_create(
+        self, db: AsyncSession, pk: str, values: dict, orig_values: dict
+    ) -> None:
+        pass
+
+    async def on_pre_create_many(
+        self,
+        db: AsyncSession,
+        pks: List[str],
+        values: List[dict],
+        orig_values: List[dict],
+    ) -> None:
+        for pk, row_values, orig_row_values in zip(pks, values, orig_values):
+            await self.on_pre_create(
+                db, pk=pk, values=row_values, orig_values=orig_row_values
+            )
+
+    async def on_post_create(
+        self, db: AsyncSession, db_obj: Union[ModelType, List[ModelType]]
+    ) -> None:
+        pass
+
+
+class AsyncUpdateDao(Generic[ModelType, UpdateSerializer]):
+    def __init__(
+        self, model: Type[ModelType], *, use_returning: bool = False, **kwargs: Any
+    ):
+        self.model = model
+        self.use_returning = use_returning
+        super(AsyncUpdateDao, self).__init__(model, use_returning=use_returning, **kwargs)  # type: ignore [call-arg]
+
+    async def update(
+        self: Any,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSerializer, Dict[str, Any]],
+    ) -> ModelType:
+        update_data = prepare_update_data(db_obj, obj_in)
+        orig_update_data = update_data.copy()
+        update_data = filter_update_values(self.model, update_data)
+
+        await self.on_pre_update(
+            db=db, db_obj=db_obj, values=update_data, orig_values=orig_update_data
+        )
+        # We need to keep track of attributes we are about to change
+        changed_obj_state: ChangedObjState = track_changed_values(  # type: ignore [assignment]
+            db_obj, update_data
+        )
+
+        stmt = (
+            update(self.model.__table__)
+            .where(self.model.id == db_obj.id)
+            .values(**update_data)
+            .execution_options(synchronize_session="evaluate")
+        )
+        if self.use_returning:
+            db_obj = (await db.scalars(self.build_returning_query(stmt))).one()
+        else:
+            await db.execute(stmt)
+
+        if hasattr(self, "on_relationship"):
+            await self.on_relationship(
+                db, pk=db_obj.id, values=orig_update_data, db_obj=db_obj, create=False
+            )
+        try:
+            if self.use_returning:
+                await async_reload_returned(self, db, [db_obj], "update")
+                await async_commit_without_expiring(db)
+                if hasattr(self, "invalidate_cached"):
+                    await self.invalidate_cached([db_obj.id])
+                return db_obj
+
+            await db.commit()
+            if hasattr(self, "invalidate_cached"):
+                await self.invalidate_cached([db_obj.id])
+
+            # Async sessions don't expire on commit, without this the get
+            # would return `db_obj` from the identity map as it was
+            db.expire(db_obj)
+            updated_db_obj = await self.get_not_none(db, id=db_obj.id)
+
+            return updated_db_obj
+        except IntegrityError:
+            await db.rollback()
+            raise
+
+    async def upsert_many(
+        self: Any,
+        db: AsyncSession,
+        *,
+        objs_in: Sequence[BaseModel],
+        conflict_target: Sequence[str] = ("id",),
+        update_fields: Optional[Sequence[str]] = None,
+        chunk_size: int = 1000,
+    ) -> List[ModelType]:
+        if not objs_in:
+            return []
+
+        conflict_target = list(conflict_target)
+        table = self.model.__table__
+        ids, rows, orig_rows = prepare_create_rows(self.model, objs_in)
+        reject_state_transitions(
+            self, upserted_columns(rows, conflict_target, update_fields), "upsert_many"
+        )
+        await self.on_pre_create_many(db, pks=ids, values=rows, orig_values=orig_rows)
+        for obj_id, row in zip(ids, rows):
+            row["id"] = obj_id
+        keys = [conflict_key(table, conflict_target, row.get) for row in rows]
+
+        track = self.tracks_bulk_changes()
+        existing: Dict[tuple, Mapping[str, Any]] = {}
+        db_objs: Dict[tuple, ModelType] = {}
+        try:
+            if track:
+                raw_keys = [tuple(map(row.get, conflict_target)) for row in rows]
+                for chunk in chunked(raw_keys, chunk_size):
+                    query = build_conflict_rows_query(table, conflict_target, chunk)
+                    for row in (await db.execute(query)).mappings():
+                        existing[conflict_key(table, conflict_target, row.get)] = row
+
+            for stmt in build_upsert_statements(
+                table,
+                rows,
+                conflict_target=conflict_target,
+                update_fields=update_fields,
+                chunk_size=chunk_size,
+            ):
+                for db_obj in await db.scalars(self.build_returning_query(stmt)):
+                    db_objs[
+                        conflict_key(table, conflict_target, partial(getattr, db_obj))
+                    ] = db_obj
+
+            await async_reload_returned(
+                self, db, list(db_objs.values()), "upsert_many", chunk_size
+            )
+            await async_commit_without_expiring(db)
+        except IntegrityError:
+            await db.rollback()
+            raise
+
+        if hasattr(self, "invalidate_cached"):
+            await self.invalidate_cached([db_obj.id for db_obj in db_objs.values()])
+        upserted = order_upserted(keys, db_objs)
+        if track:
+            await self.on_post_update_many(db, upsert_changes(db_objs, existing))
+        return upserted
+
+    async def update_where(
+        self: Any,
+        db: AsyncSession,
+        *,
+        filters: Union[FilterType, Dict[str, Any]],
+        values: Dict[str, Any],
+    ) -> int:
+        filters_dict, update_data = prepare_update_where_values(self, filters, values)
+        ids_query = self.build_query(filters_dict, sort=False).with_only_columns(
+            self.model.id
+        )
+        track = self.tracks_bulk_changes()
+        cached = getattr(self, "entity_cache", None) is not None
+        stmt = build_update_where_statement(
+            self.model.__table__,
+            ids_query,
+            update_data,
+            track=track,
+            returning_ids=cached,
+        )
+
+        try:
+            result = await db.execute(stmt)
+            rows = result.mappings().all() if track or cached else []
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise
+
+        if hasattr(self, "invalidate_cached"):
+            await self.invalidate_cached([row["id"] for row in rows])
+        if not track:
+            return len(rows) if cached else result.rowcount
+
+        await self.on_post_update_many(db, changes_from_rows(rows, list(update_data)))
+        return len(rows)
+
+    def tracks_bulk_changes(self) -> bool:
+        return type(self).on_post_update_many is not AsyncUpdateDao.on_post_update_many
+
+    async def on_pre_update(
+        self, db: AsyncSession, db_obj: ModelType, values: dict, orig_values: dict
+    ) -> None:
+        pass
+
+    async def on_post_update(
+        self, db: AsyncSession, db_obj: ModelType, changed: ChangedObjState
+    ) -> None:
+        pass
+
+    async def on_post_update_many(
+        self, db: AsyncSession, changes: Dict[str, ChangedObjState]
+    ) -> None:
+        pass
+
+
+class AsyncDeleteDao(Generic[ModelType]):
+    def __init__(
+        self,
+        model: Type[ModelType],
+        **kwargs: Any,
+    ):
+        super(AsyncDeleteDao, self).__init__(model, **kwargs)  # type: ignore [call-arg]
+        self.model = model
+
+    async def remove(self, db: AsyncSession, *, id: str) -> Optional[ModelType]:
+        obj = await db.get(self.model, id)
+        await db.delete(obj)
+        await db.commit()
+        if hasattr(self, "invalidate_cached"):
+            await self.invalidate_cached([id])
+        return obj
+
+
+class AsyncReadDao(BaseReadDao[ModelType], Generic[ModelType, Pagination]):
+    async def get(
+        self,
+        db: AsyncSession,
+        load_options: Optional[Sequence[LoadOption]] = None,
+        **filters: Any,
+    ) -> Optional[ModelType]:
+        filters_dict = parse_query_filters(filters)
+        cache_id = self.cacheable_id(filters_dict, load_options)
+        if cache_id is not None:
+            cached = await self.entity_cache.get_many(db, self.model, [cache_id])
+            if cached:
+                return cached[cache_id]
+
+        query = self.build_query(filters_dict, label="get")
+        query = self.apply_load_options(query, filters_dict, load_options)
+
+        db_obj = (await db.scalars(query.limit(1))).first()
+        if cache_id is not None and db_obj is not None:
+            await self.entity_cache.set_many([db_obj])
+        return db_obj
+
+    async def get_not_none(
+        self,
+        db: AsyncSession,
+        load_options: Optional[Sequence[LoadOption]] = None,
+        **filters: Any,
+    ) -> ModelType:
+        obj = await self.get(db, load_options=load_options, **filters)
+        if not obj:
+            raise InvalidStateException(f"obj with filters {filters} not found")
+        return obj
+
+    async def get_all(
+        self,
+        db: AsyncSession,
+        *,
+        load_options: Optional[Sequence[LoadOption]] = None,
+        filters: Optional[Union[FilterType, Dict[str, Any]]] = None,
+        sorting_fields: Optional[Sequence[BaseSort]] = None,
+        fields: Optional[Mapping[str, Any]] = None,
+    ) -> List[ModelType]:
+        filters_dict = parse_query_filters(filters)
+        query = self.build_query(
+            filters_dict, label="get_all", sorting_fields=sorting_fields
+        )
+        query = self.apply_load_options(query, filters_dict, load_options, fields)
+
+        with read_from_replica(db):
+            return (await db.scalars(query)).unique().all()
+
+    async def get_all_in_chunks(
+        self,
+        db: AsyncSession,
+        *,
+        filters: Optional[Union[FilterType, Dict[str, Any]]] = None,
+        sorting_fields: Optional[Sequence[BaseSort]] = None,
+        chunk: int = 500,
+        progress: Optional[ChunkProgress] = None,
+    ) -> AsyncGenerator[ModelType, None]:
+        """
+        Streams every matching object through a server side cursor, `chunk`
+        rows per round trip. Reads from the primary, see the sync dao.
+        """
+        query = self.build_chunks_query(
+            parse_query_filters(filters), sorting_fields, stream=True
+        )
+
+        # asyncpg streams through a server side cursor, so unlike the sync
+        # dao there is no need to window the query.
+        if not sorting_fields:
+            query = query.order_by(self.model.id)
+        # Row sizes cost a pg_column_size per row, only taken for `progress`
+        if progress is not None:
+            query = with_row_size(query, self.model)
+        result = await db.stream(query.execution_options(yield_per=chunk))
+        async for partition in result.partitions():
+            if progress is not None:
+                progress.record(len(partition), sum(row[-1] for row in partition))
+            for row in partition:
+                yield row[0]
+
+    async def get_by_ids(self, db: AsyncSession, *, ids: List[str]) -> List[ModelType]:
+        if self.entity_cache is None:
+            return (await db.scalars(self.build_get_by_ids_query(ids))).unique().all()
+
+        cached = await self.entity_cache.get_many(db, self.model, ids)
+        missing = [id for id in ids if id not in cached]
+        if not missing:
+            return list(cached.values())
+
+        query = self.build_get_by_ids_query(missing)
+        db_objs = (await db.scalars(query)).unique().all()
+        await self.entity_cache.set_many(db_objs)
+        return list(cached.values()) + db_objs
+
+    async def invalidate_cached(self, ids: Sequence[str]) -> None:
+        if self.entity_cache is not None:
+            await self.entity_cache.invalidate(self.model, ids)
+        if self.typeahead_fields:
+            evict_typeahead(self.model.__tablename__)
+
+    async def get_multi_paginated(
+        self,
+        db: AsyncSession,
+        params: Union[PaginationQueryParams, CursorPaginationQueryParams],
+        filters: Optional[Union[FilterType, Dict[str, Any]]] = None,
+        sorting_fields: Optional[Sequence[BaseSort]] = None,
+        export: Optional[ExportParam] = None,
+        count_strategy: Optional[CountStrategy] = None,
+        export_serializer: Optional[Type[BaseModel]] = None,
+        export_chunk_size: int = 1000,
+        fields: Optional[Mapping[str, Any]] = None,
+    ) -> Union[AbstractPage[ModelType], List[ModelType], StreamingResponse]:
+        """
+        Pages through the matching objects. With `export` every object is
+        returned instead, streamed as NDJSON/CSV when `export_serializer`
+        is given. Only `fields` are loaded when given, see
+        `trim_load_options`, streamed exports trim to their export fields.
+        """
+        filters_dict = parse_query_filters(filters)
+        order_columns: OrderColumns = []
+        query = self.build_query(
+            filters_dict,
+            label="get_multi_paginated",
+            sorting_fields=sorting_fields,
+            use_sorting_pk=True,
+            order_columns=order_columns,
+        )
+        # We need to store the total_query for later use during counting
+        total_query = query
+        include = None
+        if export and export_serializer:
+            include = get_export_include(export_serializer, export)
+            fields = fields or include
+
+        if self.load_options:
+            load_options = list(self.load_options)
+            self.modify_load_options(filters_dict, load_options)
+            self.trim_load_options(load_options, fields)
+            query = query.options(*load_options)
+
+        with read_from_replica(db):
+            if export and export_serializer:
+                # Streams on a connection of its own, from the engine the
+                # session routes reads to, like the sync dao
+                writer = ExportWriter(
+                    export_serializer,
+                    export.export_format or ExportFormat.NDJSON,
+                    include,
+                )
+                return export_response(
+                    async_stream_query(
+                        AsyncEngine(db.get_bind()), query, writer, export_chunk_size
+                    ),
+                    export,
+                    filename=self.model.__tablename__,
+                )
+            elif export:
+                return (await db.scalars(query)).unique().all()
+            elif isinstance(params, CursorPaginationQueryParams):
+                return await async_paginate_keyset(db, query, order_columns, params)
+            else:
+                return await async_paginate(
+                    db,
+                    query,
+                    total_query=total_query,
+                    params=params,
+                    count_strategy=count_strategy or self.count_strategy,
+                )
+
+    async def search(
+        self,
+        db: AsyncSession,
+        search_param: SearchParam,
+        pagination: Union[PaginationQueryParams, CursorPaginationQueryParams],
+        *,
+        filters: Optional[Union[FilterType, Dict[str, Any]]] = None,
+        sorting_fields: Optional[Sequence[BaseSort]] = None,
+        count_strategy: Optional[CountStrategy] = None,
+        fields: Optional[Mapping[str, Any]] = None,
+        order_by_rank: Optional[bool] = None,
+        headline: Optional[Sequence[str]] = None,
+    ) -> AbstractPage[ModelType]:
+        """
+        Pages through the objects matching `search_param`. With
+        `order_by_rank`, by default the dao's `search_order_by_rank`, the
+        most relevant come first. `headline` fills the model's
+        `search_headline` from the given columns.
+        """
+        if order_by_rank is None:
+            order_by_rank = self.search_order_by_rank
+        filters_dict = parse_query_filters(filters)
+        order_columns: OrderColumns = []
+        query = self.build_query(
+            filters_dict,
+            label="search",
+            sorting_fields=sorting_fields,
+            use_sorting_pk=True,
+            order_columns=order_columns,
+        )
+        query = self.build_search_query(
+            query,
+            search_param,
+            order_columns=order_columns if order_by_rank else None,
+            headline=headline,
+        )
+
+        # We need to store the total_query for later use during counting
+        total_query = query
+
+        if self.load_options:
+            load_options = list(self.load_options)
+            self.modify_load_options(filters_dict, load_options)
+            self.trim_load_options(load_options, fields)
+            query = query.options(*load_options)
+
+        with read_from_replica(db):
+            if isinstance(pagination, CursorPaginationQueryParams):
+                return await async_paginate_keyset(db, query, order_columns, pagination)
+            return await async_paginate(
+                db,
+                query,
+                total_query=total_query,
+                params=pagination,
+                count_strategy=count_strategy or self.count_strategy,
+            )
+
+    async def typeahead(
+        self,
+        db: AsyncSession,
+        prefix: str,
+        *,
+        limit: int = 10,
+        fuzzy: bool = False,
+        filters: Optional[Union[FilterType, Dict[str, Any]]] = None,
+    ) -> TypeaheadResults:
+        prefix = normalize_prefix(prefix)
+        filters_dict = parse_query_filters(filters)
+        key = self.build_typeahead_key(prefix, filters_dict, limit, fuzzy)
+        if key is None:
+            return []
+
+        results = typeahead_cache.get(key)
+        if results is None:
+            query = self.build_typeahead_query(
+                filters_dict, prefix, limit=limit, fuzzy=fuzzy
+            )
+            results = [dict(row._mapping) for row in await db.execute(query)]
+            typeahead_cache.set(key, results)
+        return results
+
+    async def exists(self, db: AsyncSession, id: str) -> bool:
+        return (await db.scalars(self.build_exists_query(id))).first() is not None
+
+
+class AsyncCRUDDao(
+    AsyncCreateDao[ModelType, CreateSerializer],
+    AsyncUpdateDao[ModelType, UpdateSerializer],
+    AsyncDeleteDao[ModelType],
+    AsyncReadDao[ModelType, Page[ModelType]],
+    AsyncRelationshipsDao[ModelType],
+    TransitionDao[ModelType],
+):
+    def __init__(
+        self,
+        model: Type[ModelType],
+        *,
+        load_options: Optional[List[LoadOption]] = None,
+        stream_load_options: Optional[List[LoadOption]] = None,
+        state_transition_graph: Optional[Dict[str, Sequence[str]]] = None,
+        count_strategy: Optional[CountStrategy] = None,
+        use_returning: bool = False,
+        entity_cache: Optional[AsyncEntityCache] = None,
+        search_order_by_rank: bool = False,
+    ):
+        """
+        Async counterpart of `CRUDDao`, every method and hook is a
+        coroutine and takes an `AsyncSession`.
+
+        **Parameters**
+
+        * `model`: A SQLAlchemy model class
+        * `load_options`: Loader options applied on every read
+        * `stream_load_options`: Loader options of `get_all_in_chunks`,
+          streamed with `yield_per`
+        * `count_strategy`: How paginated reads count their total
+        * `use_returning`: Populate created/updated objects from RETURNING
+        * `entity_cache`: Serve `get(id=...)` and `get_by_ids` from Redis,
+          only without `load_options`
+
+        * `search_order_by_rank`: Order `search` results by relevance
+        """
+        super(AsyncCRUDDao, self).__init__(
+            model,
+            load_options=load_options,
+            stream_load_options=stream_load_options,
+            count_strategy=count_strategy,
+            use_returning=use_returning,
+            entity_cache=entity_cache,
+            state_transition_graph=state_transition_graph,
+            search_order_by_rank=search_order_by_rank,
+        )
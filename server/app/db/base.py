@@ -1,6 +1,10 @@
 from sqlalchemy.orm import configure_mappers
 
+from app.db.base_class import Base
+from app.db.model_registry import register_models
+
 from app.users.models import *  # noqa
 from app.auth.models import *  # noqa
 
 configure_mappers()
+register_models(Base)
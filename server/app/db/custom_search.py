@@ -1,8 +1,10 @@
 import os
-from typing import Any, Mapping, Optional, Type
+from typing import Any, List, Mapping, NamedTuple, Optional, Sequence, Type
 
 import sqlalchemy as sa
 from sqlalchemy import DDL, MetaData, event
+from sqlalchemy.dialects.postgresql import ARRAY, REAL
+from sqlalchemy.engine import Engine
 from sqlalchemy.future import Connection
 from sqlalchemy.orm import Mapper
 from sqlalchemy.sql import ColumnElement, Select
@@ -12,36 +14,160 @@ from sqlalchemy_searchable import (
     DropSearchFunctionSQL,
     DropSearchTriggerSQL,
     SearchManager,
-    inspect_search_vectors,
     search_manager,
 )
 
+from app.db.model_registry import get_model_info
 from app.db.utils import _get_root_cls
 
+# Dictionary used by `parse_websearch`, ts_headline needs it spelled out
+SEARCH_CONFIG = sa.literal_column("'pg_catalog.english'::regconfig")
+
+DEFAULT_HEADLINE_OPTIONS = "MaxFragments=2, MinWords=5, MaxWords=20"
+
+
+class SearchIndexStatus(NamedTuple):
+    table: str
+    column: str
+    index: Optional[str]
+    # ok, missing, invalid, created or rebuilt
+    status: str
+
+
+def get_search_vector(query: Select, vector: Optional[ColumnElement]) -> ColumnElement:
+    if vector is None:
+        entity = _get_root_cls(query)
+        vector = get_model_info(entity).search_vectors[0]
+    return vector
+
+
+def search_rank(
+    vector: ColumnElement,
+    search_query: str,
+    weights: Optional[Sequence[float]] = None,
+    normalization: int = 0,
+) -> ColumnElement:
+    """
+    `ts_rank_cd` of `vector` against `search_query`. `weights` are the
+    factors of the D, C, B and A labels given by the vector's `weights`
+    option, Postgres defaults to {0.1, 0.2, 0.4, 1.0}.
+    """
+    tsquery = sa.func.parse_websearch(search_query)
+    if weights is None:
+        return sa.func.ts_rank_cd(vector, tsquery, normalization)
+
+    return sa.func.ts_rank_cd(
+        sa.cast(sa.bindparam(None, list(weights)), ARRAY(REAL)),
+        vector,
+        tsquery,
+        normalization,
+    )
+
+
+def search_headline(
+    document: ColumnElement,
+    search_query: str,
+    options: str = DEFAULT_HEADLINE_OPTIONS,
+) -> ColumnElement:
+    """Fragments of `document` with the matched words highlighted"""
+    return sa.func.ts_headline(
+        SEARCH_CONFIG, document, sa.func.parse_websearch(search_query), options
+    )
+
 
 def search(
     query: Select,
     search_query: Optional[str],
     vector: Optional[ColumnElement] = None,
     sort: bool = False,
+    weights: Optional[Sequence[float]] = None,
 ) -> Select:
     if not search_query or not search_query.strip():
         return query
 
-    if vector is None:
-        entity = _get_root_cls(query)
-        search_vectors = inspect_search_vectors(entity)
-        vector = search_vectors[0]
-
+    vector = get_search_vector(query, vector)
     query = query.where(vector.op("@@")(sa.func.parse_websearch(search_query)))
     if sort:
-        query = query.order_by(
-            sa.desc(sa.func.ts_rank_cd(vector, sa.func.parse_websearch(search_query)))
-        )
+        query = query.order_by(sa.desc(search_rank(vector, search_query, weights)))
 
     return query.params(term=search_query)
 
 
+# GIN indexes whose first key is the vector column
+SEARCH_INDEX_QUERY = sa.text(
+    """
+    SELECT index_class.relname AS name, pg_index.indisvalid AS valid
+    FROM pg_index
+    JOIN pg_class AS index_class ON index_class.oid = pg_index.indexrelid
+    JOIN pg_am ON pg_am.oid = index_class.relam
+    JOIN pg_attribute ON pg_attribute.attrelid = pg_index.indrelid
+        AND pg_attribute.attnum = pg_index.indkey[0]
+    WHERE pg_index.indrelid = to_regclass(:table)
+        AND pg_attribute.attname = :column
+        AND pg_am.amname = 'gin'
+    ORDER BY pg_index.indisvalid DESC
+    """
+)
+
+
+def _qualified(preparer: Any, table: sa.Table, name: str) -> str:
+    if table.schema:
+        return f"{preparer.quote_schema(table.schema)}.{preparer.quote(name)}"
+    return preparer.quote(name)
+
+
+def ensure_search_indexes(
+    engine: Engine, base: Any, create: bool = True
+) -> List[SearchIndexStatus]:
+    """
+    Checks that every search vector of the models mapped by `base` has a
+    valid GIN index. With `create` missing indexes are built, and invalid
+    ones (left by a failed concurrent build) rebuilt, with CONCURRENTLY so
+    writes aren't blocked.
+    """
+    report = []
+    preparer = engine.dialect.identifier_preparer
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        for mapper in base.registry.mappers:
+            table = mapper.local_table
+            for vector in get_model_info(mapper.class_).search_vectors:
+                index = conn.execute(
+                    SEARCH_INDEX_QUERY,
+                    {"table": table.fullname, "column": vector.name},
+                ).first()
+                if index is not None and index.valid:
+                    status = SearchIndexStatus(
+                        table.name, vector.name, index.name, "ok"
+                    )
+                elif not create:
+                    status = SearchIndexStatus(
+                        table.name,
+                        vector.name,
+                        index.name if index else None,
+                        "invalid" if index else "missing",
+                    )
+                else:
+                    name = index.name if index else f"ix_{table.name}_{vector.name}"
+                    if index is not None:
+                        conn.exec_driver_sql(
+                            f"DROP INDEX CONCURRENTLY {_qualified(preparer, table, name)}"
+                        )
+                    conn.exec_driver_sql(
+                        f"CREATE INDEX CONCURRENTLY {preparer.quote(name)} "
+                        f"ON {preparer.format_table(table)} "
+                        f"USING gin ({preparer.quote(vector.name)})"
+                    )
+                    status = SearchIndexStatus(
+                        table.name,
+                        vector.name,
+                        name,
+                        "rebuilt" if index else "created",
+                    )
+                report.append(status)
+    return report
+
+
 # SQLAlchemy 2.0 compatible version of
 # https://github.com/kvesteri/sqlalchemy-searchable/blob/ea46ffa9901bafad6cade3dcbc67416c135ba45d/sqlalchemy_searchable/__init__.py#L346
 def sync_trigger(
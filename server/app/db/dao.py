@@ -1,40 +1,91 @@
 from datetime import datetime
+from functools import partial
 from http import HTTPStatus
 from typing import (
     Any,
+    Callable,
     Dict,
     Generator,
     Generic,
+    Hashable,
+    Iterable,
     List,
+    Mapping,
     Optional,
     Protocol,
     Sequence,
+    Set,
+    Tuple,
     Type,
     TypedDict,
     TypeVar,
     Union,
 )
 
+from fastapi.responses import StreamingResponse
 from fastapi_pagination.bases import AbstractPage
 from pydantic import BaseModel
-from sqlalchemy import Column, insert, inspect, update
+from sqlalchemy import Column, Float, Table, cast, func, insert, tuple_, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.future import select
-from sqlalchemy.orm import LoaderCriteriaOption, Session, raiseload
+from sqlalchemy.orm import LoaderCriteriaOption, Session, raiseload, with_expression
 from sqlalchemy.orm.strategy_options import Load, _UnboundLoad
-from sqlalchemy.sql import Select
-from sqlalchemy_utils import get_hybrid_properties
+from sqlalchemy.sql import Insert, Select, Update
 
 from app.db.base_class import Base, generate_uuid
-from app.db.custom_search import search
+from app.db.custom_search import (
+    get_search_vector,
+    search,
+    search_headline,
+    search_rank,
+)
+from app.db.entity_cache import BaseEntityCache, EntityCache
+from app.db.export import (
+    ExportWriter,
+    export_response,
+    get_export_include,
+    stream_query,
+)
 from app.db.filters import BaseSort, FilterType
-from app.db.pagination import Page, Pagination, PaginationQueryParams, paginate
-from app.db.serializer import ExportParam, SearchParam
+from app.db.model_registry import get_model_info
+from app.db.pagination import (
+    CountStrategy,
+    CursorPaginationQueryParams,
+    OrderColumns,
+    Page,
+    Pagination,
+    PaginationQueryParams,
+    paginate,
+    paginate_keyset,
+)
+from app.db.serializer import ExportFormat, ExportParam, SearchParam
+from app.db.session import commit_without_expiring, read_from_replica
+from app.db.typeahead import (
+    TypeaheadResults,
+    evict_typeahead,
+    normalize_prefix,
+    typeahead_cache,
+    typeahead_cache_key,
+    typeahead_filter,
+)
 from app.db.utils import (
+    ChunkProgress,
     _create_filtered_query_from_query,
+    _yield_cursor,
     _yield_limit,
+    build_insert_many,
+    build_trim_load_options,
+    chunked,
+    dict_to_colon_str,
+    filter_create_values,
+    filter_update_values,
+    group_rows_for_insert,
+    insertable_columns,
     parse_query_filters,
-    sort_enum_to_str,
+    sorting_fields_to_attrs,
+    track_changed_values,
 )
 from app.exceptions.custom import (
     DaoException,
@@ -58,6 +109,293 @@ class ChangeAttrState(TypedDict):
 ChangedObjState = Dict[str, ChangeAttrState]
 
 
+def prepare_update_data(
+    db_obj: ModelType, obj_in: Union[BaseModel, Dict[str, Any]]
+) -> Dict[str, Any]:
+    if isinstance(obj_in, dict):
+        update_data = obj_in
+    else:
+        update_data = obj_in.dict(exclude_unset=True)
+
+    if not update_data:
+        raise HttpErrorException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            error_code="NO UPDATE DATA",
+            error_message="No data was passed on update!",
+        )
+
+    if "created_at" in update_data:
+        del update_data["created_at"]
+
+    if not hasattr(db_obj, "updated_at"):
+        update_data["updated_at"] = datetime.now()
+
+    return update_data
+
+
+def prepare_create_rows(
+    model: Type[ModelType], objs_in: Sequence[BaseModel]
+) -> Tuple[List[str], List[dict], List[dict]]:
+    """
+    Returns the ids, the insertable values and the original values of
+    every object in `objs_in`, in input order
+    """
+    columns = insertable_columns(model)
+    ids, rows, orig_rows = [], [], []
+    for obj_in in objs_in:
+        obj_in_data = obj_in.dict(exclude_none=True)
+        orig_rows.append(obj_in_data.copy())
+        values = filter_create_values(model, obj_in_data, columns)
+        ids.append(values.pop("id", None) or generate_uuid())
+        rows.append(values)
+    return ids, rows, orig_rows
+
+
+# Only used to process conflict keys, the statements compile for the session's
+PG_DIALECT = postgresql.dialect()
+
+
+def _key_value(column: Column, value: Any) -> Any:
+    if value is None:
+        return None
+    processor = column.type.bind_processor(PG_DIALECT)
+    try:
+        if processor is not None:
+            value = processor(value)
+        python_type = column.type.python_type
+        if not isinstance(value, python_type):
+            value = python_type(value)
+    except (LookupError, NotImplementedError, TypeError, ValueError):
+        pass
+    return value
+
+
+def conflict_key(
+    table: Table, conflict_target: Sequence[str], get: Callable[[str], Any]
+) -> tuple:
+    """
+    The `conflict_target` values read with `get`, processed like the
+    column types do so input values compare equal to the returned ones.
+    """
+    return tuple(_key_value(table.c[key], get(key)) for key in conflict_target)
+
+
+def build_upsert_statements(
+    table: Table,
+    rows: List[dict],
+    *,
+    conflict_target: Sequence[str],
+    update_fields: Optional[Sequence[str]] = None,
+    chunk_size: int = 1000,
+) -> List[Insert]:
+    """
+    Builds multi-row INSERT ... ON CONFLICT DO UPDATE statements for `rows`.
+    Rows sharing a conflict key are collapsed to the last one, Postgres
+    refuses to update the same row twice in one statement. Conflicting rows
+    are always updated, even with nothing to set, so RETURNING yields them.
+    """
+    deduped: Dict[tuple, dict] = {}
+    for row in rows:
+        deduped[conflict_key(table, conflict_target, row.get)] = row
+
+    statements = []
+    for keys, chunk in group_rows_for_insert(list(deduped.values()), chunk_size):
+        stmt = pg_insert(table).values(list(chunk))
+        set_ = {
+            key: stmt.excluded[key]
+            for key in keys
+            if key not in conflict_target
+            and key not in ("id", "created_at")
+            and (update_fields is None or key in update_fields)
+        }
+        if set_ and "updated_at" in table.c and "updated_at" not in set_:
+            set_["updated_at"] = datetime.now()
+        if not set_:
+            set_ = {conflict_target[0]: stmt.excluded[conflict_target[0]]}
+        statements.append(
+            stmt.on_conflict_do_update(index_elements=conflict_target, set_=set_)
+        )
+    return statements
+
+
+def build_conflict_rows_query(
+    table: Table, conflict_target: Sequence[str], keys: Sequence[tuple]
+) -> Select:
+    """Selects, and locks, the existing rows matching the conflict `keys`"""
+    if len(conflict_target) == 1:
+        criteria = table.c[conflict_target[0]].in_([key[0] for key in keys])
+    else:
+        criteria = tuple_(*[table.c[col] for col in conflict_target]).in_(keys)
+    return select(table).where(criteria).with_for_update()
+
+
+def build_update_where_statement(
+    table: Table,
+    ids_query: Select,
+    values: Dict[str, Any],
+    track: bool = False,
+    returning_ids: bool = False,
+) -> Update:
+    """
+    Builds an UPDATE of every row whose id is in `ids_query`. With `track`,
+    the previous values are read in a locking CTE and returned next to the
+    new ones as `before__<column>` and `after__<column>`.
+    """
+    if not track:
+        stmt = (
+            update(table)
+            .where(table.c.id.in_(ids_query))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        return stmt.returning(table.c.id) if returning_ids else stmt
+
+    columns = [key for key in values if key != "updated_at"]
+    old = (
+        select(table.c.id, *[table.c[key] for key in columns])
+        .where(table.c.id.in_(ids_query))
+        .with_for_update()
+        .cte("old")
+    )
+    return (
+        update(table)
+        .where(table.c.id == old.c.id)
+        .values(**values)
+        .returning(
+            table.c.id,
+            *[old.c[key].label(f"before__{key}") for key in columns],
+            *[table.c[key].label(f"after__{key}") for key in columns],
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def changes_from_rows(
+    rows: Sequence[Mapping[str, Any]], columns: Sequence[str]
+) -> Dict[str, ChangedObjState]:
+    """Turns the rows returned by a tracked update in change summaries by id"""
+    changes: Dict[str, ChangedObjState] = {}
+    for row in rows:
+        changed: ChangedObjState = {}
+        for key in columns:
+            before, after = row.get(f"before__{key}"), row.get(f"after__{key}")
+            if before != after:
+                changed[key] = {"before": before, "after": after}
+        if changed:
+            changes[row["id"]] = changed
+    return changes
+
+
+def upsert_changes(
+    db_objs: Dict[tuple, ModelType],
+    existing: Dict[tuple, Mapping[str, Any]],
+) -> Dict[str, ChangedObjState]:
+    """Compares upserted objects with the rows they replaced, both by key"""
+    changes: Dict[str, ChangedObjState] = {}
+    for key, db_obj in db_objs.items():
+        old = existing.get(key)
+        if old is None:
+            continue
+        changed: ChangedObjState = {}
+        for column, before in old.items():
+            after = getattr(db_obj, column, None)
+            if column != "updated_at" and before != after:
+                changed[column] = {"before": before, "after": after}
+        if changed:
+            changes[db_obj.id] = changed
+    return changes
+
+
+def order_upserted(
+    keys: Sequence[tuple], db_objs: Dict[tuple, ModelType]
+) -> List[ModelType]:
+    """
+    The upserted objects in the order of their input `keys`. Objects whose
+    key the database stored differently (e.g. a trigger normalized it)
+    can't be matched, they come last instead of failing the call.
+    """
+    upserted = [db_objs[key] for key in keys if key in db_objs]
+    matched = set(keys)
+    upserted.extend(obj for key, obj in db_objs.items() if key not in matched)
+    return upserted
+
+
+def reject_state_transitions(dao: Any, columns: Iterable[str], method: str) -> None:
+    """
+    Bulk writes don't load the objects they change, so they refuse to set
+    the state key of a `TransitionDao` instead of skipping the validation.
+    """
+    graph = getattr(dao, "state_transition_graph", None)
+    if graph and graph["key"] in columns:
+        raise DaoException(
+            resource=f"{dao.model}",
+            message=f"State transitions can't be applied with {method}",
+        )
+
+
+def upserted_columns(
+    rows: Sequence[dict],
+    conflict_target: Sequence[str],
+    update_fields: Optional[Sequence[str]],
+) -> Set[str]:
+    """The columns `build_upsert_statements` overwrites on conflict"""
+    return {
+        key
+        for row in rows
+        for key in row
+        if key not in conflict_target
+        and (update_fields is None or key in update_fields)
+    }
+
+
+def prepare_update_where_values(
+    dao: Any, filters: Optional[Union[FilterType, dict]], values: Dict[str, Any]
+) -> Tuple[dict, Dict[str, Any]]:
+    """
+    Parses the filters and values of an `update_where`. Refuses to run
+    without filters and on state keys, transitions are validated per object.
+    """
+    filters_dict = parse_query_filters(filters)
+    if not filters_dict:
+        raise DaoException(
+            resource=f"{dao.model}", message="update_where needs at least one filter"
+        )
+
+    # Unlike `update`, a None here sets the columns to NULL
+    update_data = filter_update_values(
+        dao.model, prepare_update_data(dao.model, dict(values)), keep_none=True
+    )
+    reject_state_transitions(dao, update_data, "update_where")
+    # `prepare_update_data` only sees the model class, which always has the
+    # attribute, so the timestamp is set here
+    if "updated_at" in get_model_info(dao.model).columns:
+        update_data.setdefault("updated_at", func.now())
+    return filters_dict, update_data
+
+
+def reload_returned(
+    dao: Any,
+    db: Session,
+    db_objs: Sequence[ModelType],
+    label: str,
+    chunk_size: int = 1000,
+) -> None:
+    """
+    RETURNING only loads the columns of the written rows. Once the hooks
+    wrote the related rows, this selects the objects again with the dao's
+    load options, or expires their relationships so they lazy load fresh.
+    """
+    if not dao.has_load_options:
+        relationships = list(get_model_info(dao.model).relationships)
+        if relationships:
+            for db_obj in db_objs:
+                db.expire(db_obj, relationships)
+        return
+
+    for chunk in chunked([db_obj.id for db_obj in db_objs], chunk_size):
+        db.scalars(dao.build_reload_query(list(chunk), label)).unique().all()
+
+
 class DaoInterface(Protocol[ModelType]):
     model: ModelType
     load_options: List[LoadOption]
@@ -102,6 +440,16 @@ class DaoInterface(Protocol[ModelType]):
     ) -> None:
         pass
 
+    def on_pre_create_many(
+        self, db: Session, pks: List[str], values: List[dict], orig_values: List[dict]
+    ) -> None:
+        pass
+
+    def on_relationship_many(
+        self, db: Session, *, pks: List[str], values: List[dict]
+    ) -> None:
+        pass
+
     def on_post_create(
         self, db: Session, db_obj: Union[ModelType, List[ModelType]]
     ) -> None:
@@ -117,6 +465,14 @@ class DaoInterface(Protocol[ModelType]):
     ) -> None:
         pass
 
+    def on_post_update_many(
+        self, db: Session, changes: Dict[str, ChangedObjState]
+    ) -> None:
+        pass
+
+    def invalidate_cached(self, ids: Sequence[str]) -> None:
+        pass
+
     def customize_query(self, query: Select, filters: dict) -> Select:
         pass
 
@@ -141,6 +497,16 @@ class RelationshipsDao(Generic[ModelType]):
     ) -> None:
         pass
 
+    def on_relationship_many(
+        self, db: Session, *, pks: List[str], values: List[dict]
+    ) -> None:
+        """
+        Called by `create_many` with every created row. Override this to
+        handle relationships in bulk instead of once per row.
+        """
+        for pk, row_values in zip(pks, values):
+            self.on_relationship(db, pk=pk, values=row_values)
+
     def on_unknown_field(
         self, db: Session, *, db_obj: ModelType, key: str, value: Any
     ) -> None:
@@ -151,27 +517,20 @@ class CreateDao(Generic[ModelType, CreateSerializer]):
     def __init__(
         self,
         model: Type[ModelType],
+        *,
+        use_returning: bool = False,
         **kwargs: Any,
     ):
-        super(CreateDao, self).__init__(model, **kwargs)  # type: ignore [call-arg]
+        super(CreateDao, self).__init__(model, use_returning=use_returning, **kwargs)  # type: ignore [call-arg]
         self.model = model
+        self.use_returning = use_returning
 
     def create(
         self: Union[Any, DaoInterface], db: Session, *, obj_in: CreateSerializer
     ) -> ModelType:
         obj_in_data = obj_in.dict(exclude_none=True)
         orig_data = obj_in_data.copy()
-
-        relationship_fields = inspect(self.model).relationships.keys()
-
-        for key in list(obj_in_data.keys()):
-            if (
-                isinstance(obj_in_data[key], list)
-                or key in relationship_fields
-                or obj_in_data[key] is None
-                or key not in self.model.get_model_columns()
-            ):
-                del obj_in_data[key]
+        obj_in_data = filter_create_values(self.model, obj_in_data)
 
         try:
             obj_id = obj_in_data.pop("id", None) or generate_uuid()
@@ -180,11 +539,19 @@ class CreateDao(Generic[ModelType, CreateSerializer]):
                     db, pk=obj_id, values=obj_in_data, orig_values=orig_data
                 )
             stmt = insert(self.model.__table__).values(id=obj_id, **obj_in_data)
-            db.execute(stmt)
+            if self.use_returning:
+                db_obj = db.scalars(self.build_returning_query(stmt)).one()
+            else:
+                db.execute(stmt)
 
             if hasattr(self, "on_relationship"):
                 self.on_relationship(db, pk=obj_id, values=orig_data)
 
+            if self.use_returning:
+                reload_returned(self, db, [db_obj], "create")
+                commit_without_expiring(db)
+                return db_obj
+
             db.commit()
 
             db_obj = self.get_not_none(db, id=obj_id)
@@ -194,11 +561,77 @@ class CreateDao(Generic[ModelType, CreateSerializer]):
             db.rollback()
             raise
 
+    def create_many(
+        self: Union[Any, DaoInterface],
+        db: Session,
+        *,
+        objs_in: Sequence[CreateSerializer],
+        chunk_size: int = 1000,
+    ) -> List[ModelType]:
+        """
+        Inserts `objs_in` with multi-row INSERTs of up to `chunk_size` rows,
+        commits once and returns the created objects in input order.
+        """
+        if not objs_in:
+            return []
+
+        ids, rows, orig_rows = prepare_create_rows(self.model, objs_in)
+        db_objs = {}
+
+        try:
+            self.on_pre_create_many(db, pks=ids, values=rows, orig_values=orig_rows)
+            for obj_id, row in zip(ids, rows):
+                row["id"] = obj_id
+
+            for stmt in build_insert_many(self.model.__table__, rows, chunk_size):
+                if self.use_returning:
+                    for db_obj in db.scalars(self.build_returning_query(stmt)):
+                        db_objs[db_obj.id] = db_obj
+                else:
+                    db.execute(stmt)
+
+            if hasattr(self, "on_relationship_many"):
+                self.on_relationship_many(db, pks=ids, values=orig_rows)
+
+            if self.use_returning:
+                reload_returned(
+                    self, db, list(db_objs.values()), "create_many", chunk_size
+                )
+                commit_without_expiring(db)
+            else:
+                db.commit()
+
+        except IntegrityError:
+            db.rollback()
+            raise
+
+        if not self.use_returning:
+            for chunk in chunked(ids, chunk_size):
+                query = self.build_get_by_ids_query(list(chunk), "create_many")
+                for db_obj in db.scalars(query).unique():
+                    db_objs[db_obj.id] = db_obj
+
+        created = [db_objs[obj_id] for obj_id in ids]
+        self.on_post_create(db, created)
+        return created
+
     def on_pre_create(
         self, db: Session, pk: str, values: dict, orig_values: dict
     ) -> None:
         pass
 
+    def on_pre_create_many(
+        self, db: Session, pks: List[str], values: List[dict], orig_values: List[dict]
+    ) -> None:
+        """
+        Called by `create_many` before inserting. Override this to prepare
+        the rows in bulk instead of once per row.
+        """
+        for pk, row_values, orig_row_values in zip(pks, values, orig_values):
+            self.on_pre_create(
+                db, pk=pk, values=row_values, orig_values=orig_row_values
+            )
+
     def on_post_create(
         self, db: Session, db_obj: Union[ModelType, List[ModelType]]
     ) -> None:
@@ -206,9 +639,12 @@ class CreateDao(Generic[ModelType, CreateSerializer]):
 
 
 class UpdateDao(Generic[ModelType, UpdateSerializer]):
-    def __init__(self, model: Type[ModelType], **kwargs: Any):
+    def __init__(
+        self, model: Type[ModelType], *, use_returning: bool = False, **kwargs: Any
+    ):
         self.model = model
-        super(UpdateDao, self).__init__(model, **kwargs)  # type: ignore [call-arg]
+        self.use_returning = use_returning
+        super(UpdateDao, self).__init__(model, use_returning=use_returning, **kwargs)  # type: ignore [call-arg]
 
     def update(
         self: Union[Any, DaoInterface],
@@ -217,57 +653,17 @@ class UpdateDao(Generic[ModelType, UpdateSerializer]):
         db_obj: ModelType,
         obj_in: Union[UpdateSerializer, Dict[str, Any]],
     ) -> ModelType:
-        if isinstance(obj_in, dict):
-            update_data = obj_in
-        else:
-            update_data = obj_in.dict(exclude_unset=True)
-
-        if not update_data:
-            raise HttpErrorException(
-                status_code=HTTPStatus.BAD_REQUEST,
-                error_code="NO UPDATE DATA",
-                error_message="No data was passed on update!",
-            )
-
-        if "created_at" in update_data:
-            del update_data["created_at"]
-
-        if not hasattr(db_obj, "updated_at"):
-            update_data["updated_at"] = datetime.now()
-
-        hybrid_property_fields = get_hybrid_properties(self.model).keys()
-        relationship_fields = inspect(self.model).relationships.keys()
-
+        update_data = prepare_update_data(db_obj, obj_in)
         orig_update_data = update_data.copy()
-
-        for key in list(update_data.keys()):
-            if (
-                key in hybrid_property_fields
-                or key in relationship_fields
-                or key not in db_obj.get_model_columns()
-                or update_data[key] is None
-            ):
-                del update_data[key]
+        update_data = filter_update_values(self.model, update_data)
 
         self.on_pre_update(
             db=db, db_obj=db_obj, values=update_data, orig_values=orig_update_data
         )
         # We need to keep track of attributes we are about to change
-        changed_obj_state: ChangedObjState = {}
-        for key in list(update_data.keys()):
-            if key == "updated_at":
-                continue
-
-            if key in db_obj.get_model_columns():
-                # Field has the same values, so we delete it
-                if update_data[key] == getattr(db_obj, key):
-                    del update_data[key]
-                # Field has changed, so we track it
-                else:
-                    changed_obj_state[key] = {
-                        "before": getattr(db_obj, key),
-                        "after": update_data[key],
-                    }
+        changed_obj_state: ChangedObjState = track_changed_values(  # type: ignore [assignment]
+            db_obj, update_data
+        )
 
         stmt = (
             update(self.model.__table__)
@@ -275,14 +671,27 @@ class UpdateDao(Generic[ModelType, UpdateSerializer]):
             .values(**update_data)
             .execution_options(synchronize_session="evaluate")
         )
-        db.execute(stmt)
+        if self.use_returning:
+            # Refreshes db_obj in place, it's the same identity
+            db_obj = db.scalars(self.build_returning_query(stmt)).one()
+        else:
+            db.execute(stmt)
 
         if hasattr(self, "on_relationship"):
             self.on_relationship(
                 db, pk=db_obj.id, values=orig_update_data, db_obj=db_obj, create=False
             )
         try:
+            if self.use_returning:
+                reload_returned(self, db, [db_obj], "update")
+                commit_without_expiring(db)
+                if hasattr(self, "invalidate_cached"):
+                    self.invalidate_cached([db_obj.id])
+                return db_obj
+
             db.commit()
+            if hasattr(self, "invalidate_cached"):
+                self.invalidate_cached([db_obj.id])
 
             updated_db_obj = self.get_not_none(db, id=db_obj.id)
 
@@ -291,6 +700,124 @@ class UpdateDao(Generic[ModelType, UpdateSerializer]):
             db.rollback()
             raise
 
+    def upsert_many(
+        self: Union[Any, DaoInterface],
+        db: Session,
+        *,
+        objs_in: Sequence[BaseModel],
+        conflict_target: Sequence[str] = ("id",),
+        update_fields: Optional[Sequence[str]] = None,
+        chunk_size: int = 1000,
+    ) -> List[ModelType]:
+        """
+        Inserts `objs_in`, updating the rows that already exist on
+        `conflict_target` (which needs a unique index). Only `update_fields`
+        are overwritten when given. Returns the objects in input order, see
+        `order_upserted`.
+
+        Every row goes through `on_pre_create_many`, `on_pre_update` isn't
+        called since the existing objects aren't loaded. State keys can't
+        be overwritten, see `reject_state_transitions`.
+        """
+        if not objs_in:
+            return []
+
+        conflict_target = list(conflict_target)
+        table = self.model.__table__
+        ids, rows, orig_rows = prepare_create_rows(self.model, objs_in)
+        reject_state_transitions(
+            self, upserted_columns(rows, conflict_target, update_fields), "upsert_many"
+        )
+        self.on_pre_create_many(db, pks=ids, values=rows, orig_values=orig_rows)
+        for obj_id, row in zip(ids, rows):
+            row["id"] = obj_id
+        keys = [conflict_key(table, conflict_target, row.get) for row in rows]
+
+        track = self.tracks_bulk_changes()
+        existing: Dict[tuple, Mapping[str, Any]] = {}
+        db_objs: Dict[tuple, ModelType] = {}
+        try:
+            if track:
+                raw_keys = [tuple(map(row.get, conflict_target)) for row in rows]
+                for chunk in chunked(raw_keys, chunk_size):
+                    query = build_conflict_rows_query(table, conflict_target, chunk)
+                    for row in db.execute(query).mappings():
+                        existing[conflict_key(table, conflict_target, row.get)] = row
+
+            for stmt in build_upsert_statements(
+                table,
+                rows,
+                conflict_target=conflict_target,
+                update_fields=update_fields,
+                chunk_size=chunk_size,
+            ):
+                for db_obj in db.scalars(self.build_returning_query(stmt)):
+                    db_objs[
+                        conflict_key(table, conflict_target, partial(getattr, db_obj))
+                    ] = db_obj
+
+            reload_returned(self, db, list(db_objs.values()), "upsert_many", chunk_size)
+            commit_without_expiring(db)
+        except IntegrityError:
+            db.rollback()
+            raise
+
+        if hasattr(self, "invalidate_cached"):
+            self.invalidate_cached([db_obj.id for db_obj in db_objs.values()])
+        upserted = order_upserted(keys, db_objs)
+        if track:
+            self.on_post_update_many(db, upsert_changes(db_objs, existing))
+        return upserted
+
+    def update_where(
+        self: Union[Any, DaoInterface],
+        db: Session,
+        *,
+        filters: Union[FilterType, Dict[str, Any]],
+        values: Dict[str, Any],
+    ) -> int:
+        """
+        Sets `values` on every row matching `filters` in a single UPDATE,
+        filters use the same grammar as the read methods. Returns the number
+        of updated rows. Objects already in the session are not refreshed.
+        """
+        filters_dict, update_data = prepare_update_where_values(self, filters, values)
+        ids_query = self.build_query(filters_dict, sort=False).with_only_columns(
+            self.model.id
+        )
+        track = self.tracks_bulk_changes()
+        cached = getattr(self, "entity_cache", None) is not None
+        stmt = build_update_where_statement(
+            self.model.__table__,
+            ids_query,
+            update_data,
+            track=track,
+            returning_ids=cached,
+        )
+
+        try:
+            result = db.execute(stmt)
+            rows = result.mappings().all() if track or cached else []
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise
+
+        if hasattr(self, "invalidate_cached"):
+            self.invalidate_cached([row["id"] for row in rows])
+        if not track:
+            return len(rows) if cached else result.rowcount
+
+        self.on_post_update_many(db, changes_from_rows(rows, list(update_data)))
+        return len(rows)
+
+    def tracks_bulk_changes(self) -> bool:
+        """
+        Bulk updates only compute change summaries when `on_post_update_many`
+        is overridden, since it costs a locking read of the previous values.
+        """
+        return type(self).on_post_update_many is not UpdateDao.on_post_update_many
+
     def on_pre_update(
         self, db: Session, db_obj: ModelType, values: dict, orig_values: dict
     ) -> None:
@@ -301,6 +828,11 @@ class UpdateDao(Generic[ModelType, UpdateSerializer]):
     ) -> None:
         pass
 
+    def on_post_update_many(
+        self, db: Session, changes: Dict[str, ChangedObjState]
+    ) -> None:
+        pass
+
 
 class TransitionDao(Generic[ModelType]):
     """
@@ -360,51 +892,321 @@ class DeleteDao(Generic[ModelType]):
         obj = db.get(self.model, id)
         db.delete(obj)
         db.commit()
+        if hasattr(self, "invalidate_cached"):
+            self.invalidate_cached([id])
         return obj
 
 
-class ReadDao(Generic[ModelType, Pagination]):
+class BaseReadDao(Generic[ModelType]):
+    """
+    Query building shared by the sync and async read daos. Anything
+    here must not touch the session.
+    """
+
+    # Factors of the D, C, B and A weights in search ranks, None for
+    # Postgres' defaults
+    search_rank_weights: Optional[Sequence[float]] = None
+
+    # Columns `typeahead` matches prefixes against, each wants a
+    # `trigram_index`, and the columns it returns besides the id. The
+    # returned columns default to the matched ones.
+    typeahead_fields: Sequence[str] = ()
+    typeahead_columns: Optional[Sequence[str]] = None
+
     def __init__(
         self,
         model: Type[ModelType],
         *,
         load_options: Optional[List[LoadOption]] = None,
+        stream_load_options: Optional[List[LoadOption]] = None,
+        count_strategy: Optional[CountStrategy] = None,
+        entity_cache: Optional[BaseEntityCache] = None,
+        search_order_by_rank: bool = False,
         **kwargs: Any,
     ):
-        super(ReadDao, self).__init__(model, **kwargs)  # type: ignore [call-arg]
+        super(BaseReadDao, self).__init__(model, **kwargs)  # type: ignore [call-arg]
         self.model = model
+        self.count_strategy = count_strategy or CountStrategy.EXACT
+        self.search_order_by_rank = search_order_by_rank
+        if entity_cache is not None and load_options:
+            # Cache hits are built from columns alone, they'd skip these
+            raise DaoException(
+                resource=f"{model}",
+                message="An entity cache can't be used with load options",
+            )
+        self.entity_cache = entity_cache
         self.load_options: Sequence
+        # Besides the raiseload added to them
+        self.has_load_options = bool(load_options)
         if load_options is None:
             self.load_options = [raiseload("*", sql_only=True)]
         else:
             self.load_options = load_options + [raiseload("*", sql_only=True)]
+        # `yield_per` refuses joined eager loads of collections, streamed
+        # scans take these instead, e.g. with selectinload in their place
+        self.stream_load_options: Sequence = self.load_options
+        if stream_load_options is not None:
+            self.stream_load_options = stream_load_options + [
+                raiseload("*", sql_only=True)
+            ]
 
         self.sorting_pk = "id"
 
     def reset_sorting_pk(self) -> None:
         self.sorting_pk = "id"
 
-    def get(
-        self: Union[Any, DaoInterface],
-        db: Session,
-        load_options: Optional[Sequence[LoadOption]] = None,
-        **filters: Any,
-    ) -> Optional[ModelType]:
-
-        filters_dict = parse_query_filters(filters)
+    def build_query(
+        self,
+        filters_dict: dict,
+        *,
+        sorting_fields: Optional[Sequence[BaseSort]] = None,
+        sort: bool = True,
+        use_sorting_pk: bool = False,
+        order_columns: Optional[OrderColumns] = None,
+        label: Optional[str] = None,
+    ) -> Select:
         query = select(self.model)
         query = self.customize_query(query, filters_dict)
-        query = _create_filtered_query_from_query(query=query, filters=filters_dict)
+        query = _create_filtered_query_from_query(
+            query=query,
+            filters=filters_dict,
+            sort=sort,
+            sort_attrs=sorting_fields_to_attrs(sorting_fields),
+            sorting_pk=self.sorting_pk if use_sorting_pk else None,
+            entity=self.model,
+            order_columns=order_columns,
+        )
+        if use_sorting_pk:
+            # In case it was changed
+            self.reset_sorting_pk()
+        return self.label_query(query, label) if label else query
+
+    def label_query(self, query: Select, method: str) -> Select:
+        """Tags `query` so its compiled cache hits are reported per dao method"""
+        return query.execution_options(
+            statement_label=f"{type(self).__name__}.{method}"
+        )
 
+    def apply_load_options(
+        self,
+        query: Select,
+        filters_dict: dict,
+        load_options: Optional[Sequence[LoadOption]] = None,
+        fields: Optional[Mapping[str, Any]] = None,
+    ) -> Select:
         load_options = list(load_options or self.load_options)
 
-        # TODO: Check for the presence of raiseload before adding
+        # A wildcard only applies to relationships no other option names, so
+        # it doesn't clash with the raiseloads added by `trim_load_options`
         load_options.append(raiseload("*", sql_only=True))
+        self.modify_load_options(filters_dict, load_options)
+        self.trim_load_options(load_options, fields)
+        return query.options(*load_options)
+
+    def trim_load_options(
+        self, load_options: List[LoadOption], fields: Optional[Mapping[str, Any]]
+    ) -> None:
+        """
+        Narrows what the query loads to `fields`, the include dict of one
+        object as given by `TrimHandler`. Applied after
+        `modify_load_options`, so the relationships it decides to eager
+        load are trimmed as well. Pair it with `fast_response` and the
+        same include, other serializers may read the unloaded fields.
+        """
+        if fields:
+            load_options.extend(build_trim_load_options(self.model, fields))
+
+    def build_search_query(
+        self,
+        query: Select,
+        search_param: SearchParam,
+        *,
+        order_columns: Optional[OrderColumns] = None,
+        headline: Optional[Sequence[str]] = None,
+    ) -> Select:
+        """
+        Filters `query` by the search vector. With `order_columns` the
+        matches are ordered by relevance first, the rank then leads the
+        `order_columns` so keyset pagination follows it. `headline` names
+        the columns `search_headline` snippets are taken from.
+        """
+        search_vector: List[Column] = []
+        query = self.setup_search_query(query, search_vector)
+        vector = search_vector[0] if search_vector else None
+
+        query = search(query, search_param.q, vector)
+        if not search_param.q or not search_param.q.strip():
+            return query
+
+        vector = get_search_vector(query, vector)
+        if order_columns is not None:
+            # ts_rank_cd is a real, the cursor keeps the rank as a Python
+            # float and only double precision compares equal to it
+            rank = cast(
+                search_rank(vector, search_param.q, self.search_rank_weights),
+                Float(53),
+            )
+            order_columns.insert(0, (rank, True))
+            query = query.order_by(None).order_by(
+                *[
+                    col.desc() if is_desc else col.asc()
+                    for col, is_desc in order_columns
+                ]
+            )
+        if headline:
+            if not hasattr(self.model, "search_headline"):
+                raise DaoException(
+                    resource=f"{self.model}",
+                    message="Headlines need a `search_headline` query_expression",
+                )
+            document = func.concat_ws(
+                " ", *[getattr(self.model, column) for column in headline]
+            )
+            query = query.options(
+                with_expression(
+                    self.model.search_headline,
+                    search_headline(document, search_param.q),
+                )
+            )
+        return query
+
+    def build_typeahead_key(
+        self, prefix: str, filters_dict: dict, limit: int, fuzzy: bool
+    ) -> Optional[Hashable]:
+        """The `typeahead_cache` key of a lookup, None if `prefix` is too short"""
+        return typeahead_cache_key(
+            self.model.__tablename__,
+            self.typeahead_fields,
+            self.typeahead_columns,
+            prefix,
+            fuzzy,
+            limit,
+            dict_to_colon_str(filters_dict),
+        )
+
+    def build_typeahead_query(
+        self, filters_dict: dict, prefix: str, *, limit: int, fuzzy: bool
+    ) -> Select:
+        """
+        Selects the id and `typeahead_columns` of the objects whose
+        `typeahead_fields` start with the normalized `prefix`, or with
+        `fuzzy` have a word similar to it. Only these columns are read, so
+        nothing is loaded into the session.
+        """
+        if not self.typeahead_fields:
+            raise DaoException(
+                resource=f"{self.model}",
+                message="Typeahead needs the dao's `typeahead_fields`",
+            )
+        fields = [getattr(self.model, field) for field in self.typeahead_fields]
+        names = dict.fromkeys(
+            ["id", *(self.typeahead_columns or self.typeahead_fields)]
+        )
+        where, order_by = typeahead_filter(fields, prefix, fuzzy)
+
+        query = self.build_query(filters_dict, sort=False, label="typeahead")
+        return (
+            query.with_only_columns(*[getattr(self.model, name) for name in names])
+            .where(where)
+            .order_by(*order_by)
+            .limit(limit)
+        )
+
+    def build_returning_query(self, stmt: Union[Insert, Update]) -> Select:
+        """
+        Wraps an INSERT/UPDATE of this model so that it returns the written
+        rows as model instances. Only the columns are loaded, the hooks may
+        still write related rows, see `reload_returned`.
+        """
+        return (
+            select(self.model)
+            .from_statement(stmt.returning(*self.model.__table__.c))
+            .execution_options(populate_existing=True)
+        )
+
+    def build_reload_query(self, ids: List[str], label: str) -> Select:
+        load_options = list(self.load_options)
+        self.modify_load_options({}, load_options)
+        query = select(self.model).options(*load_options)
+        return self.label_query(
+            query.where(self.model.id.in_(ids)), label
+        ).execution_options(populate_existing=True)
+
+    def build_get_by_ids_query(
+        self, ids: List[str], label: str = "get_by_ids"
+    ) -> Select:
+        query = select(self.model)
+        if self.load_options:
+            query = query.options(*self.load_options)
+        return self.label_query(query.where(self.model.id.in_(ids)), label)
+
+    def build_chunks_query(
+        self,
+        filters_dict: dict,
+        sorting_fields: Optional[Sequence[BaseSort]] = None,
+        label: str = "get_all_in_chunks",
+        stream: bool = False,
+    ) -> Select:
+        """
+        The unsorted query of a full scan, callers add their own order.
+        With `stream` it takes the `stream_load_options`, for `yield_per`.
+        """
+        query = self.build_query(
+            filters_dict, label=label, sorting_fields=sorting_fields, sort=False
+        )
+        load_options = list(self.stream_load_options if stream else self.load_options)
         if load_options:
             self.modify_load_options(filters_dict, load_options)
             query = query.options(*load_options)
+        return query
+
+    def cacheable_id(
+        self, filters_dict: dict, load_options: Optional[Sequence[LoadOption]]
+    ) -> Optional[str]:
+        """The id a `get` can be served from the entity cache with, if any"""
+        if self.entity_cache is None or load_options is not None:
+            return None
+        if filters_dict.keys() != {"id"} or type(filters_dict["id"]) is not str:
+            return None
+        return filters_dict["id"]
+
+    def build_exists_query(self, id: str) -> Select:
+        query = select(self.model.id).filter_by(id=id).limit(1)
+        return self.label_query(query, "exists")
+
+    def setup_search_query(self, query: Select, search_vector: list) -> Select:
+        return query
+
+    def customize_query(self, query: Select, filters: dict) -> Select:
+        return query
+
+    def modify_load_options(
+        self, filters: dict, load_options: List[LoadOption]
+    ) -> None:
+        pass
+
 
-        return db.scalars(query.limit(1)).first()
+class ReadDao(BaseReadDao[ModelType], Generic[ModelType, Pagination]):
+    def get(
+        self: Union[Any, DaoInterface],
+        db: Session,
+        load_options: Optional[Sequence[LoadOption]] = None,
+        **filters: Any,
+    ) -> Optional[ModelType]:
+        filters_dict = parse_query_filters(filters)
+        cache_id = self.cacheable_id(filters_dict, load_options)
+        if cache_id is not None:
+            cached = self.entity_cache.get_many(db, self.model, [cache_id])
+            if cached:
+                return cached[cache_id]
+
+        query = self.build_query(filters_dict, label="get")
+        query = self.apply_load_options(query, filters_dict, load_options)
+
+        db_obj = db.scalars(query.limit(1)).first()
+        if cache_id is not None and db_obj is not None:
+            self.entity_cache.set_many([db_obj])
+        return db_obj
 
     def get_not_none(
         self,
@@ -424,26 +1226,16 @@ class ReadDao(Generic[ModelType, Pagination]):
         load_options: Optional[Sequence[LoadOption]] = None,
         filters: Optional[Union[FilterType, Dict[str, Any]]] = None,
         sorting_fields: Optional[Sequence[BaseSort]] = None,
+        fields: Optional[Mapping[str, Any]] = None,
     ) -> List[ModelType]:
-        sort_attrs = []
-        if sorting_fields:
-            sort_attrs = [sort_enum_to_str(field) for field in sorting_fields]
-
         filters_dict = parse_query_filters(filters)
-
-        query = select(self.model)
-        query = self.customize_query(query, filters_dict)
-        query = _create_filtered_query_from_query(
-            query=query, filters=filters_dict, sort_attrs=sort_attrs
+        query = self.build_query(
+            filters_dict, label="get_all", sorting_fields=sorting_fields
         )
-        load_options = list(load_options or self.load_options)
+        query = self.apply_load_options(query, filters_dict, load_options, fields)
 
-        # TODO: Check for the presence of raiseload before adding
-        load_options.append(raiseload("*", sql_only=True))
-        if load_options:
-            self.modify_load_options(filters_dict, load_options)
-            query = query.options(*load_options)
-        return db.scalars(query).unique().all()
+        with read_from_replica(db):
+            return db.scalars(query).unique().all()
 
     def get_all_in_chunks(
         self,
@@ -452,100 +1244,154 @@ class ReadDao(Generic[ModelType, Pagination]):
         filters: Optional[Union[FilterType, Dict[str, Any]]] = None,
         sorting_fields: Optional[Sequence[BaseSort]] = None,
         chunk: int = 500,
+        server_side_cursor: bool = False,
+        progress: Optional[ChunkProgress] = None,
     ) -> Generator[ModelType, None, None]:
-        sort_attrs = []
-        if sorting_fields:
-            sort_attrs = [sort_enum_to_str(field) for field in sorting_fields]
-
-        filters_dict = parse_query_filters(filters)
-
-        query = select(self.model)
-        query = self.customize_query(query, filters_dict)
-        query = _create_filtered_query_from_query(
-            query=query, filters=filters_dict, sort=False, sort_attrs=sort_attrs
+        """
+        Yields every matching object, `chunk` at a time.
+
+        By default each chunk is its own query windowed on the primary
+        key, which ignores `sorting_fields`. With `server_side_cursor`
+        the query runs once through a named cursor fetching `chunk` rows
+        per round trip, in the order of `sorting_fields`, on a separate
+        read-only snapshot connection: `db` can be committed meanwhile but
+        the yielded objects aren't attached to it. `progress` is updated
+        after every fetched chunk in that mode.
+
+        Unlike paginated reads and exports, scans read from the primary:
+        their callers often write based on what they read.
+        """
+        query = self.build_chunks_query(
+            parse_query_filters(filters), sorting_fields, stream=server_side_cursor
         )
-        if self.load_options:
-            load_options = list(self.load_options)
-            self.modify_load_options(filters_dict, load_options)
-            query = query.options(*load_options)
+        if server_side_cursor:
+            yield from _yield_cursor(
+                db.get_bind(), query, self.model, fetch_size=chunk, progress=progress
+            )
+            return
 
         for obj in _yield_limit(db, query, self.model.id, maxrq=chunk):
             yield obj
 
     def get_by_ids(self, db: Session, *, ids: List[str]) -> List[ModelType]:
-        query = select(self.model)
-        if self.load_options:
-            query = query.options(*self.load_options)
-        return db.scalars(query.where(self.model.id.in_(ids))).unique().all()
+        if self.entity_cache is None:
+            return db.scalars(self.build_get_by_ids_query(ids)).unique().all()
+
+        cached = self.entity_cache.get_many(db, self.model, ids)
+        missing = [id for id in ids if id not in cached]
+        if not missing:
+            return list(cached.values())
+
+        db_objs = db.scalars(self.build_get_by_ids_query(missing)).unique().all()
+        self.entity_cache.set_many(db_objs)
+        return list(cached.values()) + db_objs
+
+    def invalidate_cached(self, ids: Sequence[str]) -> None:
+        if self.entity_cache is not None:
+            self.entity_cache.invalidate(self.model, ids)
+        if self.typeahead_fields:
+            evict_typeahead(self.model.__tablename__)
 
     def get_multi_paginated(
         self,
         db: Session,
-        params: PaginationQueryParams,
+        params: Union[PaginationQueryParams, CursorPaginationQueryParams],
         filters: Optional[Union[FilterType, Dict[str, Any]]] = None,
         sorting_fields: Optional[Sequence[BaseSort]] = None,
         export: Optional[ExportParam] = None,
-    ) -> Union[AbstractPage[ModelType], List[ModelType]]:
-        sort_attrs = []
-        if sorting_fields:
-            sort_attrs = [sort_enum_to_str(field) for field in sorting_fields]
-
+        count_strategy: Optional[CountStrategy] = None,
+        export_serializer: Optional[Type[BaseModel]] = None,
+        export_chunk_size: int = 1000,
+        fields: Optional[Mapping[str, Any]] = None,
+    ) -> Union[AbstractPage[ModelType], List[ModelType], StreamingResponse]:
+        """
+        Pages through the matching objects. With `export` every object is
+        returned instead, streamed as NDJSON/CSV when `export_serializer`
+        is given. Only `fields` are loaded when given, see
+        `trim_load_options`, streamed exports trim to their export fields.
+        """
         filters_dict = parse_query_filters(filters)
-
-        query = select(self.model)
-
-        query = self.customize_query(query, filters_dict)
-        query = _create_filtered_query_from_query(
-            query=query,
-            filters=filters_dict,
-            sort_attrs=sort_attrs,
-            sorting_pk=self.sorting_pk,
+        order_columns: OrderColumns = []
+        query = self.build_query(
+            filters_dict,
+            label="get_multi_paginated",
+            sorting_fields=sorting_fields,
+            use_sorting_pk=True,
+            order_columns=order_columns,
         )
-        # In case it was changed
-        self.reset_sorting_pk()
         # We need to store the total_query for later use during counting
         total_query = query
+        include = None
+        if export and export_serializer:
+            include = get_export_include(export_serializer, export)
+            fields = fields or include
+
         if self.load_options:
             load_options = list(self.load_options)
             self.modify_load_options(filters_dict, load_options)
+            self.trim_load_options(load_options, fields)
             query = query.options(*load_options)
 
-        if export:
-            return db.scalars(query).unique().all()
-        else:
-            return paginate(db, query, total_query=total_query, params=params)
+        with read_from_replica(db):
+            if export and export_serializer:
+                writer = ExportWriter(
+                    export_serializer,
+                    export.export_format or ExportFormat.NDJSON,
+                    include,
+                )
+                return export_response(
+                    stream_query(db.get_bind(), query, writer, export_chunk_size),
+                    export,
+                    filename=self.model.__tablename__,
+                )
+            elif export:
+                return db.scalars(query).unique().all()
+            elif isinstance(params, CursorPaginationQueryParams):
+                return paginate_keyset(db, query, order_columns, params)
+            else:
+                return paginate(
+                    db,
+                    query,
+                    total_query=total_query,
+                    params=params,
+                    count_strategy=count_strategy or self.count_strategy,
+                )
 
     def search(
         self,
         db: Session,
         search_param: SearchParam,
-        pagination: PaginationQueryParams,
+        pagination: Union[PaginationQueryParams, CursorPaginationQueryParams],
         *,
         filters: Optional[Union[FilterType, Dict[str, Any]]] = None,
         sorting_fields: Optional[Sequence[BaseSort]] = None,
+        count_strategy: Optional[CountStrategy] = None,
+        fields: Optional[Mapping[str, Any]] = None,
+        order_by_rank: Optional[bool] = None,
+        headline: Optional[Sequence[str]] = None,
     ) -> AbstractPage[ModelType]:
-        sort_attrs = []
-        if sorting_fields:
-            sort_attrs = [sort_enum_to_str(field) for field in sorting_fields]
-
+        """
+        Pages through the objects matching `search_param`. With
+        `order_by_rank`, by default the dao's `search_order_by_rank`, the
+        most relevant come first. `headline` fills the model's
+        `search_headline` from the given columns.
+        """
+        if order_by_rank is None:
+            order_by_rank = self.search_order_by_rank
         filters_dict = parse_query_filters(filters)
-
-        query = select(self.model)
-        query = self.customize_query(query, filters_dict)
-        query = _create_filtered_query_from_query(
-            query=query,
-            filters=filters_dict,
-            sort_attrs=sort_attrs,
-            sorting_pk=self.sorting_pk,
+        order_columns: OrderColumns = []
+        query = self.build_query(
+            filters_dict,
+            label="search",
+            sorting_fields=sorting_fields,
+            use_sorting_pk=True,
+            order_columns=order_columns,
         )
-        # In case it was changed
-        self.reset_sorting_pk()
-
-        search_vector: List[Column] = []
-        query = self.setup_search_query(query, search_vector)
-
-        query = search(
-            query, search_param.q, search_vector[0] if search_vector else None
+        query = self.build_search_query(
+            query,
+            search_param,
+            order_columns=order_columns if order_by_rank else None,
+            headline=headline,
         )
 
         # We need to store the total_query for later use during counting
@@ -554,26 +1400,56 @@ class ReadDao(Generic[ModelType, Pagination]):
         if self.load_options:
             load_options = list(self.load_options)
             self.modify_load_options(filters_dict, load_options)
+            self.trim_load_options(load_options, fields)
             query = query.options(*load_options)
 
-        return paginate(db, query, total_query=total_query, params=pagination)
-
-    def setup_search_query(self, query: Select, search_vector: list) -> Select:
-        return query
+        with read_from_replica(db):
+            if isinstance(pagination, CursorPaginationQueryParams):
+                return paginate_keyset(db, query, order_columns, pagination)
+            return paginate(
+                db,
+                query,
+                total_query=total_query,
+                params=pagination,
+                count_strategy=count_strategy or self.count_strategy,
+            )
 
-    def customize_query(self, query: Select, filters: dict) -> Select:
-        return query
+    def typeahead(
+        self,
+        db: Session,
+        prefix: str,
+        *,
+        limit: int = 10,
+        fuzzy: bool = False,
+        filters: Optional[Union[FilterType, Dict[str, Any]]] = None,
+    ) -> TypeaheadResults:
+        """
+        Up to `limit` rows, as dicts of the id and `typeahead_columns`,
+        whose `typeahead_fields` start with `prefix`. With `fuzzy` words
+        similar to `prefix` match too, after the prefix matches.
+
+        Results are kept in the worker's `typeahead_cache` for
+        `TYPEAHEAD_CACHE_TTL` seconds. Updates and deletes through the dao
+        evict them, objects created meanwhile show up once they expire.
+        The returned dicts are shared, don't modify them.
+        """
+        prefix = normalize_prefix(prefix)
+        filters_dict = parse_query_filters(filters)
+        key = self.build_typeahead_key(prefix, filters_dict, limit, fuzzy)
+        if key is None:
+            return []
+
+        results = typeahead_cache.get(key)
+        if results is None:
+            query = self.build_typeahead_query(
+                filters_dict, prefix, limit=limit, fuzzy=fuzzy
+            )
+            results = [dict(row._mapping) for row in db.execute(query)]
+            typeahead_cache.set(key, results)
+        return results
 
     def exists(self, db: Session, id: str) -> bool:
-        return (
-            db.scalars(select(self.model.id).filter_by(id=id).limit(1)).first()
-            is not None
-        )
-
-    def modify_load_options(
-        self, filters: dict, load_options: List[LoadOption]
-    ) -> None:
-        pass
+        return db.scalars(self.build_exists_query(id)).first() is not None
 
 
 class CRUDDao(
@@ -589,7 +1465,12 @@ class CRUDDao(
         model: Type[ModelType],
         *,
         load_options: Optional[List[LoadOption]] = None,
+        stream_load_options: Optional[List[LoadOption]] = None,
         state_transition_graph: Optional[Dict[str, Sequence[str]]] = None,
+        count_strategy: Optional[CountStrategy] = None,
+        use_returning: bool = False,
+        entity_cache: Optional[EntityCache] = None,
+        search_order_by_rank: bool = False,
     ):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
@@ -598,9 +1479,25 @@ class CRUDDao(
 
         * `model`: A SQLAlchemy model class
         * `schema`: A Pydantic model (schema) class
+        * `stream_load_options`: Loader options of the scans streamed with
+          `yield_per`, which refuses joined eager loads of collections.
+          Defaults to `load_options`
+        * `count_strategy`: How paginated reads count their total
+        * `use_returning`: Populate created/updated objects from RETURNING
+          instead of selecting them again after the commit
+        * `entity_cache`: Serve `get(id=...)` and `get_by_ids` from a Redis
+          cache of rows, only for daos whose `customize_query` adds no criteria
+          and without `load_options`
+
+        * `search_order_by_rank`: Order `search` results by relevance
         """
         super(CRUDDao, self).__init__(
             model,
             load_options=load_options,
+            stream_load_options=stream_load_options,
+            count_strategy=count_strategy,
+            use_returning=use_returning,
+            entity_cache=entity_cache,
             state_transition_graph=state_transition_graph,
+            search_order_by_rank=search_order_by_rank,
         )
@@ -0,0 +1,342 @@
+import json
+import logging
+import threading
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Type,
+)
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from redis.exceptions import RedisError
+from sqlalchemy import Enum as EnumType
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.session import make_transient_to_detached
+
+from app.core.config import get_app_settings
+from app.core.settings import Settings
+from app.utils.cache import TTLCache
+
+if TYPE_CHECKING:
+    from app.db.base_class import Base
+
+logger = logging.getLogger(__name__)
+
+Decoder = Callable[[Any], Any]
+
+# Stored by `invalidate` in place of a row, reads treat it as a miss
+TOMBSTONE = b"-"
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Can't cache values of type {type(value)}")
+
+
+def _column_decoder(column: Any) -> Optional[Decoder]:
+    if isinstance(column.type, EnumType) and column.type.enum_class:
+        return column.type.enum_class
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return None
+
+    if python_type in (datetime, date, time):
+        return python_type.fromisoformat
+    if python_type in (Decimal, uuid.UUID):
+        return python_type
+    return None
+
+
+class BaseEntityCache(object):
+    """
+    Serializes model rows to JSON keyed by model and primary key. Only
+    column values are cached, so daos with load options can't use it.
+
+    `invalidate` replaces rows by a tombstone for `tombstone_ttl` seconds
+    and rows are only cached when their key is free. A read that missed
+    before a write committed can then not cache the old row afterwards,
+    unless it takes longer than `tombstone_ttl`.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: Optional[int] = None,
+        tombstone_ttl: Optional[int] = None,
+        prefix: str = "entity",
+    ) -> None:
+        settings = get_app_settings()
+        self.ttl = ttl if ttl is not None else settings.ENTITY_CACHE_TTL
+        self.tombstone_ttl = (
+            tombstone_ttl
+            if tombstone_ttl is not None
+            else settings.ENTITY_CACHE_TOMBSTONE_TTL
+        )
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._decoders: Dict[Type, Dict[str, Optional[Decoder]]] = {}
+
+    def key(self, model: "Type[Base]", id: Any) -> str:
+        return f"{self.prefix}:{model.__tablename__}:{id}"
+
+    def decoders(self, model: "Type[Base]") -> Dict[str, Optional[Decoder]]:
+        if model not in self._decoders:
+            self._decoders[model] = {
+                attr.key: _column_decoder(attr.columns[0])
+                for attr in inspect(model).column_attrs
+            }
+        return self._decoders[model]
+
+    def dumps(self, db_obj: "Base") -> Optional[str]:
+        """Returns None when a column isn't loaded, the row can't be cached"""
+        loaded = inspect(db_obj).dict
+        decoders = self.decoders(type(db_obj))
+        if any(key not in loaded for key in decoders):
+            return None
+        return json.dumps({key: loaded[key] for key in decoders}, default=_encode)
+
+    def loads(self, model: "Type[Base]", data: bytes) -> "Base":
+        values = json.loads(data)
+        db_obj = inspect(model).class_manager.new_instance()
+        for key, decoder in self.decoders(model).items():
+            value = values.get(key)
+            if value is not None and decoder is not None:
+                value = decoder(value)
+            set_committed_value(db_obj, key, value)
+        make_transient_to_detached(db_obj)
+        return db_obj
+
+    def record(self, hits: int, misses: int) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def record_error(self, error: Exception) -> None:
+        logger.warning("Entity cache unavailable: %s", error)
+        with self._lock:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+class EntityCache(BaseEntityCache):
+    """
+    Read-through cache of model rows in Redis. Any Redis error is counted
+    and treated as a miss, reads never fail because of the cache.
+    """
+
+    def __init__(self, client: Any, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.client = client
+
+    def get_many(
+        self, db: Session, model: "Type[Base]", ids: Sequence[Any]
+    ) -> Dict[Any, "Base"]:
+        """Returns the cached objects by id, merged in `db` without any SQL"""
+        if not ids:
+            return {}
+        try:
+            values = self.client.mget([self.key(model, id) for id in ids])
+        except RedisError as e:
+            self.record_error(e)
+            return {}
+
+        found = {
+            id: db.merge(self.loads(model, data), load=False)
+            for id, data in zip(ids, values)
+            if data is not None and data != TOMBSTONE
+        }
+        self.record(len(found), len(ids) - len(found))
+        return found
+
+    def set_many(self, db_objs: Iterable["Base"]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for db_obj in db_objs:
+            data = self.dumps(db_obj)
+            if data is not None:
+                pipe.set(self.key(type(db_obj), db_obj.id), data, ex=self.ttl, nx=True)
+        try:
+            pipe.execute()
+        except RedisError as e:
+            self.record_error(e)
+
+    def invalidate(self, model: "Type[Base]", ids: Iterable[Any]) -> None:
+        keys = [self.key(model, id) for id in ids]
+        if not keys:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.set(key, TOMBSTONE, ex=self.tombstone_ttl)
+        try:
+            pipe.execute()
+        except RedisError as e:
+            self.record_error(e)
+
+
+class AsyncEntityCache(BaseEntityCache):
+    """`EntityCache` for the async daos, needs an asyncio Redis client"""
+
+    def __init__(self, client: Any, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.client = client
+
+    async def get_many(
+        self, db: AsyncSession, model: "Type[Base]", ids: Sequence[Any]
+    ) -> Dict[Any, "Base"]:
+        if not ids:
+            return {}
+        try:
+            values = await self.client.mget([self.key(model, id) for id in ids])
+        except RedisError as e:
+            self.record_error(e)
+            return {}
+
+        found = {}
+        for id, data in zip(ids, values):
+            if data is not None and data != TOMBSTONE:
+                found[id] = await db.merge(self.loads(model, data), load=False)
+        self.record(len(found), len(ids) - len(found))
+        return found
+
+    async def set_many(self, db_objs: Iterable["Base"]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for db_obj in db_objs:
+            data = self.dumps(db_obj)
+            if data is not None:
+                pipe.set(self.key(type(db_obj), db_obj.id), data, ex=self.ttl, nx=True)
+        try:
+            await pipe.execute()
+        except RedisError as e:
+            self.record_error(e)
+
+    async def invalidate(self, model: "Type[Base]", ids: Iterable[Any]) -> None:
+        keys = [self.key(model, id) for id in ids]
+        if not keys:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.set(key, TOMBSTONE, ex=self.tombstone_ttl)
+        try:
+            await pipe.execute()
+        except RedisError as e:
+            self.record_error(e)
+
+
+class InMemoryRedis(object):
+    """
+    Stand-in for the few Redis commands the entity cache uses, for tests
+    and local runs without a Redis server.
+    """
+
+    def __init__(self, maxsize: int = 10000) -> None:
+        self.data: TTLCache[bytes] = TTLCache(maxsize=maxsize, ttl=float("inf"))
+
+    def get(self, name: str) -> Optional[bytes]:
+        return self.data.get(name)
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return [self.data.get(key) for key in keys]
+
+    def set(
+        self, name: str, value: Any, ex: Optional[int] = None, nx: bool = False
+    ) -> Optional[bool]:
+        if nx and self.data.get(name) is not None:
+            return None
+        if isinstance(value, str):
+            value = value.encode()
+        self.data.set(name, value, ttl=ex)
+        return True
+
+    def delete(self, *names: str) -> int:
+        return sum(self.data.pop(name) is not None for name in names)
+
+    def pipeline(self, transaction: bool = True) -> "_InMemoryPipeline":
+        return _InMemoryPipeline(self)
+
+
+class _InMemoryPipeline(object):
+    def __init__(self, client: InMemoryRedis) -> None:
+        self.client = client
+        self.commands: List[Callable[[], Any]] = []
+
+    def set(
+        self, name: str, value: Any, ex: Optional[int] = None, nx: bool = False
+    ) -> None:
+        self.commands.append(lambda: self.client.set(name, value, ex=ex, nx=nx))
+
+    def execute(self) -> List[Any]:
+        return [command() for command in self.commands]
+
+
+class AsyncInMemoryRedis(object):
+    """Asyncio flavour of `InMemoryRedis`"""
+
+    def __init__(self, maxsize: int = 10000) -> None:
+        self.sync = InMemoryRedis(maxsize)
+
+    async def get(self, name: str) -> Optional[bytes]:
+        return self.sync.get(name)
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return self.sync.mget(keys)
+
+    async def set(
+        self, name: str, value: Any, ex: Optional[int] = None, nx: bool = False
+    ) -> Optional[bool]:
+        return self.sync.set(name, value, ex=ex, nx=nx)
+
+    async def delete(self, *names: str) -> int:
+        return self.sync.delete(*names)
+
+    def pipeline(self, transaction: bool = True) -> "_AsyncInMemoryPipeline":
+        return _AsyncInMemoryPipeline(self.sync)
+
+
+class _AsyncInMemoryPipeline(_InMemoryPipeline):
+    async def execute(self) -> List[Any]:  # type: ignore [override]
+        return super().execute()
+
+
+def create_redis_client(settings: Optional[Settings] = None) -> Redis:
+    settings = settings or get_app_settings()
+    return Redis.from_url(
+        settings.REDIS_URI, socket_timeout=settings.REDIS_SOCKET_TIMEOUT
+    )
+
+
+def create_async_redis_client(settings: Optional[Settings] = None) -> AsyncRedis:
+    settings = settings or get_app_settings()
+    return AsyncRedis.from_url(
+        settings.REDIS_URI, socket_timeout=settings.REDIS_SOCKET_TIMEOUT
+    )
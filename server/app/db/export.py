@@ -0,0 +1,166 @@
+import csv
+import io
+import json
+from typing import (
+    Any,
+    AsyncGenerator,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_SINGLETON
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.db.fast_serializer import compile_serializer
+from app.db.serializer import ExportFormat, ExportParam, TrimHandler
+from app.db.session import READ_SNAPSHOT_OPTIONS
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def get_export_include(
+    serializer: Type[BaseModel], export: ExportParam
+) -> Optional[Mapping[str, Any]]:
+    """The `include` of the exported fields, None exports every field"""
+    if not export.export_fields:
+        return None
+    include = TrimHandler(
+        serializer, export.export_fields.split(",")
+    ).get_fields_to_return()
+    return include or None
+
+
+def export_columns(
+    serializer: Type[BaseModel], include: Optional[Mapping[str, Any]] = None
+) -> List[Tuple[str, ...]]:
+    """
+    The CSV columns of `serializer` trimmed to `include`, as field paths.
+    Nested models are flattened, lists and dicts stay one JSON column.
+    """
+    columns: List[Tuple[str, ...]] = []
+    for name, field in serializer.__fields__.items():
+        if include is not None and name not in include:
+            continue
+        if (
+            field.shape == SHAPE_SINGLETON
+            and isinstance(field.type_, type)
+            and issubclass(field.type_, BaseModel)
+        ):
+            nested = include.get(name) if include is not None else None
+            columns.extend(
+                (name,) + path
+                for path in export_columns(
+                    field.type_, nested if isinstance(nested, Mapping) else None
+                )
+            )
+        else:
+            columns.append((name,))
+    return columns
+
+
+def _column_value(row: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    val: Any = row
+    for key in path:
+        if not isinstance(val, dict):
+            return None
+        val = val.get(key)
+    if isinstance(val, (dict, list)):
+        return json.dumps(val)
+    return val
+
+
+class ExportWriter:
+    """
+    Serializes model objects chunk by chunk to NDJSON or CSV, through the
+    `CompiledSerializer` of the serializer. The CSV header comes from the
+    serializer, so every chunk has the same columns.
+    """
+
+    def __init__(
+        self,
+        serializer: Type[BaseModel],
+        export_format: ExportFormat,
+        include: Optional[Mapping[str, Any]] = None,
+    ) -> None:
+        self.serializer = serializer
+        self.export_format = export_format
+        self.include = include
+        self.columns = export_columns(serializer, include)
+        self.to_dict = compile_serializer(serializer, include)
+        self.header_written = False
+
+    def rows(self, db_objs: Iterable[Any]) -> Generator[Dict[str, Any], None, None]:
+        for db_obj in db_objs:
+            yield jsonable_encoder(self.to_dict(db_obj))
+
+    def write(self, db_objs: Iterable[Any]) -> bytes:
+        if self.export_format == ExportFormat.NDJSON:
+            return "".join(
+                json.dumps(row) + "\n" for row in self.rows(db_objs)
+            ).encode()
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not self.header_written:
+            writer.writerow([".".join(path) for path in self.columns])
+            self.header_written = True
+        for row in self.rows(db_objs):
+            writer.writerow([_column_value(row, path) for path in self.columns])
+        return buffer.getvalue().encode()
+
+
+def stream_query(
+    engine: Engine, query: Select, writer: ExportWriter, chunk_size: int
+) -> Generator[bytes, None, None]:
+    """
+    Runs `query` on its own read-only snapshot connection through a server
+    side cursor, only `chunk_size` objects are held at a time.
+    """
+    with engine.connect() as conn:
+        conn = conn.execution_options(**READ_SNAPSHOT_OPTIONS)
+        with Session(bind=conn, future=True) as db:
+            result = db.scalars(query.execution_options(yield_per=chunk_size))
+            for chunk in result.partitions():
+                yield writer.write(chunk)
+
+
+async def async_stream_query(
+    engine: AsyncEngine, query: Select, writer: ExportWriter, chunk_size: int
+) -> AsyncGenerator[bytes, None]:
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(**READ_SNAPSHOT_OPTIONS)
+        async with AsyncSession(bind=conn) as db:
+            result = await db.stream_scalars(
+                query.execution_options(yield_per=chunk_size)
+            )
+            async for chunk in result.partitions():
+                yield writer.write(chunk)
+
+
+def export_response(
+    content: Any, export: ExportParam, filename: str
+) -> StreamingResponse:
+    export_format = export.export_format or ExportFormat.NDJSON
+    return StreamingResponse(
+        content,
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.'
+            f'{export_format.value}"'
+        },
+    )
@@ -0,0 +1,198 @@
+from decimal import Decimal
+from functools import lru_cache
+from operator import attrgetter
+from typing import (
+    AbstractSet,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Type,
+    Union,
+)
+
+import orjson
+from fastapi.responses import JSONResponse
+from fastapi_pagination.bases import AbstractPage
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_SINGLETON, ModelField
+from sqlalchemy import inspect
+
+from app.db.utils import FrozenInclude, freeze_include, thaw_include
+
+Accessor = Callable[[Any], Any]
+
+
+def _attr_getter(field: ModelField) -> Accessor:
+    if field.required:
+        return attrgetter(field.alias)
+
+    name = field.alias
+    default = field.get_default()
+    return lambda obj: getattr(obj, name, default)
+
+
+def _unloaded(obj: Any) -> AbstractSet[str]:
+    """
+    The attributes of a persistent ORM object that were never loaded,
+    deferred or left to a lazy load. Expired attributes aren't, they
+    refresh on access.
+    """
+    state = inspect(obj, raiseerr=False)
+    if state is None or state.key is None:
+        return frozenset()
+    return state.unloaded - state.expired_attributes
+
+
+class _Field(NamedTuple):
+    name: str
+    key: str
+    accessor: Accessor
+    field: ModelField
+
+
+def _field_accessor(field: ModelField, include: Any) -> Accessor:
+    getter = _attr_getter(field)
+    if not (isinstance(field.type_, type) and issubclass(field.type_, BaseModel)):
+        return getter
+
+    sub_include = include if isinstance(include, Mapping) else None
+    if field.shape == SHAPE_SINGLETON:
+        nested = compile_serializer(field.type_, sub_include)
+
+        def get_one(obj: Any) -> Any:
+            value = getter(obj)
+            return nested(value) if value is not None else None
+
+        return get_one
+
+    nested = compile_serializer(
+        field.type_, sub_include.get("__all__") if sub_include else None
+    )
+
+    def get_many(obj: Any) -> Any:
+        values = getter(obj)
+        return [nested(value) for value in values] if values is not None else None
+
+    return get_many
+
+
+class CompiledSerializer(object):
+    """
+    Builds the `.dict()` of `serializer` straight from an ORM object, with
+    one accessor per included field and no validation. The data is trusted
+    to have the serializer's types already. Like `LazyAwareGetterDict`,
+    unloaded attributes aren't loaded: optional fields get their default.
+    Validators aren't run, serializers mirror the ones that change
+    values in a `fill_fast_defaults(data, obj)` classmethod.
+    """
+
+    def __init__(
+        self, serializer: Type[BaseModel], include: Optional[dict] = None
+    ) -> None:
+        self.serializer = serializer
+        self.fields: List[_Field] = [
+            _Field(
+                name,
+                field.alias,
+                _field_accessor(field, include and include[name]),
+                field,
+            )
+            for name, field in serializer.__fields__.items()
+            if include is None or include.get(name)
+        ]
+        self.fill_defaults: Optional[Callable[[dict, Any], None]] = getattr(
+            serializer, "fill_fast_defaults", None
+        )
+
+    def __call__(self, obj: Any) -> Dict[str, Any]:
+        unloaded = _unloaded(obj)
+        data = {}
+        for name, key, accessor, field in self.fields:
+            if key not in unloaded:
+                data[name] = accessor(obj)
+            elif field.required:
+                raise AttributeError(f"Attribute '{key}' is being lazily loaded.")
+            else:
+                data[name] = field.get_default()
+        if self.fill_defaults is not None:
+            self.fill_defaults(data, obj)
+        return data
+
+    def many(self, objs: Iterable[Any]) -> List[Dict[str, Any]]:
+        return [self(obj) for obj in objs]
+
+
+@lru_cache(maxsize=512)
+def _compile_serializer(
+    serializer: Type[BaseModel], include: Optional[FrozenInclude]
+) -> CompiledSerializer:
+    return CompiledSerializer(serializer, thaw_include(include))
+
+
+def compile_serializer(
+    serializer: Type[BaseModel], include: Optional[Mapping[str, Any]] = None
+) -> CompiledSerializer:
+    """The `CompiledSerializer` of `serializer`, built once per `include`"""
+    return _compile_serializer(serializer, freeze_include(include))
+
+
+def page_to_dict(
+    page: AbstractPage,
+    serializer: Type[BaseModel],
+    include: Optional[Mapping[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    `page` with its items serialized by `serializer`. `include` has the
+    shape `TrimHandler` gives for pages.
+    """
+    items_include = None
+    if include is not None:
+        items_include = (include.get("items") or {}).get("__all__")
+
+    items = compile_serializer(serializer, items_include).many(page.items)
+    return {
+        name: items if name == "items" else getattr(page, name)
+        for name in page.__fields__
+        if include is None or include.get(name)
+    }
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.dict()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson, for already serialized content"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def fast_response(
+    content: Union[AbstractPage, Any],
+    serializer: Type[BaseModel],
+    include: Optional[Mapping[str, Any]] = None,
+    status_code: int = 200,
+) -> FastJSONResponse:
+    """
+    Serializes a page, a list or a single ORM object through the fast path.
+    Returning the response from a route skips its `response_model`.
+    """
+    if isinstance(content, AbstractPage):
+        data: Any = page_to_dict(content, serializer, include)
+    elif isinstance(content, (list, tuple)):
+        data = compile_serializer(serializer, include).many(content)
+    else:
+        data = compile_serializer(serializer, include)(content)
+    return FastJSONResponse(data, status_code=status_code)
@@ -1,30 +1,40 @@
 import abc
 from enum import Enum
-from typing import Any, TypeVar
+from typing import Any, ClassVar, Dict, Tuple, Type, TypeVar
 
-from pydantic import BaseModel, root_validator
+from pydantic import BaseModel
 
 from app.db.serializer import ComplexFilter
-from app.db.utils import fields_list_to_dict
+
+_MISSING = object()
+
+
+def get_complex_filters(model: Type[BaseModel]) -> Dict[str, Tuple[str, ...]]:
+    """The `ComplexFilter` fields of `model` and their `allowed_fields`"""
+    complex_filters = {}
+    for key, val in model.__fields__.items():
+        if val.type_ == ComplexFilter:
+            allowed_fields = val.field_info.extra.get("allowed_fields", _MISSING)
+            if allowed_fields is _MISSING:
+                raise AttributeError("'allowed_fields' attribute is missing.")
+
+            if not isinstance(allowed_fields, list):
+                raise AttributeError("'allowed_fields' must be a list.")
+
+            complex_filters[key] = tuple(allowed_fields)
+    return complex_filters
 
 
 class BaseFilter(BaseModel, abc.ABC):
+    # Checked once per class rather than on every instantiation
+    __complex_filters__: ClassVar[Dict[str, Tuple[str, ...]]] = {}
+
     class Config:
         underscore_attrs_are_private = True
 
-    @root_validator(pre=True)
-    def validate_fields(cls, values: dict) -> dict:
-        for key, val in cls.__fields__.items():
-            if val.type_ == ComplexFilter:
-                if "allowed_fields" not in cls.schema()["properties"][key]:
-                    raise AttributeError("'allowed_fields' attribute is missing.")
-
-                if not isinstance(
-                    cls.schema()["properties"][key]["allowed_fields"], list
-                ):
-                    raise AttributeError("'allowed_fields' must be a list.")
-
-        return values
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super(BaseFilter, cls).__init_subclass__(**kwargs)
+        cls.__complex_filters__ = get_complex_filters(cls)
 
     def dict(
         self,
@@ -47,10 +57,13 @@ class BaseFilter(BaseModel, abc.ABC):
             exclude_none=exclude_none,
         )
 
-        for key, val in self.__fields__.items():
-            if val.type_ == ComplexFilter and key in data and data[key]:
-                chunks = [field.strip(" ") for field in data[key].split(",")]
-                data.update(fields_list_to_dict(chunks))
+        for key in self.__complex_filters__:
+            if key in data and data[key]:
+                value = getattr(self, key)
+                if not isinstance(value, ComplexFilter):
+                    # Defaults skip validation and may be plain strings
+                    value = ComplexFilter(value)
+                data.update(value.filters)
                 del data[key]
 
         for private_attr in self.__slots__:
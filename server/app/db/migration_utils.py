@@ -0,0 +1,63 @@
+"""
+Helpers for operations alembic's autogenerate doesn't write, call them
+from a revision's `upgrade()`/`downgrade()`.
+"""
+import logging
+from typing import Optional
+
+from alembic import context, op
+from app.db.typeahead import CREATE_TRIGRAM_EXTENSION, trigram_index_name
+from app.db.utils import relation_sizes
+
+logger = logging.getLogger("alembic.migration_utils")
+
+
+def create_trigram_index(
+    table: str,
+    column: str,
+    name: Optional[str] = None,
+    *,
+    concurrently: bool = False,
+) -> None:
+    """
+    Creates `pg_trgm` and a GIN trigram index of `table.column`. With
+    `concurrently` the index is built without locking writes, outside of
+    the migration's transaction.
+    """
+    op.execute(CREATE_TRIGRAM_EXTENSION)
+    kwargs = dict(
+        postgresql_using="gin",
+        postgresql_ops={column: "gin_trgm_ops"},
+    )
+    name = name or trigram_index_name(table, column)
+    if not concurrently:
+        op.create_index(name, table, [column], **kwargs)
+        return
+
+    with op.get_context().autocommit_block():
+        op.create_index(name, table, [column], postgresql_concurrently=True, **kwargs)
+
+
+def drop_trigram_index(
+    table: str,
+    column: str,
+    name: Optional[str] = None,
+    *,
+    concurrently: bool = False,
+) -> None:
+    """Drops the index of `create_trigram_index`, `pg_trgm` is left installed"""
+    name = name or trigram_index_name(table, column)
+    if not concurrently:
+        op.drop_index(name, table_name=table)
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def log_relation_sizes(table: str, label: str) -> None:
+    """Logs the size of `table` and its indexes, call it around a change to compare"""
+    if context.is_offline_mode():
+        return
+    for size in relation_sizes(op.get_bind(), table):
+        logger.info("%s (%s) %s %s: %s", table, label, size.kind, size.name, size.size)
@@ -1,31 +1,26 @@
 import operator as operators
-from typing import Any, Dict, Type
+from typing import Any, FrozenSet, Type
 
 from sqlalchemy import asc, desc, inspect
-from sqlalchemy.orm import RelationshipProperty
 from sqlalchemy.orm.util import AliasedClass
 from sqlalchemy.sql import operators as sql_operators
-from sqlalchemy_utils import get_columns
 
-from app.db.serializer import cs_str
+from app.db.model_registry import get_model_info
 from app.db.utils import (
     DESC_PREFIX,
     OPERATOR_SPLITTER,
     OPERATORS,
     classproperty,
+    cs_str,
     has_operator_splitter,
 )
 
 
 class InspectionMixin(object):
     @classproperty
-    def relations(cls) -> list:
-        """Return a `list` of relationship names or the given model"""
-        return [
-            c.key
-            for c in cls.__mapper__.iterate_properties  # type: ignore
-            if isinstance(c, RelationshipProperty)
-        ]
+    def relations(cls) -> FrozenSet[str]:
+        """Return the relationship names of the given model"""
+        return get_model_info(cls).relationships
 
 
 class FilterSortMixin(object):
@@ -71,5 +66,5 @@ class FilterSortMixin(object):
         return expressions
 
     @classmethod
-    def get_model_columns(cls) -> Dict[str, str]:
-        return get_columns(cls).keys()
+    def get_model_columns(cls) -> FrozenSet[str]:
+        return get_model_info(cls).columns
@@ -0,0 +1,55 @@
+from typing import Any, Dict, FrozenSet, NamedTuple, Tuple, Type
+
+from sqlalchemy import Column, inspect
+from sqlalchemy_searchable import inspect_search_vectors
+from sqlalchemy_utils import get_hybrid_properties
+
+
+class ModelInfo(NamedTuple):
+    """Mapper introspection of a model, computed once per model"""
+
+    columns: FrozenSet[str]
+    relationships: FrozenSet[str]
+    hybrids: FrozenSet[str]
+    primary_key: Tuple[str, ...]
+    search_vectors: Tuple[Column, ...]
+    # Columns `create` may insert and `update` may set
+    insertable: FrozenSet[str]
+    updatable: FrozenSet[str]
+
+
+_models: Dict[Type, ModelInfo] = {}
+
+
+def _inspect_model(model: Type) -> ModelInfo:
+    # Reading the relationships configures the mappers when needed
+    mapper = inspect(model)
+    relationships = frozenset(mapper.relationships.keys())
+    columns = frozenset(mapper.columns.keys())
+    hybrids = frozenset(get_hybrid_properties(model).keys())
+
+    return ModelInfo(
+        columns=columns,
+        relationships=relationships,
+        hybrids=hybrids,
+        primary_key=tuple(
+            mapper.get_property_by_column(column).key for column in mapper.primary_key
+        ),
+        search_vectors=tuple(inspect_search_vectors(model)),
+        insertable=columns - relationships,
+        updatable=columns - relationships - hybrids,
+    )
+
+
+def get_model_info(model: Type) -> ModelInfo:
+    try:
+        return _models[model]
+    except KeyError:
+        info = _models[model] = _inspect_model(model)
+        return info
+
+
+def register_models(base: Any) -> None:
+    """Builds the info of every model mapped by `base`, call after configure_mappers"""
+    for mapper in base.registry.mappers:
+        get_model_info(mapper.class_)
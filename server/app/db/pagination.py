@@ -1,19 +1,35 @@
+import base64
+import binascii
 import json
 import os
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from hashlib import md5
+from http import HTTPStatus
 from math import ceil
-from typing import Generic, Optional, Sequence, TypeVar, cast
+from typing import Any, Generic, List, Optional, Sequence, Tuple, TypeVar, cast
+from uuid import UUID
 
 from fastapi_pagination import Params, create_page, resolve_params
 from fastapi_pagination.bases import AbstractPage, AbstractParams, RawParams
 from fastapi_pagination.ext.sqlalchemy import paginate_query
 from pydantic import BaseModel, Field, conint
-from sqlalchemy import DDL, func, text
+from sqlalchemy import DDL, Column, and_, false, func, or_, text
+from sqlalchemy.engine import Row
 from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.future import select
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import Select
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from sqlalchemy.sql.visitors import InternalTraversal
 
-from app.db.session import get_session
+from app.core.config import get_app_settings
+from app.db.session import db_registry
+from app.exceptions.custom import HttpErrorException
+from app.utils.cache import TTLCache
 
 T = TypeVar("T")
 
@@ -29,18 +45,48 @@ class PaginationQueryParams(BaseModel, AbstractParams):
         return RawParams(limit=self.per_page, offset=(self.page - 1) * self.per_page)
 
 
+class CountStrategy(str, Enum):
+    """How `paginate` works out the `total` of a page"""
+
+    # SELECT count(*) on the same session as the page query
+    EXACT = "exact"
+    # count(*) OVER () added to the page query, a single round trip
+    WINDOW = "window"
+    # The planner's row estimate for the filtered query, from EXPLAIN
+    ESTIMATE = "estimate"
+    # Counts at most PAGINATION_COUNT_CAP rows, total is then a lower bound
+    CAPPED = "capped"
+    # EXACT, cached in process by the hash of the filtered query
+    CACHED = "cached"
+    # No count, the page query fetches one extra row to find the next page
+    NONE = "none"
+
+
 class Page(AbstractPage[T], Generic[T]):
     items: Sequence[T]
     total: conint(ge=0)  # type: ignore
     current_page: int
     next_page: int
     total_pages: int
+    count_strategy: CountStrategy = CountStrategy.EXACT
+    # Set when there are more rows than `total`, e.g. capped counts
+    total_is_lower_bound: bool = False
+    # Set when `total` is the planner's guess, `next_page` is still exact
+    total_is_estimate: bool = False
 
     __params_type__ = PaginationQueryParams
 
     @classmethod
     def create(
-        cls, items: Sequence[T], total: int, params: AbstractParams
+        cls,
+        items: Sequence[T],
+        total: int,
+        params: AbstractParams,
+        *,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+        total_is_lower_bound: bool = False,
+        total_is_estimate: bool = False,
+        has_next: Optional[bool] = None,
     ) -> "Page[T]":
         raw = params.to_raw_params()
         if raw.limit == 0:
@@ -50,10 +96,15 @@ class Page(AbstractPage[T], Generic[T]):
 
         current_page = int((raw.offset / raw.limit) + 1)
 
-        if current_page >= total_pages:
-            next_page = -1
-        else:
+        if has_next is None:
+            has_next = current_page < total_pages or (
+                total_is_lower_bound and current_page == total_pages
+            )
+
+        if has_next:
             next_page = current_page + 1
+        else:
+            next_page = -1
 
         return cls(
             items=items,
@@ -61,17 +112,339 @@ class Page(AbstractPage[T], Generic[T]):
             current_page=current_page,
             next_page=next_page,
             total_pages=total_pages,
+            count_strategy=count_strategy,
+            total_is_lower_bound=total_is_lower_bound,
+            total_is_estimate=total_is_estimate,
         )
 
 
+class CursorPaginationQueryParams(BaseModel, AbstractParams):
+    cursor: Optional[str] = None
+    per_page: int = 100
+
+    def to_raw_params(self) -> RawParams:
+        return RawParams(limit=self.per_page, offset=0)
+
+
+class CursorPage(AbstractPage[T], Generic[T]):
+    """
+    A page fetched by keyset pagination. There's no total or page number,
+    the client passes `next_cursor` back to get the following page.
+    """
+
+    items: Sequence[T]
+    next_cursor: Optional[str]
+    has_more: bool
+
+    __params_type__ = CursorPaginationQueryParams
+
+    @classmethod
+    def create(
+        cls,
+        items: Sequence[T],
+        total: int,
+        params: AbstractParams,
+        *,
+        next_cursor: Optional[str] = None,
+    ) -> "CursorPage[T]":
+        return cls(items=items, next_cursor=next_cursor, has_more=bool(next_cursor))
+
+
 Pagination = TypeVar("Pagination", bound=AbstractPage)
 
+# (column, is_desc) pairs as resolved by `_create_filtered_query_from_query`
+OrderColumns = List[Tuple[Column, bool]]
 
-def get_total_count(query: Select) -> int:
+
+def count_query(query: Select) -> Select:
     # Inspired from
     # https://gist.github.com/noviluni/d86adfa24843c7b8ed10c183a9df2afe
-    with get_session() as db:
-        return db.scalar(select(func.count()).select_from(query.subquery()))
+    return select(func.count()).select_from(query.order_by(None).subquery())
+
+
+def get_total_count(query: Select, db: Optional[Session] = None) -> int:
+    if db is not None:
+        return db.scalar(count_query(query))
+
+    with db_registry.session() as db:
+        return db.scalar(count_query(query))
+
+
+_count_cache: TTLCache[int] = TTLCache(maxsize=2048)
+
+
+def _count_cache_key(query: Select, dialect: Any) -> str:
+    compiled = query.compile(dialect=dialect)
+    params = sorted((key, repr(val)) for key, val in compiled.params.items())
+    return md5(bytes(f"{compiled}{params}", "utf-8")).hexdigest()
+
+
+class Explain(Executable, ClauseElement):
+    """`EXPLAIN (FORMAT JSON)` of a select, executed like any statement"""
+
+    _traverse_internals = [("statement", InternalTraversal.dp_clauseelement)]
+    inherit_cache = True
+
+    def __init__(self, statement: Select) -> None:
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element: Explain, compiler: Any, **kw: Any) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def _plan_rows(plan: Any) -> int:
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _invalid_cursor() -> HttpErrorException:
+    return HttpErrorException(
+        status_code=HTTPStatus.BAD_REQUEST,
+        error_code="INVALID CURSOR",
+        error_message="The pagination cursor is invalid",
+    )
+
+
+def _encode_cursor_value(value: Any) -> list:
+    if isinstance(value, datetime):
+        return ["dt", value.isoformat()]
+    if isinstance(value, date):
+        return ["d", value.isoformat()]
+    if isinstance(value, Decimal):
+        return ["dec", str(value)]
+    if isinstance(value, UUID):
+        return ["uuid", str(value)]
+    if isinstance(value, Enum):
+        value = value.value
+    if value is None or isinstance(value, (str, int, float)):
+        return ["v", value]
+    # Sorting by a column whose values can't round trip through JSON
+    raise _invalid_cursor()
+
+
+def _decode_cursor_value(value: list) -> Any:
+    tag, raw = value
+    if tag == "dt":
+        return datetime.fromisoformat(raw)
+    if tag == "d":
+        return date.fromisoformat(raw)
+    if tag == "dec":
+        return Decimal(raw)
+    if tag == "uuid":
+        return UUID(raw)
+    if tag == "v" and (raw is None or isinstance(raw, (str, int, float))):
+        return raw
+    raise ValueError(f"Invalid cursor value {value!r}")
+
+
+# Decoded values accepted for the python types of the sort columns
+_CURSOR_TYPES = {
+    int: (int,),
+    float: (int, float, Decimal),
+    Decimal: (int, float, Decimal),
+    datetime: (datetime,),
+    date: (date,),
+    UUID: (UUID,),
+}
+
+
+def _check_cursor_value(column: Column, value: Any) -> None:
+    """Refuses values that can't be compared with `column`"""
+    if value is None:
+        return
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return
+
+    if issubclass(python_type, Enum):
+        # Stored by value, see `_encode_cursor_value`
+        python_type(value)
+        return
+    if isinstance(value, bool) and python_type is not bool:
+        raise ValueError(f"Invalid cursor value for {column}")
+    if not isinstance(value, _CURSOR_TYPES.get(python_type, (python_type,))):
+        raise ValueError(f"Invalid cursor value for {column}")
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = json.dumps(
+        [_encode_cursor_value(val) for val in values], separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, columns: Sequence[Column]) -> List[Any]:
+    """
+    The values of `cursor`, checked against the sort `columns` so that a
+    forged cursor is refused here rather than failing in Postgres.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        # A cursor from a differently sorted listing can't be applied
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            raise _invalid_cursor()
+        values = [_decode_cursor_value(val) for val in payload]
+        for column, value in zip(columns, values):
+            _check_cursor_value(column, value)
+    except (ValueError, TypeError, binascii.Error):
+        raise _invalid_cursor()
+    return values
+
+
+def _is_nullable(column: Column) -> bool:
+    return getattr(column.expression, "nullable", True)
+
+
+def _after_expr(column: Column, is_desc: bool, value: Any) -> Any:
+    """
+    Rows that sort strictly after `value`. Postgres puts NULLs last on
+    ascending and first on descending sorts, which is mirrored here.
+    """
+    if value is None:
+        return false() if not is_desc else column.isnot(None)
+    if is_desc:
+        return column < value
+    if not _is_nullable(column):
+        return column > value
+    return or_(column > value, column.is_(None))
+
+
+def _equal_expr(column: Column, value: Any) -> Any:
+    return column.is_(None) if value is None else column == value
+
+
+def keyset_query(
+    query: Select, order_columns: OrderColumns, params: CursorPaginationQueryParams
+) -> Select:
+    """
+    Limits `query` to the rows following the params' cursor. The query must
+    already be sorted by `order_columns`, which have to end with a unique key.
+    """
+    if params.cursor:
+        values = decode_cursor(params.cursor, [column for column, _ in order_columns])
+        # (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ...
+        clauses = []
+        for i, (column, is_desc) in enumerate(order_columns):
+            equal = [_equal_expr(order_columns[j][0], values[j]) for j in range(i)]
+            clauses.append(and_(*equal, _after_expr(column, is_desc, values[i])))
+        query = query.where(or_(*clauses))
+
+        # Redundant bound on the leading sort key so that postgres can
+        # start an index range scan at the cursor instead of filtering.
+        column, is_desc = order_columns[0]
+        if values[0] is not None and not _is_nullable(column):
+            query = query.where(column <= values[0] if is_desc else column >= values[0])
+
+    labels = [
+        column.label(f"_cursor_{i}") for i, (column, _) in enumerate(order_columns)
+    ]
+    return query.add_columns(*labels).limit(params.per_page + 1)
+
+
+def create_cursor_page(
+    rows: Sequence[Row], params: CursorPaginationQueryParams
+) -> CursorPage:
+    has_more = len(rows) > params.per_page
+    rows = rows[: params.per_page]
+    next_cursor = encode_cursor(list(rows[-1][1:])) if has_more else None
+    return CursorPage.create(
+        [row[0] for row in rows], 0, params, next_cursor=next_cursor
+    )
+
+
+def paginate_keyset(
+    db: Session,
+    query: Select,
+    order_columns: OrderColumns,
+    params: CursorPaginationQueryParams,
+) -> CursorPage:
+    query = keyset_query(query, order_columns, params)
+    rows = db.execute(query).unique().all()
+    return create_cursor_page(rows, params)
+
+
+async def async_paginate_keyset(
+    db: AsyncSession,
+    query: Select,
+    order_columns: OrderColumns,
+    params: CursorPaginationQueryParams,
+) -> CursorPage:
+    query = keyset_query(query, order_columns, params)
+    rows = (await db.execute(query)).unique().all()
+    return create_cursor_page(rows, params)
+
+
+def _count(
+    db: Session, total_query: Select, strategy: CountStrategy
+) -> Tuple[int, bool]:
+    """Returns the total and whether it is a lower bound"""
+    if strategy == CountStrategy.CAPPED:
+        cap = get_app_settings().PAGINATION_COUNT_CAP
+        total = db.scalar(count_query(total_query.limit(cap + 1)))
+        return min(total, cap), total > cap
+
+    if strategy == CountStrategy.CACHED:
+        key = _count_cache_key(total_query, db.get_bind().dialect)
+        total = _count_cache.get(key)
+        if total is None:
+            total = db.scalar(count_query(total_query))
+            _count_cache.set(key, total, get_app_settings().PAGINATION_COUNT_CACHE_TTL)
+        return total, False
+
+    return db.scalar(count_query(total_query)), False
+
+
+async def _async_count(
+    db: AsyncSession, total_query: Select, strategy: CountStrategy
+) -> Tuple[int, bool]:
+    if strategy == CountStrategy.CAPPED:
+        cap = get_app_settings().PAGINATION_COUNT_CAP
+        total = await db.scalar(count_query(total_query.limit(cap + 1)))
+        return min(total, cap), total > cap
+
+    if strategy == CountStrategy.CACHED:
+        key = _count_cache_key(total_query, db.get_bind().dialect)
+        total = _count_cache.get(key)
+        if total is None:
+            total = await db.scalar(count_query(total_query))
+            _count_cache.set(key, total, get_app_settings().PAGINATION_COUNT_CACHE_TTL)
+        return total, False
+
+    return await db.scalar(count_query(total_query)), False
+
+
+def _estimated_page(
+    items: List[Any], estimate: int, params: AbstractParams
+) -> AbstractPage:
+    """
+    `items` were fetched with one extra row, so whether there is a next
+    page is known exactly. Only the total comes from the planner, and it
+    is exact when this is the last page.
+    """
+    raw = params.to_raw_params()
+    has_next = len(items) > raw.limit
+    items = items[: raw.limit]
+    seen = raw.offset + len(items)
+    if has_next:
+        total = max(estimate, seen + 1)
+    else:
+        total = seen
+    return Page.create(
+        items,
+        total,
+        params,
+        count_strategy=CountStrategy.ESTIMATE,
+        total_is_estimate=has_next,
+        has_next=has_next,
+    )
+
+
+def _window_page_query(query: Select) -> Select:
+    return query.add_columns(func.count().over().label("_total"))
 
 
 def paginate(
@@ -79,10 +452,106 @@ def paginate(
     query: Select,
     total_query: Optional[Select] = None,
     params: Optional[AbstractParams] = None,
+    count_strategy: Optional[CountStrategy] = None,
 ) -> AbstractPage:
     params = resolve_params(params)
+    strategy = CountStrategy(count_strategy or CountStrategy.EXACT)
+    raw = params.to_raw_params()
+    if total_query is None:
+        total_query = query
     query = paginate_query(query, params)
+
+    if strategy == CountStrategy.WINDOW:
+        rows = db.execute(_window_page_query(query)).unique().all()
+        items = [row[0] for row in rows]
+        if rows:
+            total = rows[0][1]
+        else:
+            # Past the last page the window has nothing to count over
+            total = db.scalar(count_query(total_query)) if raw.offset else 0
+        return Page.create(items, total, params, count_strategy=strategy)
+
+    if strategy == CountStrategy.ESTIMATE:
+        items = db.scalars(query.limit(raw.limit + 1)).unique().all()
+        plan = db.execute(Explain(total_query)).scalar()
+        return _estimated_page(items, _plan_rows(plan), params)
+
+    if strategy == CountStrategy.NONE:
+        result = db.scalars(query.limit(raw.limit + 1))
+        items = [item for item in result.unique().all()]
+        has_next = len(items) > raw.limit
+        items = items[: raw.limit]
+        return Page.create(
+            items,
+            raw.offset + len(items),
+            params,
+            count_strategy=strategy,
+            total_is_lower_bound=has_next,
+            has_next=has_next,
+        )
+
     result = db.scalars(query)
     items = [item for item in result.unique().all()]
-    total = get_total_count(query=total_query)
-    return Page.create(items, total, params)
+    total, is_lower_bound = _count(db, total_query, strategy)
+    return Page.create(
+        items,
+        total,
+        params,
+        count_strategy=strategy,
+        total_is_lower_bound=is_lower_bound,
+    )
+
+
+async def async_paginate(
+    db: AsyncSession,
+    query: Select,
+    total_query: Optional[Select] = None,
+    params: Optional[AbstractParams] = None,
+    count_strategy: Optional[CountStrategy] = None,
+) -> AbstractPage:
+    params = resolve_params(params)
+    strategy = CountStrategy(count_strategy or CountStrategy.EXACT)
+    raw = params.to_raw_params()
+    if total_query is None:
+        total_query = query
+    query = paginate_query(query, params)
+
+    if strategy == CountStrategy.WINDOW:
+        rows = (await db.execute(_window_page_query(query))).unique().all()
+        items = [row[0] for row in rows]
+        if rows:
+            total = rows[0][1]
+        else:
+            # Past the last page the window has nothing to count over
+            total = await db.scalar(count_query(total_query)) if raw.offset else 0
+        return Page.create(items, total, params, count_strategy=strategy)
+
+    if strategy == CountStrategy.ESTIMATE:
+        items = (await db.scalars(query.limit(raw.limit + 1))).unique().all()
+        plan = (await db.execute(Explain(total_query))).scalar()
+        return _estimated_page(items, _plan_rows(plan), params)
+
+    if strategy == CountStrategy.NONE:
+        result = await db.scalars(query.limit(raw.limit + 1))
+        items = [item for item in result.unique().all()]
+        has_next = len(items) > raw.limit
+        items = items[: raw.limit]
+        return Page.create(
+            items,
+            raw.offset + len(items),
+            params,
+            count_strategy=strategy,
+            total_is_lower_bound=has_next,
+            has_next=has_next,
+        )
+
+    result = await db.scalars(query)
+    items = [item for item in result.unique().all()]
+    total, is_lower_bound = await _async_count(db, total_query, strategy)
+    return Page.create(
+        items,
+        total,
+        params,
+        count_strategy=strategy,
+        total_is_lower_bound=is_lower_bound,
+    )
@@ -0,0 +1,191 @@
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+from sqlalchemy import func, select, tablesample
+from sqlalchemy.orm import Session, aliased
+
+from app.db.session import db_registry
+from app.db.utils import _yield_cursor, parse_query_filters
+
+if TYPE_CHECKING:
+    from app.db.base_class import Base
+    from app.db.dao import ReadDao
+    from app.db.filters import FilterType
+
+logger = logging.getLogger(__name__)
+
+ScanFn = Callable[[Session, List[Any]], Any]
+Reducer = Callable[[Any, Any], Any]
+Range = Tuple[Optional[Any], Optional[Any]]
+
+# Marks the absence of a result, never leaves the process
+_EMPTY: Any = object()
+
+# State of the scan in a worker process, set by `_init_worker`
+_scan: Dict[str, Any] = {}
+
+
+def sample_boundaries(
+    db: Session,
+    model: "Type[Base]",
+    key: str,
+    parts: int,
+    sample_percent: float = 1.0,
+) -> List[Any]:
+    """
+    Returns up to `parts - 1` values of `key` splitting the table in ranges
+    of about the same size, taken from a `TABLESAMPLE SYSTEM` of the table.
+    Tables too small to give a useful sample are read in full.
+    """
+    if parts < 2:
+        return []
+
+    sample = aliased(model, tablesample(model.__table__, func.system(sample_percent)))
+    column = getattr(sample, key)
+    values = db.scalars(select(column).order_by(column)).all()
+    if len(values) < parts:
+        column = getattr(model, key)
+        values = db.scalars(select(column).order_by(column)).all()
+    if not values:
+        return []
+
+    return sorted({values[len(values) * i // parts] for i in range(1, parts)})
+
+
+def _reduce(reducer: Optional[Reducer], acc: Any, result: Any) -> Any:
+    # Without a reducer the results are lists, concatenated
+    if result is _EMPTY:
+        return acc
+    if acc is _EMPTY:
+        return result
+    return reducer(acc, result) if reducer is not None else acc + result
+
+
+def _init_worker(
+    dao: "ReadDao",
+    filters_dict: dict,
+    fn: ScanFn,
+    reducer: Optional[Reducer],
+    key: str,
+    chunk: int,
+) -> None:
+    _scan.update(
+        dao=dao, filters=filters_dict, fn=fn, reducer=reducer, key=key, chunk=chunk
+    )
+
+
+def _scan_range(bounds: Range) -> Tuple[int, Any]:
+    """Returns the number of rows scanned and the reduced results"""
+    dao: "ReadDao" = _scan["dao"]
+    fn: ScanFn = _scan["fn"]
+    reducer: Optional[Reducer] = _scan["reducer"]
+    chunk: int = _scan["chunk"]
+    column = getattr(dao.model, _scan["key"])
+
+    query = dao.build_chunks_query(_scan["filters"], label="parallel_scan", stream=True)
+    lower, upper = bounds
+    if lower is not None:
+        query = query.where(column >= lower)
+    if upper is not None:
+        query = query.where(column < upper)
+
+    # The registry is fork aware, this process gets an engine of its own
+    start = time.perf_counter()
+    rows = 0
+    acc = _EMPTY
+    objs = _yield_cursor(db_registry.engine, query, dao.model, fetch_size=chunk)
+    with db_registry.session() as db:
+        for batch in iter(lambda: list(islice(objs, chunk)), []):
+            # The cursor's objects belong to its read-only session, `fn`
+            # gets copies in `db` so its changes are flushed by the commit
+            batch = [db.merge(obj, load=False) for obj in batch]
+            result = fn(db, batch)
+            db.commit()
+            acc = _reduce(reducer, acc, [result] if reducer is None else result)
+            rows += len(batch)
+
+    logger.info(
+        "Scanned %s range [%s, %s): %d rows in %.1fs",
+        dao.model.__tablename__,
+        lower,
+        upper,
+        rows,
+        time.perf_counter() - start,
+    )
+    return rows, acc if rows else None
+
+
+def parallel_scan(
+    dao: "ReadDao",
+    filters: Optional[Union["FilterType", Dict[str, Any]]],
+    fn: ScanFn,
+    workers: Optional[int] = None,
+    *,
+    reducer: Optional[Reducer] = None,
+    initial: Any = _EMPTY,
+    key: str = "id",
+    chunk: int = 500,
+    sample_percent: float = 1.0,
+) -> Any:
+    """
+    Runs `fn(db, objs)` over every object matching `filters`, `chunk`
+    objects at a time, in `workers` processes.
+
+    The `key` column (the primary key or `created_at`) is split in one
+    range per worker from sampled boundaries, each range is read through a
+    server side cursor by a process with its own engine. `db` is a session
+    of that process, committed after every chunk, and `objs` are merged in
+    it without any SQL so changes made to them are written.
+
+    With a `reducer` the results of `fn` are folded with it, within each
+    range and then across ranges, so it must be associative. Without one
+    the list of every result is returned.
+
+    Workers are forked so `fn`, `reducer` and the dao don't need to be
+    picklable, the results do. Run it from jobs and scripts, not from the
+    application's processes.
+    """
+    workers = workers or os.cpu_count() or 1
+    filters_dict = parse_query_filters(filters)
+    with db_registry.session() as db:
+        bounds: Sequence[Any] = sample_boundaries(
+            db, dao.model, key, workers, sample_percent
+        )
+
+    edges = [None, *bounds, None]
+    ranges: List[Range] = list(zip(edges, edges[1:]))
+    initargs = (dao, filters_dict, fn, reducer, key, chunk)
+
+    if len(ranges) == 1:
+        _init_worker(*initargs)
+        partials = [_scan_range(ranges[0])]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=len(ranges),
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+            initargs=initargs,
+        ) as pool:
+            partials = list(pool.map(_scan_range, ranges))
+
+    result = initial if reducer is not None else []
+    for rows, partial in partials:
+        if rows:
+            result = _reduce(reducer, result, partial)
+    return None if result is _EMPTY else result
@@ -1,7 +1,25 @@
 import re
+from bisect import bisect_left
 from datetime import datetime
+from enum import Enum
+from functools import lru_cache
 from http import HTTPStatus
-from typing import Any, Dict, Generator, List, Optional, Type, cast, get_origin
+from types import MappingProxyType
+from typing import (
+    Any,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Pattern,
+    Set,
+    Tuple,
+    Type,
+    cast,
+    get_origin,
+)
 
 from pydantic import Field, ValidationError, validator
 from pydantic.fields import ModelField
@@ -10,7 +28,7 @@ from pydantic.utils import GetterDict
 from sqlalchemy.exc import InvalidRequestError, MissingGreenlet
 
 from app.db.pagination import Page
-from app.db.utils import OPERATOR_SPLITTER, OPERATORS
+from app.db.utils import OPERATOR_SPLITTER, OPERATORS, cs_str  # noqa: F401
 from app.exceptions.custom import HttpErrorException
 from app.utils.fns import convert_utc_to_timezone_date
 
@@ -28,6 +46,15 @@ class LazyAwareGetterDict(GetterDict):
             raise AttributeError(f"Attribute '{key}' is being lazily loaded.")
 
 
+def fill_fast_timestamps(data: Dict[str, Any], obj: Any) -> None:
+    """The validators of the `InDB` serializers, for the fast serializer"""
+    if "created_at" in data:
+        data["created_at"] = convert_utc_to_timezone_date(data["created_at"])
+    if "updated_at" in data:
+        updated_at = data["updated_at"] or obj.created_at or datetime.now()
+        data["updated_at"] = convert_utc_to_timezone_date(updated_at)
+
+
 class TrimmableBaseModel(BaseModel):
     def __init__(self, **data: Any) -> None:
         try:
@@ -40,6 +67,10 @@ class TrimmableBaseModel(BaseModel):
 
     @classmethod
     def fields(cls) -> list:
+        return list(_flat_fields(cls))
+
+    @classmethod
+    def flatten_fields(cls) -> list:
         out = []
 
         def flatten(obj: Dict[str, ModelField], name: str = "") -> None:
@@ -76,6 +107,10 @@ class InDBBaseSerializer(BaseModel):
     def format_created_at_to_request_timezone(cls, created_at: datetime) -> datetime:
         return convert_utc_to_timezone_date(created_at)
 
+    @classmethod
+    def fill_fast_defaults(cls, data: Dict[str, Any], obj: Any) -> None:
+        fill_fast_timestamps(data, obj)
+
     class Config:
         orm_mode = True
         getter_dict = LazyAwareGetterDict
@@ -100,6 +135,10 @@ class TrimmableInDBBaseSerializer(TrimmableBaseModel):
     def format_created_at_to_request_timezone(cls, created_at: datetime) -> datetime:
         return convert_utc_to_timezone_date(created_at)
 
+    @classmethod
+    def fill_fast_defaults(cls, data: Dict[str, Any], obj: Any) -> None:
+        fill_fast_timestamps(data, obj)
+
     class Config:
         orm_mode = True
         getter_dict = LazyAwareGetterDict
@@ -138,28 +177,26 @@ class NameSerializer(BaseModel):
         getter_dict = LazyAwareGetterDict
 
 
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
 class ExportParam(BaseModel):
     get_export_fields: Optional[bool] = False
     export_fields: Optional[str] = ""
+    export_format: Optional[ExportFormat] = ExportFormat.NDJSON
 
 
-class cs_str(str):  # comma separated string
-    @classmethod
-    def __get_validators__(cls) -> Generator:
-        yield cls.validate
-
-    @classmethod
-    def validate(cls, v: Any) -> "cs_str":
-        if not isinstance(v, str):
-            raise TypeError("string required")
-
-        return cls(v)
-
-    def __repr__(self) -> str:
-        return f"cs_str({super().__repr__()})"
+class ComplexFilter(str):
+    """
+    Comma separated `field=value` filters, e.g. `name__ilike=a%,age__gt=3`.
+    Parsed once on validation, or on first use for unvalidated defaults,
+    the filters are kept in `filters`.
+    """
 
+    _filters: Optional[Dict[str, str]] = None
 
-class ComplexFilter(str):
     @classmethod
     def __get_validators__(cls) -> Generator:
         yield cls.validate
@@ -169,19 +206,35 @@ class ComplexFilter(str):
         if not isinstance(v, str):
             raise TypeError("string required")
 
+        complex_filter = cls(v)
+        complex_filter._filters = cls.parse(v)
+        return complex_filter
+
+    @staticmethod
+    def parse(v: str) -> Dict[str, str]:
+        filters = {}
         parts = [field.strip(" ") for field in v.split(",")]
         for part in parts:
             if "=" not in part:
                 raise ValueError("'=' must be present in field")
+            if part.count("=") > 1:
+                raise ValueError("'=' must be present only once in field")
 
-            if OPERATOR_SPLITTER in part:
-                field, value = part.split("=")
+            field, value = part.split("=")
+            if OPERATOR_SPLITTER in field:
                 field_name, op = field.split(OPERATOR_SPLITTER)
 
                 if op not in OPERATORS:
                     raise ValueError(f"'{op}' is not a valid operator")
 
-        return cls(v)
+            filters[field] = value
+        return filters
+
+    @property
+    def filters(self) -> Dict[str, str]:
+        if self._filters is None:
+            self._filters = self.parse(self)
+        return self._filters
 
     def __repr__(self) -> str:
         return f"ComplexFilter({super().__repr__()})"
@@ -199,14 +252,24 @@ def is_page_serializer(model: Type[BaseModel]) -> bool:
     return issubclass(model, Page)
 
 
-def get_trimmable_fields(model: Type[BaseModel]) -> list:
+@lru_cache(maxsize=None)
+def _flat_fields(model: Type[TrimmableBaseModel]) -> Tuple[str, ...]:
+    return tuple(model.flatten_fields())
+
+
+@lru_cache(maxsize=None)
+def _sorted_trimmable_fields(model: Type[BaseModel]) -> Tuple[str, ...]:
     if is_trimmable_serializer(model):
         if is_page_serializer(model):
-            return model.__fields__["items"].type_.fields()
+            return tuple(sorted(_flat_fields(model.__fields__["items"].type_)))
+
+        return tuple(sorted(_flat_fields(cast(Type[TrimmableBaseModel], model))))
 
-        return cast(TrimmableBaseModel, model).fields()
+    return ()
 
-    return []
+
+def get_trimmable_fields(model: Type[BaseModel]) -> list:
+    return list(_sorted_trimmable_fields(model))
 
 
 def fields_to_dict(fields: List[str]) -> dict:
@@ -254,33 +317,82 @@ def fields_to_dict(fields: List[str]) -> dict:
     return out
 
 
+# Requested field patterns without any of these are plain prefixes
+REGEX_CHARS = frozenset(".^$*+?{}[]\\|()")
+
+
+@lru_cache(maxsize=1024)
+def compile_field_pattern(pattern: str) -> Optional[Pattern]:
+    """The compiled `pattern`, None when it's a plain prefix"""
+    if not REGEX_CHARS.intersection(pattern):
+        return None
+    try:
+        return re.compile(pattern)
+    except re.error:
+        raise HttpErrorException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            error_code="INVALID REGEX",
+            error_message="INVALID REGEX ON {}".format(pattern),
+        )
+
+
+def match_fields(fields: Tuple[str, ...], pattern: str) -> Iterable[str]:
+    """The `fields`, sorted, that `re.match` the `pattern`"""
+    compiled = compile_field_pattern(pattern)
+    if compiled is not None:
+        return (field for field in fields if compiled.match(field))
+
+    # A plain prefix matches a contiguous run of the sorted fields
+    start = bisect_left(fields, pattern)
+    end = start
+    while end < len(fields) and fields[end].startswith(pattern):
+        end += 1
+    return fields[start:end]
+
+
+def _read_only(include: dict) -> Mapping[str, Any]:
+    return MappingProxyType(
+        {
+            key: _read_only(val) if isinstance(val, dict) else val
+            for key, val in include.items()
+        }
+    )
+
+
+@lru_cache(maxsize=1024)
+def _fields_to_return(
+    model: Type[BaseModel], patterns: Tuple[str, ...]
+) -> Mapping[str, Any]:
+    trimmable_fields = _sorted_trimmable_fields(model)
+    fields_to_return: Set[str] = set()
+    for pattern in patterns:
+        fields_to_return.update(match_fields(trimmable_fields, pattern))
+
+    if is_page_serializer(model):
+        include = {
+            "items": {"__all__": fields_to_dict(sorted(fields_to_return))},
+            "total": True,
+            "current_page": True,
+            "next_page": True,
+            "total_pages": True,
+            "count_strategy": True,
+            "total_is_lower_bound": True,
+            "total_is_estimate": True,
+        }
+    else:
+        include = fields_to_dict(sorted(fields_to_return))
+    return _read_only(include)
+
+
 class TrimHandler:
     def __init__(self, model: Type[BaseModel], fields: List[str]) -> None:
         self.fields = fields
         self.model = model
 
-    def get_fields_to_return(self) -> dict:
-        trimmable_fields = set(get_trimmable_fields(self.model))
-        fields_to_return = set()
-        for field in self.fields:
-            for field_from_serializer in trimmable_fields:
-                try:
-                    if re.match(field, field_from_serializer):
-                        fields_to_return.add(field_from_serializer)
-                except re.error:
-                    raise HttpErrorException(
-                        status_code=HTTPStatus.BAD_REQUEST,
-                        error_code="INVALID REGEX",
-                        error_message="INVALID REGEX ON {}".format(field),
-                    )
-
-        if is_page_serializer(self.model):
-            return {
-                "items": {"__all__": fields_to_dict(list(fields_to_return))},
-                "total": True,
-                "current_page": True,
-                "next_page": True,
-                "total_pages": True,
-            }
-        else:
-            return fields_to_dict(list(fields_to_return))
+    def get_fields_to_return(self) -> Mapping[str, Any]:
+        """
+        The `include` of the fields matching the requested patterns. It's
+        memoized by serializer and patterns and shared between callers,
+        so it's read only.
+        """
+        return _fields_to_return(self.model, tuple(sorted(set(self.fields))))
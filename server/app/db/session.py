@@ -1,42 +1,538 @@
-from typing import ContextManager, Optional
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import Enum
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Tuple, Union
 
+from sqlalchemy import create_engine, event
 from sqlalchemy.engine import Engine
-from sqlalchemy import create_engine
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm.session import Session
-from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app.core.config import get_app_settings
+from app.core.settings import Settings
 
 
-def get_engine() -> Engine:
-    settings = get_app_settings()
-
-    def debug_mode() -> bool:
-        return settings.APP_ENVIRONMENT == "debug"
-
-    return create_engine(
-        str(settings.SQLALCHEMY_DATABASE_URI),
-        future=True,
-        echo=debug_mode(),
-        pool_pre_ping=True,
-        pool_size=1000,
-        max_overflow=500,
-        connect_args={
-            "application_name": "app",
-            "options": "-c statement_timeout=10000 -c idle_in_transaction_session_timeout=60000",
+class PoolStats:
+    """
+    Counters for a connection pool. The pool itself only knows its
+    current state, so anything cumulative is tracked here.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_checkout(self, wait: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "total_wait_seconds": round(self.total_wait, 6),
+                "avg_wait_seconds": round(self.total_wait / attempts, 6)
+                if attempts
+                else 0.0,
+                "max_wait_seconds": round(self.max_wait, 6),
+            }
+
+
+# Long reads (exports, chunked scans) see one consistent snapshot and
+# can never write
+READ_SNAPSHOT_OPTIONS = {
+    "isolation_level": "REPEATABLE READ",
+    "postgresql_readonly": True,
+}
+
+
+class StatementCacheStats:
+    """
+    Compiled statement cache hits and misses per statement label. Daos
+    label their reads with the `statement_label` execution option, the
+    rest is reported as "other".
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, label: str, cache_hit: Any) -> None:
+        if cache_hit is CACHE_HIT:
+            outcome = "hits"
+        elif cache_hit is CACHE_MISS:
+            outcome = "misses"
+        else:
+            outcome = "uncached"
+
+        with self._lock:
+            counts = self.counts.setdefault(
+                label, {"hits": 0, "misses": 0, "uncached": 0}
+            )
+            counts[outcome] += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {}
+            for label, counts in sorted(self.counts.items()):
+                total = sum(counts.values())
+                stats[label] = dict(
+                    counts,
+                    hit_ratio=round(counts["hits"] / total, 4) if total else None,
+                )
+            return stats
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts.clear()
+
+
+statement_cache_stats = StatementCacheStats()
+
+
+def _record_statement_cache(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    if context is not None:
+        statement_cache_stats.record(
+            context.execution_options.get("statement_label", "other"),
+            context.cache_hit,
+        )
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super(InstrumentedQueuePool, self).__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            conn = super(InstrumentedQueuePool, self)._do_get()
+        except Exception:
+            self.stats.record_checkout(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record_checkout(time.perf_counter() - start)
+        return conn
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        # Engine.dispose() swaps the pool, keep the counters around
+        pool = super(InstrumentedQueuePool, self).recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    pass
+
+
+def get_pool_dimensions(settings: Settings) -> Tuple[int, int]:
+    """Return the (pool_size, max_overflow) of a single worker"""
+    pool_size = settings.DB_POOL_SIZE
+    max_overflow = settings.DB_MAX_OVERFLOW
+
+    if settings.DB_MAX_CONNECTIONS:
+        budget = max(settings.DB_MAX_CONNECTIONS // max(settings.WEB_CONCURRENCY, 1), 1)
+        pool_size = min(pool_size, budget)
+        max_overflow = min(max_overflow, budget - pool_size)
+
+    return pool_size, max_overflow
+
+
+def create_db_engine(
+    url: Optional[str] = None,
+    *,
+    settings: Optional[Settings] = None,
+    application_name: str = "app",
+    **kwargs: Any,
+) -> Engine:
+    settings = settings or get_app_settings()
+    pool_size, max_overflow = get_pool_dimensions(settings)
+
+    options = {
+        "future": True,
+        "echo": settings.APP_ENVIRONMENT == "debug",
+        "pool_pre_ping": True,
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "query_cache_size": settings.DB_QUERY_CACHE_SIZE,
+        "connect_args": {
+            "application_name": application_name,
+            "options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS} "
+            f"-c idle_in_transaction_session_timeout="
+            f"{settings.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS}",
+        },
+    }
+    options.update(kwargs)
+    engine = create_engine(str(url or settings.SQLALCHEMY_DATABASE_URI), **options)
+    event.listen(engine, "after_cursor_execute", _record_statement_cache)
+    return engine
+
+
+def create_async_db_engine(
+    url: Optional[str] = None,
+    *,
+    settings: Optional[Settings] = None,
+    application_name: str = "app",
+    **kwargs: Any,
+) -> AsyncEngine:
+    settings = settings or get_app_settings()
+    pool_size, max_overflow = get_pool_dimensions(settings)
+
+    options = {
+        "echo": settings.APP_ENVIRONMENT == "debug",
+        "pool_pre_ping": True,
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "query_cache_size": settings.DB_QUERY_CACHE_SIZE,
+        "connect_args": {
+            "server_settings": {
+                "application_name": application_name,
+                "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS),
+                "idle_in_transaction_session_timeout": str(
+                    settings.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS
+                ),
+            },
         },
+    }
+    options.update(kwargs)
+    engine = create_async_engine(
+        str(url or settings.ASYNC_SQLALCHEMY_DATABASE_URI), **options
     )
+    event.listen(engine.sync_engine, "after_cursor_execute", _record_statement_cache)
+    return engine
+
+
+class ReplicaBalancing(str, Enum):
+    ROUND_ROBIN = "round_robin"
+    # Fewest connections checked out of this worker's pools
+    LEAST_CONNECTIONS = "least_connections"
+
+
+class ReplicaSet:
+    """The read replica engines of a worker and how reads are spread over them"""
+
+    def __init__(self, engines: List[Engine], balancing: ReplicaBalancing) -> None:
+        self.engines = engines
+        self.balancing = ReplicaBalancing(balancing)
+        self._counter = itertools.count()
+
+    def pick(self) -> Engine:
+        if self.balancing is ReplicaBalancing.LEAST_CONNECTIONS:
+            return min(self.engines, key=lambda engine: engine.pool.checkedout())
+        return self.engines[next(self._counter) % len(self.engines)]
+
+    def pool_stats(self) -> List[Dict[str, Any]]:
+        return [
+            dict(_get_pool_stats(engine.pool), url=engine.url.render_as_string())
+            for engine in self.engines
+        ]
+
+
+class ReadRouting:
+    """
+    Replica routing state of the current request. Requests that wrote
+    recently are `pinned` to the primary, `wrote` is set by the request's
+    first write.
+    """
+
+    def __init__(self, pinned: bool = False) -> None:
+        self.pinned = pinned
+        self.wrote = False
+
+
+read_routing: ContextVar[Optional[ReadRouting]] = ContextVar(
+    "read_routing", default=None
+)
+
+
+def _is_write(clause: Any) -> bool:
+    if getattr(clause, "is_dml", False):
+        return True
+    # ORM statements wrapping an INSERT/UPDATE ... RETURNING
+    return getattr(getattr(clause, "element", None), "is_dml", False)
+
+
+class RoutingSession(Session):
+    """
+    Sends the statements of `read_from_replica` blocks to one of
+    `replicas`, picked once per session. Everything else goes to the
+    primary, and so does everything once the session or the current
+    request has written.
+    """
+
+    def __init__(
+        self, *args: Any, replicas: Optional[ReplicaSet] = None, **kwargs: Any
+    ) -> None:
+        super(RoutingSession, self).__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(
+        self, mapper: Any = None, clause: Any = None, **kwargs: Any
+    ) -> Union[Engine, Any]:
+        routing = read_routing.get()
+        if self._flushing or _is_write(clause):
+            self.info["wrote"] = True
+            if routing is not None:
+                routing.wrote = True
+        elif (
+            self.replicas is not None
+            and self.info.get("replica_reads")
+            and not self.info.get("wrote")
+            and not (routing is not None and (routing.pinned or routing.wrote))
+        ):
+            if "replica" not in self.info:
+                self.info["replica"] = self.replicas.pick()
+            return self.info["replica"]
+
+        return super(RoutingSession, self).get_bind(mapper, clause, **kwargs)
+
+
+@contextmanager
+def read_from_replica(db: Union[Session, AsyncSession]) -> Iterator[None]:
+    """Sends the reads of the block to a replica, if the session has any"""
+    session = getattr(db, "sync_session", db)
+    previous = session.info.get("replica_reads", False)
+    session.info["replica_reads"] = True
+    try:
+        yield
+    finally:
+        session.info["replica_reads"] = previous
+
+
+def _get_pool_stats(pool: Any) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(pool.stats.as_dict())
+    return stats
+
+
+class DatabaseRegistry:
+    """
+    Holds the engine and session factory of the current worker process.
+
+    `init` is called once on application startup and `dispose` on shutdown.
+    Scripts that run outside the application get a lazily created engine
+    on first use.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._engine: Optional[Engine] = None
+        self._replicas: Optional[ReplicaSet] = None
+        self._session_factory: Optional[sessionmaker] = None
+        self._pid: Optional[int] = None
+
+    def init(self) -> None:
+        with self._lock:
+            if self._engine is not None and self._pid == os.getpid():
+                return
+
+            if self._engine is not None:
+                # We were forked, the parent's connections must not be
+                # closed from here, just forgotten.
+                self._engine.dispose(close=False)
+                for engine in self._replicas.engines if self._replicas else []:
+                    engine.dispose(close=False)
+
+            settings = get_app_settings()
+            self._engine = create_db_engine(settings=settings)
+            self._replicas = None
+            if settings.SQLALCHEMY_REPLICA_URIS:
+                self._replicas = ReplicaSet(
+                    [
+                        create_db_engine(
+                            url, settings=settings, application_name="app-replica"
+                        )
+                        for url in settings.SQLALCHEMY_REPLICA_URIS
+                    ],
+                    ReplicaBalancing(settings.DB_REPLICA_BALANCING),
+                )
+            self._session_factory = sessionmaker(
+                class_=RoutingSession,
+                autocommit=False,
+                autoflush=False,
+                bind=self._engine,
+                future=True,
+                replicas=self._replicas,
+            )
+            self._pid = os.getpid()
+
+    def dispose(self) -> None:
+        with self._lock:
+            if self._engine is not None:
+                self._engine.dispose()
+            for engine in self._replicas.engines if self._replicas else []:
+                engine.dispose()
+            self._engine = None
+            self._replicas = None
+            self._session_factory = None
+            self._pid = None
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None or self._pid != os.getpid():
+            self.init()
+        return self._engine  # type: ignore [return-value]
+
+    @property
+    def session_factory(self) -> sessionmaker:
+        if self._session_factory is None or self._pid != os.getpid():
+            self.init()
+        return self._session_factory  # type: ignore [return-value]
+
+    def session(self) -> Session:
+        return self.session_factory()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        if self._engine is None:
+            return {}
+
+        stats = _get_pool_stats(self._engine.pool)
+        if self._replicas is not None:
+            stats["replicas"] = self._replicas.pool_stats()
+        return stats
+
+
+class AsyncDatabaseRegistry:
+    """
+    Async counterpart of `DatabaseRegistry`. Creating the engine does not
+    connect, so `init` stays synchronous, only disposing needs the loop.
+    """
+
+    def __init__(self) -> None:
+        self._engine: Optional[AsyncEngine] = None
+        self._replica_engines: List[AsyncEngine] = []
+        self._replicas: Optional[ReplicaSet] = None
+        self._session_factory: Optional[sessionmaker] = None
+
+    def init(self) -> None:
+        if self._engine is not None:
+            return
+
+        settings = get_app_settings()
+        self._engine = create_async_db_engine(settings=settings)
+        self._replica_engines = [
+            create_async_db_engine(
+                url, settings=settings, application_name="app-replica"
+            )
+            for url in settings.ASYNC_SQLALCHEMY_REPLICA_URIS
+        ]
+        self._replicas = None
+        if self._replica_engines:
+            # The session routes on the sync side, with the sync engines
+            self._replicas = ReplicaSet(
+                [engine.sync_engine for engine in self._replica_engines],
+                ReplicaBalancing(settings.DB_REPLICA_BALANCING),
+            )
+        self._session_factory = sessionmaker(
+            bind=self._engine,
+            class_=AsyncSession,
+            sync_session_class=RoutingSession,
+            autoflush=False,
+            expire_on_commit=False,
+            replicas=self._replicas,
+        )
+
+    async def dispose(self) -> None:
+        if self._engine is not None:
+            await self._engine.dispose()
+        for engine in self._replica_engines:
+            await engine.dispose()
+        self._engine = None
+        self._replica_engines = []
+        self._replicas = None
+        self._session_factory = None
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            self.init()
+        return self._engine  # type: ignore [return-value]
+
+    def session(self) -> AsyncSession:
+        if self._session_factory is None:
+            self.init()
+        return self._session_factory()  # type: ignore [misc]
+
+    def pool_stats(self) -> Dict[str, Any]:
+        if self._engine is None:
+            return {}
+
+        stats = _get_pool_stats(self._engine.sync_engine.pool)
+        if self._replicas is not None:
+            stats["replicas"] = self._replicas.pool_stats()
+        return stats
+
+
+def commit_without_expiring(db: Session) -> None:
+    """
+    Commits without expiring the session's objects, for callers that
+    already hold the committed state (e.g. from INSERT ... RETURNING)
+    and don't want it reloaded on the next attribute access.
+    """
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
+
+
+async def async_commit_without_expiring(db: AsyncSession) -> None:
+    expire_on_commit = db.sync_session.expire_on_commit
+    db.sync_session.expire_on_commit = False
+    try:
+        await db.commit()
+    finally:
+        db.sync_session.expire_on_commit = expire_on_commit
+
+
+db_registry = DatabaseRegistry()
+async_db_registry = AsyncDatabaseRegistry()
+
+
+def get_engine() -> Engine:
+    return db_registry.engine
 
 
 def get_session(engine: Optional[Engine] = None) -> ContextManager[Session]:
     if not engine:
-        engine = get_engine()
+        return db_registry.session()
 
-    session_factory = sessionmaker(
-        autocommit=False,
-        autoflush=False,
-        bind=engine,
-        future=True,
-    )
-    Session_ = scoped_session(session_factory)
-    return Session_()
+    return Session(bind=engine, autocommit=False, autoflush=False, future=True)
@@ -0,0 +1,98 @@
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import DDL, Column, Index, case, event, func, or_
+from sqlalchemy.sql import ColumnElement
+
+from app.core.config import get_app_settings
+from app.utils.cache import TTLCache
+
+CREATE_TRIGRAM_EXTENSION = "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+
+TypeaheadResults = List[Dict[str, Any]]
+
+settings = get_app_settings()
+
+# (table, prefix, ...) -> results, per worker. Hot prefixes, the first
+# letters typed, are answered from here without a round trip.
+typeahead_cache: TTLCache[TypeaheadResults] = TTLCache(
+    maxsize=settings.TYPEAHEAD_CACHE_SIZE, ttl=settings.TYPEAHEAD_CACHE_TTL
+)
+
+
+def trigram_index(column: Any, name: Optional[str] = None) -> Index:
+    """
+    A GIN `gin_trgm_ops` index of `column`, which serves `ILIKE` prefix and
+    substring matches as well as the `%>` word similarity of typeaheads.
+    Creating the table through the metadata creates `pg_trgm` first,
+    migrations use `create_trigram_index`.
+    """
+    table = column.table
+    event.listen(table, "before_create", DDL(CREATE_TRIGRAM_EXTENSION))
+    return Index(
+        name or trigram_index_name(table.name, column.name),
+        column,
+        postgresql_using="gin",
+        postgresql_ops={column.name: "gin_trgm_ops"},
+    )
+
+
+def trigram_index_name(table: str, column: str) -> str:
+    return f"idx_{table}_{column}_trgm"
+
+
+def normalize_prefix(prefix: str) -> str:
+    return " ".join(prefix.split()).lower()
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def prefix_match(column: Column, prefix: str) -> ColumnElement:
+    return column.ilike(f"{escape_like(prefix)}%")
+
+
+def fuzzy_match(column: Column, prefix: str) -> ColumnElement:
+    """True when `prefix` is similar to a word of `column`, typos included"""
+    return column.op("%>")(prefix)
+
+
+def typeahead_filter(
+    columns: Sequence[Column], prefix: str, fuzzy: bool = False
+) -> Tuple[ColumnElement, List[ColumnElement]]:
+    """
+    The where clause matching `prefix` in any of `columns` and the order of
+    the matches: prefix matches first, then the closest fuzzy matches.
+    """
+    prefix_matches = [prefix_match(column, prefix) for column in columns]
+    if not fuzzy:
+        return or_(*prefix_matches), list(columns)
+
+    scores = [func.word_similarity(prefix, column) for column in columns]
+    score = func.greatest(*scores) if len(scores) > 1 else scores[0]
+    fuzzy_matches = [fuzzy_match(column, prefix) for column in columns]
+    return or_(*prefix_matches, *fuzzy_matches), [
+        case((or_(*prefix_matches), 0), else_=1),
+        score.desc(),
+        *columns,
+    ]
+
+
+def typeahead_cache_key(
+    table: str,
+    fields: Sequence[str],
+    columns: Optional[Sequence[str]],
+    prefix: str,
+    fuzzy: bool,
+    limit: int,
+    filters: str,
+) -> Optional[Hashable]:
+    if len(prefix) < settings.TYPEAHEAD_MIN_LENGTH:
+        return None
+    columns = tuple(columns) if columns else None
+    return (table, tuple(fields), columns, prefix, fuzzy, limit, filters)
+
+
+def evict_typeahead(table: str) -> int:
+    """Drops the cached results of `table`, returns how many were dropped"""
+    return typeahead_cache.pop_where(lambda key, _: key[0] == table)
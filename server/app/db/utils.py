@@ -1,34 +1,46 @@
 import operator as operators_orig
 import re
+import time
 from collections import OrderedDict
 from datetime import date, datetime
+from functools import lru_cache
 from typing import (
     TYPE_CHECKING,
     Any,
     Callable,
     Dict,
+    FrozenSet,
     Generator,
     List,
+    Mapping,
+    NamedTuple,
     Optional,
+    Sequence,
+    Tuple,
     Type,
+    TypeVar,
     Union,
     cast,
 )
 
-from sqlalchemy import Column, Table, any_, func, or_
-from sqlalchemy.engine import Row
-from sqlalchemy.orm import Session, aliased
+from sqlalchemy import ARRAY, Column, Table, any_, bindparam, func, insert, or_, text
+from sqlalchemy.engine import Connection, Engine, Row
+from sqlalchemy.orm import Session, aliased, defaultload, load_only, raiseload
 from sqlalchemy.orm.util import AliasedClass
-from sqlalchemy.sql import Select, operators
+from sqlalchemy.sql import Insert, Select, operators
 from sqlalchemy.sql.elements import BooleanClauseList
 from sqlalchemy_utils import get_mapper
 
+from app.db.model_registry import get_model_info
+from app.db.session import READ_SNAPSHOT_OPTIONS
 from app.exceptions.custom import InvalidDateFormat
 
 if TYPE_CHECKING:
     from app.db.base_class import Base
     from app.db.filters import BaseSort, FilterType
 
+T = TypeVar("T")
+
 RELATION_SPLITTER = "___"
 OPERATOR_SPLITTER = "__"
 DESC_PREFIX = "-"
@@ -59,10 +71,27 @@ OPERATORS: Dict[str, Callable] = {
     "in": lambda c, v: c.in_(v),
     "notin": lambda c, v: c.notin_(v),
     "notin_or_isnull": lambda c, v: or_(c.notin_(v), c.is_(None)),
-    "any": lambda c, v: c == any_(func.array(v)),
+    # A single array parameter, so the statement doesn't change with len(v)
+    "any": lambda c, v: c == any_(bindparam(None, list(v), type_=ARRAY(c.type))),
 }
 
 
+class cs_str(str):  # comma separated string
+    @classmethod
+    def __get_validators__(cls) -> Generator:
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, v: Any) -> "cs_str":
+        if not isinstance(v, str):
+            raise TypeError("string required")
+
+        return cls(v)
+
+    def __repr__(self) -> str:
+        return f"cs_str({super().__repr__()})"
+
+
 def has_relation_splitter(val: str) -> bool:
     return re.search(rf"[a-z]+{RELATION_SPLITTER}[a-z]+", val) is not None
 
@@ -146,7 +175,19 @@ def _get_python_type_from_column(column: Column) -> type:
     return column.type.python_type
 
 
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_ISO_DATETIME = re.compile(r"\d{4}-\d{2}-\d{2}( \d{2}:\d{2})?")
+
+
 def _cast_to_datetime(val: str) -> datetime:
+    # Both supported formats are ISO, only odd inputs (like single digit
+    # months) need strptime
+    if _ISO_DATETIME.fullmatch(val):
+        try:
+            return datetime.fromisoformat(val)
+        except ValueError:
+            # Out of range values fail strptime too, reported below
+            pass
     try:
         return datetime.strptime(val, "%Y-%m-%d %H:%M")
     except ValueError:
@@ -160,6 +201,11 @@ def _cast_to_datetime(val: str) -> datetime:
 
 
 def _cast_to_date(val: str) -> date:
+    if _ISO_DATE.fullmatch(val):
+        try:
+            return date.fromisoformat(val)
+        except ValueError:
+            pass
     try:
         return datetime.strptime(val, "%Y-%m-%d").date()
     except ValueError:
@@ -181,37 +227,57 @@ def _cast_value_to_type(val: Any, _type: type) -> Any:
     return val
 
 
-def _add_filters_and_sort_to_query(
-    query: Select,
-    entity: "Type[Base]",
-    aliases: dict,
-    filters: dict,
-    sort_attrs: List[str],
-) -> Select:
-    """Adds filters and sort attributes to a query"""
-    for key, val in filters.items():
-        col1 = key
+class FilterPlan(NamedTuple):
+    """
+    Everything `_create_filtered_query_from_query` derives from the shape of
+    a filter (root entity, filter keys and sort attributes), so a request
+    only has to cast and bind its values.
+    """
 
-        if has_relation_splitter(col1):
-            parts = col1.rsplit(RELATION_SPLITTER, 1)
-            temp_entity, attr_name = aliases[parts[0]][0], parts[1]
-        else:
-            temp_entity, attr_name = entity, key
+    joins: List[Tuple[Any, Any]]
+    filters: List[Tuple[str, Any, Callable, Callable[[Any], Any]]]
+    order_by: List[Any]
+    order_columns: List[Tuple[Column, bool]]
+
+
+def _make_caster(_type: type) -> Callable[[Any], Any]:
+    if _type == str:
+        return lambda val: val
+    return lambda val: _cast_value_to_type(val, _type)
 
-        temp_name = attr_name
-        if has_operator_splitter(temp_name):
-            temp_name, _ = temp_name.rsplit(OPERATOR_SPLITTER, 1)
-        column = getattr(temp_entity, temp_name)
-        python_type = _get_python_type_from_column(column)
-        cast_value = _cast_value_to_type(val, python_type)
 
-        # if has_operator_splitter(key) and key != attr_name:
-        #     attr_name = key
+def _compile_filter(
+    entity: "Type[Base]", aliases: dict, key: str
+) -> Tuple[str, Any, Callable, Callable[[Any], Any]]:
+    if has_relation_splitter(key):
+        parts = key.rsplit(RELATION_SPLITTER, 1)
+        temp_entity, attr_name = aliases[parts[0]][0], parts[1]
+    else:
+        temp_entity, attr_name = entity, key
+
+    op: Callable = operators_orig.eq
+    if has_operator_splitter(attr_name):
+        attr_name, op_name = attr_name.rsplit(OPERATOR_SPLITTER, 1)
         try:
-            query = query.where(*temp_entity.filter_expr(**{attr_name: cast_value}))
+            op = OPERATORS[op_name]
         except KeyError as e:
-            raise KeyError(f"Incorrect filter path: `{col1}`: {e}")
+            raise KeyError(f"Incorrect filter path: `{key}`: {e}")
+
+    column = getattr(temp_entity, attr_name)
+    return key, column, op, _make_caster(_get_python_type_from_column(column))
+
+
+@lru_cache(maxsize=1024)
+def compile_filter_plan(
+    entity: "Type[Base]", filter_keys: Tuple[str, ...], sort_attrs: Tuple[str, ...]
+) -> FilterPlan:
+    attrs = list(filter_keys) + [attr.lstrip(DESC_PREFIX) for attr in sort_attrs]
+    aliases: OrderedDict[str, list] = OrderedDict({})
+    _parse_path_and_make_aliases(entity, "", attrs, aliases)
 
+    filters = [_compile_filter(entity, aliases, key) for key in filter_keys]
+
+    order_by, order_columns = [], []
     for attr in sort_attrs:
         if RELATION_SPLITTER in attr:
             prefix = ""
@@ -224,10 +290,50 @@ def _add_filters_and_sort_to_query(
             temp_entity, attr_name = entity, attr
 
         try:
-            query = query.order_by(*temp_entity.order_expr(attr_name))
+            order_by.extend(temp_entity.order_expr(attr_name))
         except KeyError as e:
             raise KeyError("Incorrect order path `{}`: {}".format(attr, e))
 
+        is_desc = attr_name.startswith(DESC_PREFIX)
+        order_columns.append(
+            (getattr(temp_entity, attr_name.lstrip(DESC_PREFIX)), is_desc)
+        )
+
+    return FilterPlan(
+        joins=[(al[0], al[1]) for al in aliases.values()],
+        filters=filters,
+        order_by=order_by,
+        order_columns=order_columns,
+    )
+
+
+def _add_filters_and_sort_to_query(
+    query: Select,
+    plan: FilterPlan,
+    filters: dict,
+    order_columns: Optional[List[Tuple[Column, bool]]] = None,
+) -> Select:
+    """
+    Binds the filter values to a compiled plan and adds its sort.
+    When `order_columns` is given it's filled with the resolved
+    (column, is_desc) pairs in sort order.
+    """
+    expressions = []
+    for key, column, op, caster in plan.filters:
+        cast_value = caster(filters[key])
+        if isinstance(cast_value, cs_str):
+            expressions.append(operators.in_op(column, cast_value.split(",")))
+        else:
+            expressions.append(op(column, cast_value))
+
+    if expressions:
+        query = query.where(*expressions)
+
+    if plan.order_by:
+        query = query.order_by(*plan.order_by)
+    if order_columns is not None:
+        order_columns.extend(plan.order_columns)
+
     return query
 
 
@@ -239,6 +345,7 @@ def _create_filtered_query_from_query(
     sort: bool = True,
     sorting_pk: Optional[str] = None,
     entity: Optional[Type["Base"]] = None,
+    order_columns: Optional[List[Tuple[Column, bool]]] = None,
 ) -> Select:
     if not sort_attrs:
         if sort:
@@ -253,27 +360,13 @@ def _create_filtered_query_from_query(
 
     if not entity:
         entity = _get_root_cls(query)
-    attrs = list(filters.keys()) + [attr.lstrip(DESC_PREFIX) for attr in sort_attrs]
-    aliases: OrderedDict[str, list] = OrderedDict({})
-    _parse_path_and_make_aliases(entity, "", attrs, aliases)
+    plan = compile_filter_plan(entity, tuple(filters), tuple(sort_attrs))
 
-    loaded_paths = []
     # Join necessary tables
-    for path, al in aliases.items():
-        relationship_path = path.replace(RELATION_SPLITTER, ".")
-        query = query.outerjoin(al[0], al[1])
-        loaded_paths.append(relationship_path)
-
-    # Add filters and sort attributes
-    query = _add_filters_and_sort_to_query(
-        query,
-        entity,
-        aliases,
-        filters,
-        sort_attrs,
-    )
+    for alias, relationship in plan.joins:
+        query = query.outerjoin(alias, relationship)
 
-    return query
+    return _add_filters_and_sort_to_query(query, plan, filters, order_columns)
 
 
 def strip_operator(string: str) -> str:
@@ -336,6 +429,187 @@ def filter_by_date(
     return query
 
 
+def sorting_fields_to_attrs(
+    sorting_fields: Optional[Sequence["BaseSort"]] = None,
+) -> List[str]:
+    if not sorting_fields:
+        return []
+    return [sort_enum_to_str(field) for field in sorting_fields]
+
+
+FrozenInclude = Tuple[Tuple[str, Any], ...]
+
+
+def freeze_include(include: Optional[Mapping[str, Any]]) -> Optional[FrozenInclude]:
+    """A hashable form of a pydantic `include` dict, to cache by it"""
+    if include is None:
+        return None
+    return tuple(
+        sorted(
+            (key, freeze_include(val) if isinstance(val, Mapping) else val)
+            for key, val in include.items()
+        )
+    )
+
+
+def thaw_include(include: Optional[FrozenInclude]) -> Optional[dict]:
+    if include is None:
+        return None
+    return {
+        key: thaw_include(val) if isinstance(val, tuple) else val
+        for key, val in include
+    }
+
+
+def _trim_options(model: "Type[Base]", fields: dict, path: Any) -> List[Any]:
+    info = get_model_info(model)
+    options: List[Any] = []
+
+    # Properties and hybrids may read any column, only trim the columns
+    # when every field maps to one
+    if all(key in info.columns or key in info.relationships for key in fields):
+        keys = {key for key in fields if key in info.columns and fields[key]}
+        # The primary key identifies the object and created_at stands in
+        # for a missing updated_at
+        keys.update(info.primary_key)
+        keys.update({"created_at"} & info.columns)
+        columns = [getattr(model, key) for key in sorted(keys)]
+        options.append(
+            path.load_only(*columns) if path is not None else load_only(*columns)
+        )
+
+    for key in sorted(info.relationships):
+        attr = getattr(model, key)
+        sub_fields = fields.get(key)
+        if not sub_fields:
+            options.append(
+                path.raiseload(attr, sql_only=True)
+                if path is not None
+                else raiseload(attr, sql_only=True)
+            )
+        elif isinstance(sub_fields, Mapping):
+            sub_fields = sub_fields.get("__all__", sub_fields)
+            options.extend(
+                _trim_options(
+                    attr.property.mapper.class_,
+                    sub_fields,
+                    path.defaultload(attr) if path is not None else defaultload(attr),
+                )
+            )
+    return options
+
+
+@lru_cache(maxsize=256)
+def _build_trim_load_options(
+    model: "Type[Base]", fields: FrozenInclude
+) -> Tuple[Any, ...]:
+    return tuple(_trim_options(model, thaw_include(fields) or {}, None))
+
+
+def build_trim_load_options(
+    model: "Type[Base]", fields: Mapping[str, Any]
+) -> Tuple[Any, ...]:
+    """
+    Load options that only select the columns of `model`, and of its
+    related models, that `fields` includes. `fields` is the include dict
+    `TrimHandler` gives for one object, relationships left out of it are
+    raiseloaded instead of eager loaded.
+    """
+    return _build_trim_load_options(model, freeze_include(fields))
+
+
+def insertable_columns(model: "Type[Base]") -> FrozenSet[str]:
+    return get_model_info(model).insertable
+
+
+def filter_create_values(
+    model: "Type[Base]", values: dict, columns: Optional[FrozenSet[str]] = None
+) -> dict:
+    """
+    Returns the subset of `values` that can be inserted as columns
+    of `model`, relationships and lists are left to `on_relationship`.
+    """
+    if columns is None:
+        columns = insertable_columns(model)
+
+    return {
+        key: val
+        for key, val in values.items()
+        if not (isinstance(val, list) or val is None or key not in columns)
+    }
+
+
+# asyncpg can bind at most 32767 parameters per statement
+MAX_BIND_PARAMS = 32767
+
+
+def chunked(items: Sequence[T], size: int) -> Generator[Sequence[T], None, None]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def group_rows_for_insert(
+    rows: List[dict], chunk_size: int = 1000
+) -> Generator[Tuple[Tuple[str, ...], Sequence[dict]], None, None]:
+    """
+    Groups `rows` by their keys, since a multi-row VALUES clause needs the
+    same columns on every row, and splits the groups in chunks of at most
+    `chunk_size` rows that stay under the bind parameter limit.
+    """
+    groups: "OrderedDict[Tuple[str, ...], List[dict]]" = OrderedDict()
+    for row in rows:
+        groups.setdefault(tuple(sorted(row.keys())), []).append(row)
+
+    for keys, group in groups.items():
+        size = max(min(chunk_size, MAX_BIND_PARAMS // max(len(keys), 1)), 1)
+        for chunk in chunked(group, size):
+            yield keys, chunk
+
+
+def build_insert_many(
+    table: Table, rows: List[dict], chunk_size: int = 1000
+) -> List[Insert]:
+    """Builds multi-row INSERT statements for `rows`"""
+    return [
+        insert(table).values(list(chunk))
+        for _, chunk in group_rows_for_insert(rows, chunk_size)
+    ]
+
+
+def filter_update_values(
+    model: "Type[Base]", values: dict, keep_none: bool = False
+) -> dict:
+    """
+    Returns the subset of `values` that can be updated as columns of
+    `model`, None values are dropped unless `keep_none`.
+    """
+    updatable = get_model_info(model).updatable
+    return {
+        key: val
+        for key, val in values.items()
+        if key in updatable and (keep_none or val is not None)
+    }
+
+
+def track_changed_values(db_obj: "Base", values: dict) -> Dict[str, Dict[str, Any]]:
+    """
+    Drops the values that are the same as the ones on `db_obj`
+    and returns a before/after summary of the ones that changed
+    """
+    changed: Dict[str, Dict[str, Any]] = {}
+    model_columns = get_model_info(type(db_obj)).columns
+    for key in list(values.keys()):
+        if key == "updated_at" or key not in model_columns:
+            continue
+
+        if values[key] == getattr(db_obj, key):
+            del values[key]
+        else:
+            changed[key] = {"before": getattr(db_obj, key), "after": values[key]}
+
+    return changed
+
+
 def sort_enum_to_str(sort_enum: "BaseSort") -> str:
     value = sort_enum.value
     aliases = sort_enum.get_aliases()
@@ -399,5 +673,108 @@ def _yield_limit(
             first_pk = rec_dict[pk_attr.name] if rec else None
 
 
+class ChunkProgress(object):
+    """
+    Progress of a chunked read, updated after every fetched chunk. `bytes`
+    is the on-disk size of the fetched rows as reported by Postgres.
+    """
+
+    def __init__(
+        self, callback: Optional[Callable[["ChunkProgress"], None]] = None
+    ) -> None:
+        self.callback = callback
+        self.rows = 0
+        self.bytes = 0
+        self.chunks = 0
+        self.started_at = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def record(self, rows: int, size: int) -> None:
+        self.rows += rows
+        self.bytes += size
+        self.chunks += 1
+        if self.callback is not None:
+            self.callback(self)
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = self.elapsed
+        return {
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "chunks": self.chunks,
+            "elapsed": round(elapsed, 3),
+            "rows_per_second": round(self.rows / elapsed) if elapsed else None,
+        }
+
+
+def with_row_size(qry: Select, entity: "Type[Base]") -> Select:
+    """Adds the size of the `entity` row as the last column of `qry`"""
+    return qry.add_columns(func.pg_column_size(entity.__table__.table_valued()))
+
+
+def _yield_cursor(
+    engine: Engine,
+    qry: Select,
+    entity: "Type[Base]",
+    fetch_size: int = 500,
+    progress: Optional[ChunkProgress] = None,
+) -> Generator:
+    """
+    Reads `qry` through one named server side cursor, fetching `fetch_size`
+    rows per round trip.
+
+    The cursor runs on its own read-only snapshot connection, the caller's
+    session stays free to commit while iterating. The yielded objects
+    belong to that private session and are detached once the generator
+    is exhausted or closed.
+    """
+    with engine.connect() as conn:
+        conn = conn.execution_options(**READ_SNAPSHOT_OPTIONS)
+        with Session(bind=conn, future=True) as db:
+            # Row sizes cost a pg_column_size per row, only taken for `progress`
+            if progress is not None:
+                qry = with_row_size(qry, entity)
+            result = db.execute(qry.execution_options(yield_per=fetch_size))
+            for partition in result.partitions():
+                if progress is not None:
+                    progress.record(len(partition), sum(row[-1] for row in partition))
+                for row in partition:
+                    yield row[0]
+
+
+class RelationSize(NamedTuple):
+    name: str
+    kind: str
+    bytes: int
+    size: str
+
+
+RELATION_SIZES_SQL = text(
+    """
+    SELECT name, kind, bytes, pg_size_pretty(bytes) AS size FROM (
+        SELECT relname AS name, 'table' AS kind, pg_relation_size(oid) AS bytes
+        FROM pg_class WHERE oid = to_regclass(:table)
+        UNION ALL
+        SELECT indexrelid::regclass::text, 'index', pg_relation_size(indexrelid)
+        FROM pg_index WHERE indrelid = to_regclass(:table)
+        UNION ALL
+        SELECT relname, 'total', pg_total_relation_size(oid)
+        FROM pg_class WHERE oid = to_regclass(:table)
+    ) AS sizes
+    """
+)
+
+
+def relation_sizes(conn: Union[Connection, Session], table: str) -> List[RelationSize]:
+    """On disk size of `table`, of each of its indexes and the total with TOAST"""
+    return [
+        RelationSize(row.name, row.kind, row.bytes, row.size)
+        for row in conn.execute(RELATION_SIZES_SQL, {"table": table})
+    ]
+
+
 def dict_to_colon_str(d: dict) -> str:
     return ":".join([f"{key}:{d[key]}" for key in sorted(d.keys())])
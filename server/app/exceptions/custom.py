@@ -26,3 +26,8 @@ class DaoException(Exception):
 class InvalidStateException(Exception):
     def __init__(self, message: str) -> None:
         self.message = message
+
+
+class ServiceOverloadedException(Exception):
+    def __init__(self, message: str) -> None:
+        self.message = message
@@ -1,14 +1,29 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import APIRouter, FastAPI
 
 from app.app.api_v1 import api_router as v1_api_router
-
+from app.auth.reaper import token_reaper
+from app.core.config import get_app_settings
+from app.core.hashing import password_hasher
+from app.core.middleware import pin_writers_to_primary
+from app.db.session import async_db_registry, db_registry
 
 router = APIRouter()
 router.include_router(v1_api_router)
 
 
 def get_application() -> FastAPI:
-    app = FastAPI(title="UNICN SERVER")
+    app = FastAPI(
+        title="UNICN SERVER",
+        on_startup=[db_registry.init, async_db_registry.init, token_reaper.start],
+        on_shutdown=[
+            db_registry.dispose,
+            async_db_registry.dispose,
+            password_hasher.shutdown,
+            token_reaper.stop,
+        ],
+    )
+    if get_app_settings().SQLALCHEMY_REPLICA_URIS:
+        app.middleware("http")(pin_writers_to_primary)
     app.include_router(router)
     return app
 
@@ -3,7 +3,7 @@ import logging
 from sqlalchemy import text
 from tenacity import after_log, before_log, retry, stop_after_attempt, wait_fixed
 
-from app.db.session import get_session
+from app.db.session import db_registry
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,7 +20,7 @@ wait_seconds = 1
 )
 def init() -> None:
     try:
-        with get_session() as db:
+        with db_registry.session() as db:
             # Try to create session to check if DB is awake
             db.execute(text("SELECT 1"))
 
@@ -32,6 +32,7 @@ def init() -> None:
 def main() -> None:
     logger.info("Initializing service")
     init()
+    db_registry.dispose()
     logger.info("Service finished initializing")
 
 
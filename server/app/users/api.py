@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.core import deps
+from app.core.config import get_app_settings
+from app.db.fast_serializer import FastJSONResponse
+from app.users.dao import user_dao
+
+router = APIRouter()
+
+settings = get_app_settings()
+
+
+@router.get("/users/typeahead")
+def typeahead_users(
+    db: Session = Depends(deps.get_db),
+    _: str = Depends(deps.get_current_active_user_id),
+    *,
+    q: str = Query(..., max_length=100),
+    limit: int = Query(10, ge=1, le=settings.TYPEAHEAD_MAX_LIMIT),
+    fuzzy: bool = False,
+) -> FastJSONResponse:
+    return FastJSONResponse(user_dao.typeahead(db, q, limit=limit, fuzzy=fuzzy))
@@ -1,6 +1,6 @@
 from typing import Optional
 
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash, verify_and_update_password
 from app.db.dao import CRUDDao
 from app.users.models import User
 from sqlalchemy.orm import Session
@@ -8,6 +8,8 @@ from app.users.serializer import UserCreateSerializer, UserUpdateSerializer, Use
 
 
 class UserDao(CRUDDao[User, UserCreateSerializer, UserUpdateSerializer]):
+    typeahead_fields = ("name",)
+
     def register(self, db: Session, obj_in: UserRegistrationSerializer) -> User:
         if obj_in.password:
             hashed_password = get_password_hash(obj_in.password)
@@ -25,10 +27,14 @@ class UserDao(CRUDDao[User, UserCreateSerializer, UserUpdateSerializer]):
         user = self.get(
             db, email=email
         )
-        if not user:
+        if not user or not user.hashed_password:
             return None
-        if not verify_password(password, user.hashed_password):
+        is_valid, new_hash = verify_and_update_password(password, user.hashed_password)
+        if not is_valid:
             return None
+        if new_hash:
+            # Hashed with an outdated cost, upgrade it while we have the password
+            user = self.update(db, db_obj=user, obj_in={"hashed_password": new_hash})
         return user
 
 
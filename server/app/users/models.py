@@ -1,4 +1,5 @@
 from app.db.base_class import Base
+from app.db.typeahead import trigram_index
 from sqlalchemy import Column, String
 
 
@@ -8,3 +9,7 @@ class User(Base):
     name = Column(String(100), nullable=True)
     email = Column(String(100), nullable=False)
     hashed_password = Column(String, nullable=True)
+
+
+# Backs the users typeahead and `contains`/`istartswith` name filters
+trigram_index(User.name)
@@ -0,0 +1,80 @@
+"""
+Compares UserDao.create in a loop against UserDao.create_many.
+
+Needs a migrated database, run from the server directory:
+
+    PYTHONPATH=. python scripts/bench_create_many.py --rows 5000
+"""
+import argparse
+import time
+import uuid
+from typing import Callable, List
+
+from dotenv import find_dotenv, load_dotenv
+
+load_dotenv(find_dotenv(".env.local"))
+
+from sqlalchemy import delete  # noqa: E402
+
+from app.db.base import Base  # noqa: E402,F401
+from app.db.session import db_registry  # noqa: E402
+from app.users.dao import user_dao  # noqa: E402
+from app.users.models import User  # noqa: E402
+from app.users.serializer import UserCreateSerializer  # noqa: E402
+
+
+def make_users(n: int, tag: str) -> List[UserCreateSerializer]:
+    return [
+        UserCreateSerializer(name=f"bench {i}", email=f"{tag}-{i}@bench.unicn.app")
+        for i in range(n)
+    ]
+
+
+def timed(label: str, rows: int, fn: Callable[[], None]) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {rows:>8} rows  {elapsed:8.3f}s  {rows / elapsed:10.0f} rows/s")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    tag = uuid.uuid4().hex[:8]
+    try:
+        with db_registry.session() as db:
+            users = make_users(args.rows, f"{tag}-loop")
+            loop = timed(
+                "create (per row loop)",
+                args.rows,
+                lambda: [user_dao.create(db, obj_in=user) for user in users],
+            )
+
+        with db_registry.session() as db:
+            users = make_users(args.rows, f"{tag}-bulk")
+            bulk = timed(
+                f"create_many (chunk={args.chunk_size})",
+                args.rows,
+                lambda: user_dao.create_many(
+                    db, objs_in=users, chunk_size=args.chunk_size
+                ),
+            )
+
+        print(f"speedup: {loop / bulk:.1f}x")
+    finally:
+        with db_registry.session() as db:
+            db.execute(
+                delete(User)
+                .where(User.email.like(f"{tag}-%"))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        db_registry.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Compares the peak traced memory of exporting users as NDJSON from a list,
+serialized at once, against the streamed export of `get_multi_paginated`.
+
+Needs a migrated database, run from the server directory:
+
+    PYTHONPATH=. python scripts/bench_export.py --rows 20000
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+import uuid
+from typing import Callable, List
+
+from dotenv import find_dotenv, load_dotenv
+
+load_dotenv(find_dotenv(".env.local"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from sqlalchemy import delete  # noqa: E402
+from tabulate import tabulate  # noqa: E402
+
+from app.db.base import Base  # noqa: E402,F401
+from app.db.pagination import PaginationQueryParams  # noqa: E402
+from app.db.serializer import ExportFormat, ExportParam  # noqa: E402
+from app.db.session import db_registry  # noqa: E402
+from app.users.dao import user_dao  # noqa: E402
+from app.users.models import User  # noqa: E402
+from app.users.serializer import UserCreateSerializer, UserSerializer  # noqa: E402
+
+
+def legacy_export(tag: str) -> int:
+    with db_registry.session() as db:
+        users = user_dao.get_multi_paginated(
+            db,
+            PaginationQueryParams(),
+            filters={"email__like": f"{tag}-%"},
+            export=ExportParam(export_format=ExportFormat.NDJSON),
+        )
+        body = "".join(
+            json.dumps(jsonable_encoder(UserSerializer.from_orm(user))) + "\n"
+            for user in users
+        )
+        return len(body.encode())
+
+
+def streamed_export(tag: str) -> int:
+    async def consume() -> int:
+        with db_registry.session() as db:
+            response = user_dao.get_multi_paginated(
+                db,
+                PaginationQueryParams(),
+                filters={"email__like": f"{tag}-%"},
+                export=ExportParam(export_format=ExportFormat.NDJSON),
+                export_serializer=UserSerializer,
+            )
+            size = 0
+            async for chunk in response.body_iterator:
+                size += len(chunk)
+            return size
+
+    return asyncio.run(consume())
+
+
+def measure(fn: Callable[[], int]) -> List[float]:
+    """Bytes exported, peak traced MB and seconds"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return [size / 1e6, peak / 1e6, elapsed]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    tag = uuid.uuid4().hex[:8]
+    try:
+        with db_registry.session() as db:
+            user_dao.create_many(
+                db,
+                objs_in=[
+                    UserCreateSerializer(
+                        name=f"bench {i}", email=f"{tag}-{i}@bench.unicn.app"
+                    )
+                    for i in range(args.rows)
+                ],
+            )
+
+        results = [
+            ["list"] + measure(lambda: legacy_export(tag)),
+            ["stream"] + measure(lambda: streamed_export(tag)),
+        ]
+        print(
+            tabulate(
+                results,
+                headers=["export", "body MB", "peak MB", "seconds"],
+                floatfmt=".2f",
+            )
+        )
+    finally:
+        with db_registry.session() as db:
+            db.execute(
+                delete(User)
+                .where(User.email.like(f"{tag}-%"))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        db_registry.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compares FastAPI's default response path for a `Page[UserSerializer]`
+(validation, jsonable_encoder, stdlib json) against `fast_response`.
+
+No database is needed, the users are built in memory. From the server
+directory:
+
+    PYTHONPATH=. python scripts/bench_fast_response.py --repeat 200
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, List
+
+from dotenv import find_dotenv, load_dotenv
+
+load_dotenv(find_dotenv(".env.local"))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from app.db.base import Base  # noqa: E402,F401
+from app.db.fast_serializer import fast_response  # noqa: E402
+from app.db.pagination import Page, PaginationQueryParams  # noqa: E402
+from app.users.models import User  # noqa: E402
+from app.users.serializer import UserSerializer  # noqa: E402
+
+
+def make_page(n: int) -> Page:
+    now = datetime.utcnow()
+    users: List[Any] = [
+        User(
+            id=str(uuid.uuid4()),
+            name=f"bench {i}",
+            email=f"bench-{i}@bench.unicn.app",
+            created_at=now - timedelta(minutes=i),
+            updated_at=now if i % 2 else None,
+        )
+        for i in range(n)
+    ]
+    return Page.create(users, total=n * 10, params=PaginationQueryParams(per_page=n))
+
+
+def timed(label: str, items: int, repeat: int, fn: Callable[[], bytes]) -> float:
+    size = len(fn())
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<10} {items:>6} items  {elapsed * 1000:8.3f} ms  {size:>9} bytes")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    field = create_response_field(name="Response", type_=Page[UserSerializer])
+    loop = asyncio.new_event_loop()
+
+    for n in (100, 1000):
+        page = make_page(n)
+
+        def default() -> bytes:
+            content = loop.run_until_complete(
+                serialize_response(field=field, response_content=page)
+            )
+            return JSONResponse(content).body
+
+        def fast() -> bytes:
+            return fast_response(page, UserSerializer).body
+
+        slow = timed("default", n, args.repeat, default)
+        quick = timed("fast", n, args.repeat, fast)
+        print(f"speedup: {slow / quick:.1f}x")
+
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
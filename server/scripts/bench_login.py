@@ -0,0 +1,148 @@
+"""
+Counts the statements, commits and time of a login, for the previous
+flow (authenticate, token lookup, create) against `TokenDao.login`. The
+first login of a user issues a token, later ones reuse it.
+
+Needs a migrated database, run from the server directory:
+
+    PYTHONPATH=. python scripts/bench_login.py --users 20 --logins 5
+"""
+import argparse
+import time
+import uuid
+from typing import Any, Callable, List
+
+from dotenv import find_dotenv, load_dotenv
+
+load_dotenv(find_dotenv(".env.local"))
+
+from sqlalchemy import delete, event, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from tabulate import tabulate  # noqa: E402
+
+from app.auth.dao import token_dao  # noqa: E402
+from app.auth.models import AuthToken  # noqa: E402
+from app.auth.serializer import (  # noqa: E402
+    LoginSerializer,
+    TokenCreateSerializer,
+    TokenGrantType,
+)
+from app.db.base import Base  # noqa: E402,F401
+from app.db.session import db_registry  # noqa: E402
+from app.users.dao import user_dao  # noqa: E402
+from app.users.models import User  # noqa: E402
+from app.users.serializer import UserRegistrationSerializer  # noqa: E402
+
+PASSWORD = "bench password"
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *args: Any) -> None:
+        self.count += 1
+
+
+def legacy_login(db: Session, obj_in: LoginSerializer) -> AuthToken:
+    user = user_dao.authenticate(db, email=obj_in.email, password=obj_in.password)
+    token = token_dao.get(db, user_id=user.id)
+    if not token:
+        token = token_dao.create(
+            db,
+            obj_in=TokenCreateSerializer(
+                user_id=user.id, token_type=TokenGrantType.AUTHORIZATION_CODE
+            ),
+        )
+    return token
+
+
+def run(
+    emails: List[str],
+    logins: int,
+    login: Callable,
+    statements: Counter,
+    commits: Counter,
+) -> List[float]:
+    """Average statements and commits of first and later logins, ms per login"""
+    counts = [0, 0, 0, 0]
+    start = time.perf_counter()
+    for email in emails:
+        obj_in = LoginSerializer(email=email, password=PASSWORD)
+        for i in range(logins):
+            with db_registry.session() as db:
+                before = statements.count, commits.count
+                login(db, obj_in)
+                offset = 0 if i == 0 else 2
+                counts[offset] += statements.count - before[0]
+                counts[offset + 1] += commits.count - before[1]
+    elapsed = time.perf_counter() - start
+
+    first = [count / len(emails) for count in counts[:2]]
+    later = len(emails) * (logins - 1)
+    repeat = [count / later if later else 0.0 for count in counts[2:]]
+    return first + repeat + [elapsed * 1000 / (len(emails) * logins)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=5)
+    args = parser.parse_args()
+
+    tag = uuid.uuid4().hex[:8]
+    statements, commits = Counter(), Counter()
+    engine = db_registry.engine
+    event.listen(engine, "before_cursor_execute", statements)
+    event.listen(engine, "commit", commits)
+    try:
+        results = []
+        for label, login in (("legacy", legacy_login), ("login", token_dao.login)):
+            emails = [f"{tag}-{label}-{i}@bench.unicn.app" for i in range(args.users)]
+            with db_registry.session() as db:
+                for email in emails:
+                    user_dao.register(
+                        db,
+                        UserRegistrationSerializer(
+                            name="bench", email=email, password=PASSWORD
+                        ),
+                    )
+            results.append(
+                [label] + run(emails, args.logins, login, statements, commits)
+            )
+
+        print(
+            tabulate(
+                results,
+                headers=[
+                    "flow",
+                    "first: statements",
+                    "first: commits",
+                    "next: statements",
+                    "next: commits",
+                    "ms/login",
+                ],
+                floatfmt=".1f",
+            )
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", statements)
+        event.remove(engine, "commit", commits)
+        with db_registry.session() as db:
+            users = select(User.id).where(User.email.like(f"{tag}-%"))
+            db.execute(
+                delete(AuthToken)
+                .where(AuthToken.user_id.in_(users))
+                .execution_options(synchronize_session=False)
+            )
+            db.execute(
+                delete(User)
+                .where(User.email.like(f"{tag}-%"))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        db_registry.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Picks the bcrypt cost (PASSWORD_HASH_ROUNDS) whose hash time stays within
+a target latency on this machine. Run it on the production hardware, from
+the server directory:
+
+    PYTHONPATH=. python scripts/calibrate_password_hash.py --target-ms 250
+"""
+import argparse
+
+from dotenv import find_dotenv, load_dotenv
+
+load_dotenv(find_dotenv(".env.local"))
+
+from tabulate import tabulate  # noqa: E402
+
+from app.core.hashing import calibrate_rounds  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target-ms", type=float, default=250)
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=16)
+    parser.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args()
+
+    rounds, timings = calibrate_rounds(
+        args.target_ms,
+        min_rounds=args.min_rounds,
+        max_rounds=args.max_rounds,
+        samples=args.samples,
+    )
+    print(tabulate(timings, headers=["rounds", "ms per hash"], floatfmt=".1f"))
+    print(f"\nPASSWORD_HASH_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Deletes revoked and expired auth tokens once, the way the background
+reaper does, and reports the size of auth_token and its indexes before
+and after. Deleted rows only free space for reuse, pass --vacuum to
+VACUUM the table before measuring again.
+
+From the server directory:
+
+    PYTHONPATH=. python scripts/reap_tokens.py --batch-size 500 --vacuum
+"""
+import argparse
+
+from dotenv import find_dotenv, load_dotenv
+
+load_dotenv(find_dotenv(".env.local"))
+
+from sqlalchemy import text  # noqa: E402
+from tabulate import tabulate  # noqa: E402
+
+from app.auth.reaper import reap_tokens  # noqa: E402
+from app.core.config import get_app_settings  # noqa: E402
+from app.db.base import Base  # noqa: E402,F401
+from app.db.session import db_registry  # noqa: E402
+from app.db.utils import relation_sizes  # noqa: E402
+
+
+def print_sizes(label: str) -> None:
+    with db_registry.engine.connect() as conn:
+        sizes = relation_sizes(conn, "auth_token")
+    print(f"\n{label}")
+    rows = [(size.kind, size.name, size.size) for size in sizes]
+    print(tabulate(rows, headers=["", "relation", "size"]))
+
+
+def main() -> None:
+    settings = get_app_settings()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.AUTH_TOKEN_REAPER_BATCH_SIZE
+    )
+    parser.add_argument("--pause", type=float, default=settings.AUTH_TOKEN_REAPER_PAUSE)
+    parser.add_argument("--vacuum", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        print_sizes("before")
+        stats = reap_tokens(
+            db_registry.engine, batch_size=args.batch_size, pause=args.pause
+        )
+        print(
+            f"\ndeleted {stats.deleted} tokens in {stats.batches} batches, "
+            f"{stats.seconds:.1f}s"
+        )
+        if args.vacuum:
+            with db_registry.engine.connect() as conn:
+                conn.execution_options(isolation_level="AUTOCOMMIT").execute(
+                    text("VACUUM (ANALYZE) auth_token")
+                )
+        print_sizes("after")
+    finally:
+        db_registry.dispose()
+
+
+if __name__ == "__main__":
+    main()
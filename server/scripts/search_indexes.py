@@ -0,0 +1,40 @@
+"""
+Checks, and by default creates, the GIN indexes of every search vector.
+
+From the server directory:
+
+    PYTHONPATH=. python scripts/search_indexes.py [--check]
+"""
+import argparse
+import sys
+
+from dotenv import find_dotenv, load_dotenv
+
+load_dotenv(find_dotenv(".env.local"))
+
+from tabulate import tabulate  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.custom_search import ensure_search_indexes  # noqa: E402
+from app.db.session import db_registry  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--check", action="store_true", help="only report, don't build indexes"
+    )
+    args = parser.parse_args()
+
+    try:
+        report = ensure_search_indexes(db_registry.engine, Base, create=not args.check)
+    finally:
+        db_registry.dispose()
+
+    print(tabulate(report, headers=["table", "column", "index", "status"]))
+    if any(status.status in ("missing", "invalid") for status in report):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
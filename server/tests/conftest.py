@@ -0,0 +1,37 @@
+import os
+from typing import Iterator
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+# Settings are built when the app modules are imported, tests don't need a
+# reachable database or Redis for them
+for name, value in {
+    "CLIENT_ID": "tests",
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_USER": "tests",
+    "POSTGRES_PASSWORD": "tests",
+    "POSTGRES_DB": "tests",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture
+def db() -> Iterator[Session]:
+    """
+    A session on the configured database, the tests using it are skipped
+    when it isn't reachable. Tests delete the rows they create.
+    """
+    from app.db.base import Base
+    from app.db.session import db_registry
+
+    try:
+        with db_registry.engine.connect():
+            pass
+    except OperationalError:
+        pytest.skip("the database isn't reachable")
+
+    Base.metadata.create_all(db_registry.engine)
+    with db_registry.session() as session:
+        yield session
@@ -0,0 +1,163 @@
+from datetime import datetime, timedelta
+from typing import Iterator
+
+import pytest
+from redis import Redis
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from app.auth.cache import (
+    CachedToken,
+    TokenRevocations,
+    cache_token,
+    get_cached_token,
+    invalidate_token,
+    invalidate_user_tokens,
+    revocations,
+    token_cache,
+)
+from app.auth.dao import token_dao
+from app.auth.models import AuthToken
+from app.db.base_class import generate_uuid
+from app.db.entity_cache import InMemoryRedis
+from app.users.models import User
+
+
+@pytest.fixture(autouse=True)
+def shared(monkeypatch: pytest.MonkeyPatch) -> Iterator[InMemoryRedis]:
+    client = InMemoryRedis()
+    monkeypatch.setattr(revocations, "_client", client)
+    token_cache.clear()
+    yield client
+    token_cache.clear()
+
+
+def make_token(user_id: str = "u1", expires_in: float = 3600) -> CachedToken:
+    return CachedToken(
+        token_id=generate_uuid(),
+        user_id=user_id,
+        expires_at=datetime.utcnow() + timedelta(seconds=expires_in),
+    )
+
+
+def test_cached_token() -> None:
+    token = make_token()
+    cache_token("access", token)
+
+    assert get_cached_token("access") == token
+    assert get_cached_token("other") is None
+
+
+def test_ttl_capped_by_expires_at(monkeypatch: pytest.MonkeyPatch) -> None:
+    cache_token("access", make_token(expires_in=10))
+    now = token_cache._clock()
+
+    monkeypatch.setattr(token_cache, "_clock", lambda: now + 11)
+    assert get_cached_token("access") is None
+
+
+def test_expired_token_not_cached() -> None:
+    cache_token("access", make_token(expires_in=-1))
+    assert get_cached_token("access") is None
+
+
+def test_invalidate() -> None:
+    cache_token("a", make_token("u1"))
+    cache_token("b", make_token("u1"))
+    cache_token("c", make_token("u2"))
+
+    invalidate_token("a")
+    assert get_cached_token("a") is None
+
+    assert invalidate_user_tokens("u1") == 1
+    assert get_cached_token("b") is None
+    assert get_cached_token("c") is not None
+
+
+def test_revoked_by_another_worker() -> None:
+    token = make_token()
+    cache_token("access", token)
+
+    # Another worker revokes it, this worker's cache still holds it
+    TokenRevocations(revocations.client, ttl=60).revoke([token.token_id])
+
+    assert get_cached_token("access") is None
+    assert len(token_cache) == 0
+
+
+def test_redis_down(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        revocations,
+        "_client",
+        Redis.from_url("redis://127.0.0.1:1", socket_timeout=0.1),
+    )
+    cache_token("access", make_token())
+
+    # Resolved from the database again instead of trusting the cache
+    assert get_cached_token("access") is None
+    revocations.revoke(["t1"])
+
+
+@pytest.fixture
+def user(db: Session) -> Iterator[User]:
+    user = User(id=generate_uuid(), name="tokens", email=f"{generate_uuid()}@x.io")
+    db.add(user)
+    db.commit()
+    yield user
+    db.rollback()
+    db.execute(delete(AuthToken).where(AuthToken.user_id == user.id))
+    db.execute(delete(User).where(User.id == user.id))
+    db.commit()
+
+
+def add_token(db: Session, user: User, expires_in: int = 3600) -> AuthToken:
+    token = AuthToken(
+        id=generate_uuid(),
+        access_token=generate_uuid(),
+        user_id=user.id,
+        token_type="password",
+        expires_at=datetime.utcnow() + timedelta(seconds=expires_in),
+        expires_in=expires_in,
+    )
+    db.add(token)
+    db.commit()
+    return token
+
+
+def test_resolve(db: Session, user: User) -> None:
+    token = add_token(db, user)
+
+    resolved = token_dao.resolve_token(db, token.access_token)
+    assert resolved == CachedToken(token.id, user.id, token.expires_at)
+
+    hits = token_cache.hits
+    assert token_dao.resolve_token(db, token.access_token) == resolved
+    assert token_cache.hits == hits + 1
+
+    assert token_dao.resolve_token(db, "unknown") is None
+    assert token_dao.resolve_token(db, add_token(db, user, -1).access_token) is None
+
+
+def test_revoke_reaches_other_workers(db: Session, user: User) -> None:
+    token = add_token(db, user)
+    resolved = token_dao.resolve_token(db, token.access_token)
+
+    token_dao.revoke_token(db, token.access_token)
+    # As cached by a worker the revocation didn't evict it from
+    cache_token(token.access_token, resolved)
+
+    assert token_dao.resolve_token(db, token.access_token) is None
+
+
+def test_revoke_user_tokens(db: Session, user: User) -> None:
+    tokens = [add_token(db, user), add_token(db, user)]
+    resolved = [token_dao.resolve_token(db, token.access_token) for token in tokens]
+
+    token_dao.revoke_user_tokens(db, user.id)
+    for token, cached in zip(tokens, resolved):
+        cache_token(token.access_token, cached)
+
+    assert [token_dao.resolve_token(db, token.access_token) for token in tokens] == [
+        None,
+        None,
+    ]
@@ -0,0 +1,100 @@
+from typing import Iterator
+
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.core.config import get_app_settings
+from app.db.base_class import generate_uuid
+from app.db.pagination import CountStrategy, PaginationQueryParams, paginate
+from app.users.models import User
+
+ROWS = 5
+
+
+@pytest.fixture
+def query(db: Session) -> Iterator[Select]:
+    tag = generate_uuid()
+    db.add_all(
+        User(id=generate_uuid(), name=f"count {i}", email=f"{tag}-{i}@x.io")
+        for i in range(ROWS)
+    )
+    db.commit()
+    query = select(User).where(User.email.like(f"{tag}-%")).order_by(User.email)
+    yield query
+    db.rollback()
+    remove(db, query)
+    db.commit()
+
+
+def remove(db: Session, query: Select) -> None:
+    db.execute(
+        delete(User)
+        .where(query.whereclause)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def page(db: Session, query: Select, strategy: CountStrategy, number: int = 1):
+    params = PaginationQueryParams(page=number, per_page=2)
+    return paginate(db, query, params=params, count_strategy=strategy)
+
+
+@pytest.mark.parametrize(
+    "strategy", [CountStrategy.EXACT, CountStrategy.WINDOW, CountStrategy.CACHED]
+)
+def test_exact_totals(db: Session, query: Select, strategy: CountStrategy):
+    first, last = page(db, query, strategy), page(db, query, strategy, 3)
+
+    assert (first.total, first.total_pages, first.next_page) == (ROWS, 3, 2)
+    assert (len(last.items), last.next_page) == (1, -1)
+    assert first.count_strategy == strategy
+    assert not first.total_is_lower_bound and not first.total_is_estimate
+
+
+def test_window_past_the_last_page(db: Session, query: Select):
+    result = page(db, query, CountStrategy.WINDOW, 4)
+
+    assert (result.items, result.total, result.next_page) == ([], ROWS, -1)
+
+
+def test_capped_total_is_a_lower_bound(db: Session, query: Select, monkeypatch):
+    monkeypatch.setattr(get_app_settings(), "PAGINATION_COUNT_CAP", 3)
+
+    first, second = page(db, query, CountStrategy.CAPPED), page(
+        db, query, CountStrategy.CAPPED, 2
+    )
+
+    assert (first.total, first.total_is_lower_bound, first.next_page) == (3, True, 2)
+    # The cap is reached on the last counted page, there's still a next one
+    assert (second.total_pages, second.next_page) == (2, 3)
+
+
+def test_cached_total_is_reused(db: Session, query: Select):
+    assert page(db, query, CountStrategy.CACHED).total == ROWS
+
+    remove(db, query)
+    db.commit()
+
+    assert page(db, query, CountStrategy.CACHED).total == ROWS
+    assert page(db, query, CountStrategy.EXACT).total == 0
+
+
+def test_none_fetches_one_extra_row(db: Session, query: Select):
+    first, last = page(db, query, CountStrategy.NONE), page(
+        db, query, CountStrategy.NONE, 3
+    )
+
+    assert (first.total, first.total_is_lower_bound, first.next_page) == (2, True, 2)
+    assert (last.total, last.total_is_lower_bound, last.next_page) == (ROWS, False, -1)
+
+
+def test_estimate_knows_the_next_page(db: Session, query: Select):
+    first, last = page(db, query, CountStrategy.ESTIMATE), page(
+        db, query, CountStrategy.ESTIMATE, 3
+    )
+
+    assert first.total_is_estimate and first.next_page == 2 and first.total >= 3
+    assert not last.total_is_estimate
+    assert (last.total, last.next_page) == (ROWS, -1)
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session, selectinload
+
+from app.auth.models import AuthToken
+from app.db.base_class import generate_uuid
+from app.db.dao import CRUDDao
+from app.users.models import User
+
+
+class TokenIn(BaseModel):
+    access_token: str
+    token_type: str
+    user_id: str
+    expires_at: datetime
+    expires_in: int
+    # Not a column, written to the user by `on_relationship`
+    user_name: Optional[str]
+
+
+class TokenDao(CRUDDao[AuthToken, TokenIn, TokenIn]):
+    def on_relationship(
+        self,
+        db: Session,
+        *,
+        pk: str,
+        values: dict,
+        db_obj: Optional[AuthToken] = None,
+        create: bool = True,
+    ) -> None:
+        if values.get("user_name"):
+            user_id = db_obj.user_id if db_obj else values["user_id"]
+            db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(name=values["user_name"])
+                .execution_options(synchronize_session=False)
+            )
+
+
+@pytest.fixture
+def user(db: Session) -> Iterator[User]:
+    user = User(id=generate_uuid(), name="before", email=f"{generate_uuid()}@x.io")
+    db.add(user)
+    db.commit()
+    yield user
+    db.rollback()
+    db.execute(delete(AuthToken).where(AuthToken.user_id == user.id))
+    db.execute(delete(User).where(User.id == user.id))
+    db.commit()
+
+
+def token_in(user: User, user_name: str) -> TokenIn:
+    return TokenIn(
+        access_token=generate_uuid(),
+        token_type="password",
+        user_id=user.id,
+        expires_at=datetime.utcnow() + timedelta(hours=1),
+        expires_in=3600,
+        user_name=user_name,
+    )
+
+
+@pytest.mark.parametrize("use_returning", [False, True])
+def test_relationship_written_by_hook(
+    db: Session, user: User, use_returning: bool
+) -> None:
+    dao = TokenDao(
+        AuthToken,
+        load_options=[selectinload(AuthToken.user)],
+        use_returning=use_returning,
+    )
+
+    token = dao.create(db, obj_in=token_in(user, "created"))
+    assert token.user.name == "created"
+
+    token = dao.update(
+        db, db_obj=token, obj_in=token_in(user, "updated").dict(exclude={"user_id"})
+    )
+    assert token.user.name == "updated"
+    db.commit()
+
+
+def test_relationship_written_by_hook_create_many(db: Session, user: User) -> None:
+    dao = TokenDao(
+        AuthToken, load_options=[selectinload(AuthToken.user)], use_returning=True
+    )
+
+    tokens = dao.create_many(
+        db, objs_in=[token_in(user, "first"), token_in(user, "second")]
+    )
+    assert [token.user.name for token in tokens] == ["second", "second"]
+
+
+def test_relationship_written_by_hook_lazy(db: Session, user: User) -> None:
+    dao = TokenDao(AuthToken, use_returning=True)
+    obj_in = token_in(user, "created")
+    # Lazy loads take the user from the identity map when it's there
+    db.expunge(user)
+
+    token = dao.create(db, obj_in=obj_in)
+    assert token.user.name == "created"
+    db.commit()
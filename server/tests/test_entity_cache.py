@@ -0,0 +1,89 @@
+from datetime import datetime
+import pytest
+from redis import Redis
+from sqlalchemy.orm import Session, selectinload
+
+from app.db.dao import CRUDDao
+from app.db.entity_cache import EntityCache, InMemoryRedis
+from app.exceptions.custom import DaoException
+from app.users.models import User
+
+
+def make_user(id: str = "u1", name: str = "Ada") -> User:
+    return User(
+        id=id,
+        name=name,
+        email=f"{id}@example.com",
+        hashed_password=None,
+        created_at=datetime(2022, 1, 2, 3, 4, 5),
+        updated_at=None,
+    )
+
+
+@pytest.fixture
+def cache() -> EntityCache:
+    return EntityCache(InMemoryRedis(), ttl=60, tombstone_ttl=10)
+
+
+def test_miss(cache: EntityCache) -> None:
+    assert cache.get_many(Session(), User, ["u1"]) == {}
+    assert cache.stats()["misses"] == 1
+
+
+def test_hit(cache: EntityCache) -> None:
+    cache.set_many([make_user()])
+
+    db = Session()
+    found = cache.get_many(db, User, ["u1", "u2"])
+
+    assert list(found) == ["u1"]
+    user = found["u1"]
+    assert user in db
+    assert (user.name, user.email) == ("Ada", "u1@example.com")
+    assert user.created_at == datetime(2022, 1, 2, 3, 4, 5)
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_invalidate(cache: EntityCache) -> None:
+    cache.set_many([make_user()])
+    cache.invalidate(User, ["u1"])
+
+    assert cache.get_many(Session(), User, ["u1"]) == {}
+
+
+def test_stale_refill_after_invalidate(cache: EntityCache) -> None:
+    # A read that loaded the row before the update committed
+    stale = make_user(name="Ada")
+    cache.invalidate(User, ["u1"])
+    cache.set_many([stale])
+
+    assert cache.get_many(Session(), User, ["u1"]) == {}
+
+
+def test_refill_after_tombstone_expires(cache: EntityCache) -> None:
+    cache.invalidate(User, ["u1"])
+    cache.client.data.pop(cache.key(User, "u1"))
+    cache.set_many([make_user(name="Grace")])
+
+    assert cache.get_many(Session(), User, ["u1"])["u1"].name == "Grace"
+
+
+def test_redis_down_falls_back(cache: EntityCache) -> None:
+    # Nothing listens on port 1
+    cache.client = Redis.from_url("redis://127.0.0.1:1", socket_timeout=0.1)
+
+    assert cache.get_many(Session(), User, ["u1"]) == {}
+    cache.set_many([make_user()])
+    cache.invalidate(User, ["u1"])
+
+    assert cache.stats()["errors"] == 3
+
+
+def test_rejected_with_load_options(cache: EntityCache) -> None:
+    with pytest.raises(DaoException):
+        CRUDDao(
+            User,
+            load_options=[selectinload("*")],
+            entity_cache=cache,
+        )
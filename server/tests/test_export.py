@@ -0,0 +1,50 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+
+from app.db.export import ExportWriter
+from app.db.serializer import ExportFormat
+from app.users.models import User
+from app.users.serializer import UserSerializer
+
+
+def users() -> List[User]:
+    return [
+        User(
+            id=str(i),
+            name=f"user {i}",
+            email=f"{i}@x.io",
+            created_at=datetime(2022, 1, i + 1),
+            updated_at=datetime(2022, 2, 1) if i else None,
+        )
+        for i in range(3)
+    ]
+
+
+def test_ndjson_rows_match_the_serializer():
+    writer = ExportWriter(UserSerializer, ExportFormat.NDJSON)
+
+    lines = writer.write(users()).decode().splitlines()
+
+    assert [json.loads(line) for line in lines] == [
+        jsonable_encoder(UserSerializer.from_orm(user)) for user in users()
+    ]
+
+
+def test_csv_is_trimmed_to_include():
+    writer = ExportWriter(
+        UserSerializer, ExportFormat.CSV, include={"id": True, "email": True}
+    )
+
+    body = (writer.write(users()[:2]) + writer.write(users()[2:])).decode()
+
+    assert list(csv.reader(io.StringIO(body))) == [
+        ["id", "email"],
+        ["0", "0@x.io"],
+        ["1", "1@x.io"],
+        ["2", "2@x.io"],
+    ]
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session, defer, raiseload
+
+from app.auth.models import AuthToken
+from app.db.base_class import generate_uuid
+from app.db.fast_serializer import compile_serializer
+from app.users.models import User
+
+
+class UserOut(BaseModel):
+    id: str
+    name: str
+
+
+class TokenOut(BaseModel):
+    id: str
+    token_type: str
+    refresh_token: Optional[str] = "unset"
+    user: Optional[UserOut]
+
+
+class StrictTokenOut(BaseModel):
+    id: str
+    user: UserOut
+
+
+@pytest.fixture
+def token_id(db: Session) -> Iterator[str]:
+    user = User(id=generate_uuid(), name="fast", email=f"{generate_uuid()}@x.io")
+    token = AuthToken(
+        id=generate_uuid(),
+        access_token=generate_uuid(),
+        refresh_token="refresh",
+        user=user,
+        token_type="password",
+        expires_at=datetime.utcnow() + timedelta(hours=1),
+        expires_in=3600,
+    )
+    db.add(token)
+    db.commit()
+    token_id, user_id = token.id, user.id
+    db.expunge_all()
+    yield token_id
+    db.rollback()
+    db.execute(delete(AuthToken).where(AuthToken.id == token_id))
+    db.execute(delete(User).where(User.id == user_id))
+    db.commit()
+
+
+def load(db: Session, token_id: str, *options) -> AuthToken:
+    query = select(AuthToken).where(AuthToken.id == token_id).options(*options)
+    return db.scalars(query).one()
+
+
+def test_unloaded_attributes_get_their_default(db: Session, token_id: str):
+    obj = load(db, token_id, raiseload(AuthToken.user), defer(AuthToken.refresh_token))
+
+    data = compile_serializer(TokenOut)(obj)
+
+    assert data == {
+        "id": token_id,
+        "token_type": "password",
+        "refresh_token": "unset",
+        "user": None,
+    }
+
+
+def test_unloaded_required_attribute_raises(db: Session, token_id: str):
+    obj = load(db, token_id, raiseload(AuthToken.user))
+
+    with pytest.raises(AttributeError, match="'user' is being lazily loaded"):
+        compile_serializer(StrictTokenOut)(obj)
+
+
+def test_expired_attributes_are_refreshed(db: Session, token_id: str):
+    obj = load(db, token_id)
+    db.commit()
+
+    data = compile_serializer(StrictTokenOut)(obj)
+
+    assert data["user"]["name"] == "fast"
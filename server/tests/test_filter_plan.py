@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.future import select
+
+from app.auth.models import AuthToken
+from app.db.base import Base  # noqa: F401
+from app.db.utils import _create_filtered_query_from_query, compile_filter_plan
+from app.users.models import User
+
+
+def test_plans_are_memoized_by_shape():
+    plan = compile_filter_plan(AuthToken, ("expires_in__gt",), ("-created_at",))
+
+    assert compile_filter_plan(AuthToken, ("expires_in__gt",), ("-created_at",)) is (
+        plan
+    )
+    assert compile_filter_plan(AuthToken, ("expires_in",), ("-created_at",)) is not (
+        plan
+    )
+
+
+def test_filters_cast_their_values():
+    plan = compile_filter_plan(
+        AuthToken, ("expires_in__gt", "expires_at__lte", "token_type"), ()
+    )
+
+    casts = {key: caster for key, _, _, caster in plan.filters}
+    assert casts["expires_in__gt"]("10") == 10
+    assert casts["expires_at__lte"]("2022-01-02 03:04") == datetime(2022, 1, 2, 3, 4)
+    assert casts["token_type"]("10") == "10"
+
+
+def test_relationship_paths_join_once():
+    plan = compile_filter_plan(
+        AuthToken, ("user___name", "user___email__like"), ("user___name",)
+    )
+
+    assert len(plan.joins) == 1
+    [(column, is_desc)] = plan.order_columns
+    assert (column.key, is_desc) == ("name", False)
+
+
+def test_descending_sort():
+    plan = compile_filter_plan(User, (), ("-created_at", "id"))
+
+    assert [(column.key, is_desc) for column, is_desc in plan.order_columns] == [
+        ("created_at", True),
+        ("id", False),
+    ]
+
+
+@pytest.mark.parametrize(
+    "filter_keys, sort_attrs",
+    [(("name__nope",), ()), (("nope",), ()), ((), ("nope",))],
+)
+def test_unknown_paths(filter_keys, sort_attrs):
+    with pytest.raises((KeyError, AttributeError)):
+        compile_filter_plan(User, filter_keys, sort_attrs)
+
+
+def test_filtered_query_binds_the_values():
+    query = _create_filtered_query_from_query(
+        query=select(AuthToken),
+        filters={"user___name": "a", "expires_in__gte": "5"},
+        sort_attrs=["-user___name"],
+    )
+
+    compiled = query.compile(dialect=postgresql.dialect())
+    assert "LEFT OUTER JOIN users" in str(compiled)
+    assert "ORDER BY users_1.name DESC" in str(compiled)
+    assert sorted(compiled.params.values(), key=str) == [5, "a"]
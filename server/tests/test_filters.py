@@ -0,0 +1,52 @@
+from typing import Optional
+
+import pytest
+from pydantic import Field, ValidationError
+
+from app.db.filters import BaseFilter, get_complex_filters
+from app.db.serializer import ComplexFilter
+
+
+class ItemFilter(BaseFilter):
+    name: Optional[str]
+    where: Optional[ComplexFilter] = Field(allowed_fields=["name", "age"])
+
+
+class DefaultFilter(BaseFilter):
+    where: ComplexFilter = Field("age__gt=3", allowed_fields=["age"])
+
+
+def test_parse() -> None:
+    assert ComplexFilter.parse("name__ilike=a%, age__gt=3") == {
+        "name__ilike": "a%",
+        "age__gt": "3",
+    }
+
+
+@pytest.mark.parametrize("value", ["name", "name=a=b", "age__nope=3"])
+def test_invalid(value: str) -> None:
+    with pytest.raises(ValidationError):
+        ItemFilter(where=value)
+
+
+def test_dict_expands_filters() -> None:
+    assert ItemFilter(name="a", where="age__gt=3").dict(exclude_none=True) == {
+        "name": "a",
+        "age__gt": "3",
+    }
+    assert ItemFilter().dict(exclude_none=True) == {}
+
+
+def test_unvalidated_default() -> None:
+    assert DefaultFilter().dict() == {"age__gt": "3"}
+    assert ComplexFilter("a=1").filters == {"a": "1"}
+
+
+def test_complex_filters_checked_per_class() -> None:
+    assert ItemFilter.__complex_filters__ == {"where": ("name", "age")}
+    assert get_complex_filters(DefaultFilter) == {"where": ("age",)}
+
+    with pytest.raises(AttributeError):
+
+        class MissingFilter(BaseFilter):
+            where: Optional[ComplexFilter]
@@ -0,0 +1,59 @@
+from sqlalchemy import Column, Integer, MetaData, String, Table
+from sqlalchemy.dialects import postgresql
+
+from app.db.utils import MAX_BIND_PARAMS, build_insert_many, group_rows_for_insert
+
+table = Table(
+    "rows",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("name", String),
+    Column("email", String),
+)
+
+
+def test_rows_are_grouped_by_their_keys():
+    rows = [
+        {"id": 1, "name": "a"},
+        {"id": 2, "email": "b"},
+        {"name": "c", "id": 3},
+        {"id": 4, "email": "d"},
+    ]
+
+    groups = [(keys, list(chunk)) for keys, chunk in group_rows_for_insert(rows)]
+
+    assert groups == [
+        (("id", "name"), [rows[0], rows[2]]),
+        (("email", "id"), [rows[1], rows[3]]),
+    ]
+
+
+def test_groups_are_chunked():
+    rows = [{"id": i} for i in range(5)]
+
+    sizes = [len(chunk) for _, chunk in group_rows_for_insert(rows, chunk_size=2)]
+
+    assert sizes == [2, 2, 1]
+
+
+def test_chunks_stay_under_the_bind_parameter_limit():
+    keys = [f"col{i}" for i in range(100)]
+    rows = [dict.fromkeys(keys, 0) for _ in range(MAX_BIND_PARAMS // 50)]
+
+    chunks = [list(chunk) for _, chunk in group_rows_for_insert(rows)]
+
+    assert sum(len(chunk) for chunk in chunks) == len(rows)
+    assert all(len(chunk) * len(keys) <= MAX_BIND_PARAMS for chunk in chunks)
+
+
+def test_no_rows_no_statements():
+    assert build_insert_many(table, []) == []
+
+
+def test_one_insert_per_chunk():
+    rows = [{"id": i, "name": str(i)} for i in range(3)] + [{"id": 3}]
+
+    statements = build_insert_many(table, rows, chunk_size=2)
+
+    compiled = [stmt.compile(dialect=postgresql.dialect()) for stmt in statements]
+    assert [len(stmt.params) for stmt in compiled] == [4, 2, 1]
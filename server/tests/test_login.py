@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+from typing import Iterator, List
+
+import pytest
+from sqlalchemy import delete, event, select
+from sqlalchemy.orm import Session
+
+from app.auth import dao as auth_dao
+from app.auth.dao import token_dao
+from app.auth.models import AuthToken
+from app.auth.serializer import LoginSerializer
+from app.db.base_class import generate_uuid
+from app.users.models import User
+
+
+@pytest.fixture
+def user(db: Session, monkeypatch) -> Iterator[User]:
+    # Every login finds the stored hash outdated
+    monkeypatch.setattr(
+        auth_dao,
+        "verify_and_update_password",
+        lambda password, hashed: (password == "secret", f"{hashed}+1"),
+    )
+    user = User(
+        id=generate_uuid(),
+        name="login",
+        email=f"{generate_uuid()}@x.io",
+        hashed_password="hash",
+    )
+    db.add(user)
+    db.commit()
+    # Detached with its columns loaded, logins select it again
+    db.refresh(user)
+    db.expunge(user)
+    yield user
+    db.rollback()
+    db.execute(delete(AuthToken).where(AuthToken.user_id == user.id))
+    db.execute(delete(User).where(User.id == user.id))
+    db.commit()
+
+
+@pytest.fixture
+def statements(db: Session) -> Iterator[List[str]]:
+    executed: List[str] = []
+
+    def before_execute(conn, cursor, statement, *args) -> None:
+        executed.append(statement.split(None, 1)[0].upper())
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_execute)
+    yield executed
+    event.remove(engine, "before_cursor_execute", before_execute)
+
+
+def login(db: Session, user: User) -> AuthToken:
+    token = token_dao.login(db, LoginSerializer(email=user.email, password="secret"))
+    # Reading the result must not reload anything
+    assert token.user.hashed_password == "hash+1"
+    assert token.user.updated_at is not None
+    assert token.access_token and token.user_id == user.id
+    return token
+
+
+def test_rehash_and_new_token_share_a_commit(db: Session, user: User, statements):
+    login(db, user)
+
+    assert statements == ["SELECT", "UPDATE", "INSERT"]
+    assert db.scalar(select(User.hashed_password).where(User.id == user.id)) == (
+        "hash+1"
+    )
+
+
+def test_rehash_keeps_the_active_token_loaded(db: Session, user: User, statements):
+    db.add(
+        AuthToken(
+            id=generate_uuid(),
+            access_token=generate_uuid(),
+            user_id=user.id,
+            token_type="password",
+            expires_at=datetime.utcnow() + timedelta(hours=1),
+            expires_in=3600,
+        )
+    )
+    db.commit()
+    db.expunge_all()
+    statements.clear()
+
+    login(db, user)
+
+    assert statements == ["SELECT", "UPDATE"]
+    assert db.scalar(select(User.hashed_password).where(User.id == user.id)) == (
+        "hash+1"
+    )
@@ -0,0 +1,115 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from uuid import UUID
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, MetaData, Numeric, String, Table
+from sqlalchemy import Enum as EnumType
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.future import select
+
+from app.db.pagination import (
+    CursorPaginationQueryParams,
+    decode_cursor,
+    encode_cursor,
+    keyset_query,
+)
+from app.exceptions.custom import HttpErrorException
+
+
+class Color(str, Enum):
+    RED = "red"
+
+
+table = Table(
+    "items",
+    MetaData(),
+    Column("id", String, primary_key=True),
+    Column("name", String, nullable=True),
+    Column("created_at", DateTime, nullable=False),
+    Column("rank", Integer),
+    Column("price", Numeric),
+    Column("color", EnumType(Color)),
+)
+c = table.c
+
+
+def forge(*values: object) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def test_round_trip() -> None:
+    values = [datetime(2022, 1, 2, 3), "a", 3, Decimal("1.5"), Color.RED, None]
+    columns = [c.created_at, c.id, c.rank, c.price, c.color, c.name]
+
+    decoded = decode_cursor(encode_cursor(values), columns)
+    assert decoded == [datetime(2022, 1, 2, 3), "a", 3, Decimal("1.5"), "red", None]
+
+
+def test_uuid_round_trip() -> None:
+    value = UUID(int=1)
+    column = Column("uuid", postgresql.UUID(as_uuid=True))
+    assert decode_cursor(encode_cursor([value]), [column]) == [value]
+
+
+@pytest.mark.parametrize(
+    "cursor, columns",
+    [
+        ("not base64!", [c.id]),
+        (forge(["v", "a"]), [c.id, c.rank]),
+        (forge({"v": "a"}), [c.id]),
+        (forge(["v", {"$gt": 1}]), [c.id]),
+        (forge(["v", [1, 2]]), [c.rank]),
+        (forge(["v", "a"]), [c.rank]),
+        (forge(["v", True]), [c.rank]),
+        (forge(["v", 1]), [c.id]),
+        (forge(["v", "2022-01-01"]), [c.created_at]),
+        (forge(["dt", "yesterday"]), [c.created_at]),
+        (forge(["v", "blue"]), [c.color]),
+        (forge(["x", "a"]), [c.id]),
+    ],
+)
+def test_invalid(cursor: str, columns: list) -> None:
+    with pytest.raises(HttpErrorException) as exc:
+        decode_cursor(cursor, columns)
+    assert exc.value.error_code == "INVALID CURSOR"
+
+
+def compile_sql(query: object) -> str:
+    return str(query.compile(dialect=postgresql.dialect()))  # type: ignore [attr-defined]
+
+
+def test_keyset_query_first_page() -> None:
+    query = keyset_query(
+        select(table).order_by(c.id), [(c.id, False)], CursorPaginationQueryParams()
+    )
+    sql = compile_sql(query)
+    assert "WHERE" not in sql
+    assert "items.id AS _cursor_0" in sql
+    assert query._limit == 101
+
+
+def test_keyset_query_after_cursor() -> None:
+    order_columns = [(c.created_at, True), (c.id, False)]
+    params = CursorPaginationQueryParams(
+        cursor=encode_cursor([datetime(2022, 1, 1), "a"]), per_page=10
+    )
+    query = keyset_query(select(table), order_columns, params)
+
+    sql = compile_sql(query)
+    assert (
+        "items.created_at < %(created_at_1)s OR "
+        "items.created_at = %(created_at_2)s AND items.id > %(id_1)s"
+    ) in sql
+    # The bound on the leading key lets Postgres seek the index
+    assert "items.created_at <= %(created_at_3)s" in sql
+    assert query._limit == 11
+
+
+def test_keyset_query_nullable_key() -> None:
+    params = CursorPaginationQueryParams(cursor=encode_cursor(["b", "a"]))
+    query = keyset_query(select(table), [(c.name, False), (c.id, False)], params)
+    assert "items.name IS NULL" in compile_sql(query)
@@ -0,0 +1,75 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+import pytest
+from passlib.hash import bcrypt
+
+from app.core.hashing import PasswordHasher
+from app.exceptions.custom import ServiceOverloadedException
+
+
+@pytest.fixture
+def release() -> Iterator[threading.Event]:
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def hasher(max_pending: int = 1, timeout: float = 5.0) -> PasswordHasher:
+    hasher = PasswordHasher(workers=1, max_pending=max_pending, timeout=timeout)
+    # Threads instead of spawned processes, to share the test's events
+    hasher._pool = ThreadPoolExecutor(max_workers=2)
+    return hasher
+
+
+def wait_until(condition) -> None:
+    for _ in range(500):
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("condition never met")
+
+
+def test_inline_without_workers():
+    hasher = PasswordHasher(workers=0, max_pending=1, timeout=5.0)
+    old_hash = bcrypt.using(rounds=4).hash("secret")
+
+    is_valid, new_hash = hasher.verify("secret", old_hash)
+
+    assert is_valid and new_hash and hasher.verify("secret", new_hash) == (True, None)
+    assert hasher.verify("wrong", new_hash) == (False, None)
+
+
+def test_rejects_past_max_pending(release: threading.Event):
+    pending = hasher(max_pending=1)
+    caller = threading.Thread(target=pending._run, args=(release.wait,))
+    caller.start()
+    wait_until(lambda: pending.pending == 1)
+
+    with pytest.raises(ServiceOverloadedException):
+        pending._run(str, "x")
+
+    release.set()
+    caller.join()
+    assert pending._run(str, "x") == "x"
+    stats = pending.stats()
+    assert (stats["rejected"], stats["completed"], stats["peak_pending"]) == (1, 2, 1)
+    assert stats["pending"] == 0
+
+
+def test_timed_out_hashes_stay_pending(release: threading.Event):
+    slow = hasher(max_pending=1, timeout=0.05)
+
+    with pytest.raises(ServiceOverloadedException):
+        slow._run(release.wait)
+
+    # Still running in the pool, so it still takes the only slot
+    assert (slow.timeouts, slow.pending) == (1, 1)
+    with pytest.raises(ServiceOverloadedException):
+        slow._run(str, "x")
+
+    release.set()
+    wait_until(lambda: slow.pending == 0)
+    assert slow._run(str, "x") == "x"
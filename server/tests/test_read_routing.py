@@ -0,0 +1,162 @@
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, insert
+
+from app.core.middleware import PRIMARY_PIN_COOKIE, pin_writers_to_primary
+from app.db.session import (
+    ReplicaBalancing,
+    ReplicaSet,
+    RoutingSession,
+    read_from_replica,
+)
+from app.users.models import User
+
+primary = create_engine("sqlite://")
+replicas = [create_engine("sqlite://"), create_engine("sqlite://")]
+
+
+def make_session() -> RoutingSession:
+    return RoutingSession(
+        bind=primary,
+        future=True,
+        replicas=ReplicaSet(replicas, ReplicaBalancing.ROUND_ROBIN),
+    )
+
+
+def bind_name(db: RoutingSession, clause: Any = None) -> str:
+    with read_from_replica(db):
+        return "primary" if db.get_bind(clause=clause) is primary else "replica"
+
+
+app = FastAPI()
+app.middleware("http")(pin_writers_to_primary)
+
+
+# Sync endpoints run in the threadpool, the routing must reach them
+@app.get("/read")
+def read() -> Dict[str, str]:
+    return {"bind": bind_name(make_session())}
+
+
+@app.get("/write")
+def write() -> Dict[str, str]:
+    db = make_session()
+    bind_name(db, insert(User.__table__))
+    # A new session of the same request still reads from the primary
+    return {"bind": bind_name(make_session())}
+
+
+def write_first() -> None:
+    bind_name(make_session(), insert(User.__table__))
+
+
+# Dependencies run in threadpool calls of their own
+@app.get("/dependency-write", dependencies=[Depends(write_first)])
+def dependency_write() -> Dict[str, str]:
+    return {"bind": bind_name(make_session())}
+
+
+def call(path: str, cookie: Optional[str] = None) -> Tuple[List[str], Any]:
+    headers = [(b"cookie", cookie.encode())] if cookie else []
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": headers,
+        "server": ("test", 80),
+        "client": ("test", 1234),
+    }
+    messages: List[dict] = []
+
+    async def run() -> None:
+        requested = False
+        done = asyncio.Event()
+
+        async def receive() -> dict:
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict) -> None:
+            messages.append(message)
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                done.set()
+
+        await app(scope, receive, send)
+
+    asyncio.run(run())
+    cookies = [
+        value.decode() for key, value in messages[0]["headers"] if key == b"set-cookie"
+    ]
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return cookies, json.loads(body)
+
+
+def test_reads_go_to_a_replica() -> None:
+    cookies, body = call("/read")
+    assert body == {"bind": "replica"}
+    assert cookies == []
+
+
+@pytest.mark.parametrize("path", ["/write", "/dependency-write"])
+def test_write_pins_the_request_and_the_client(path: str) -> None:
+    cookies, body = call(path)
+    assert body == {"bind": "primary"}
+    assert len(cookies) == 1 and cookies[0].startswith(f"{PRIMARY_PIN_COOKIE}=")
+
+
+@pytest.mark.parametrize(
+    "until, bind", [(time.time() + 60, "primary"), (time.time() - 60, "replica")]
+)
+def test_pin_cookie(until: float, bind: str) -> None:
+    _, body = call("/read", cookie=f"{PRIMARY_PIN_COOKIE}={int(until)}")
+    assert body == {"bind": bind}
+
+
+class FakePool:
+    def __init__(self, checkedout: int) -> None:
+        self._checkedout = checkedout
+
+    def checkedout(self) -> int:
+        return self._checkedout
+
+
+class FakeEngine:
+    def __init__(self, checkedout: int) -> None:
+        self.pool = FakePool(checkedout)
+
+
+def test_round_robin() -> None:
+    replica_set = ReplicaSet(replicas, ReplicaBalancing.ROUND_ROBIN)
+    assert [replica_set.pick() for _ in range(4)] == replicas * 2
+
+
+def test_least_connections() -> None:
+    busy, idle = FakeEngine(3), FakeEngine(1)
+    replica_set = ReplicaSet([busy, idle], "least_connections")  # type: ignore [list-item, arg-type]
+    assert replica_set.balancing is ReplicaBalancing.LEAST_CONNECTIONS
+    assert replica_set.pick() is idle
+
+
+def test_session_sticks_to_its_replica() -> None:
+    db = make_session()
+    assert db.get_bind() is primary
+    with read_from_replica(db):
+        picked = db.get_bind()
+        assert picked in replicas
+        assert db.get_bind() is picked
+    assert db.get_bind() is primary
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from typing import Iterator
+
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.auth.models import AuthToken
+from app.db.base_class import generate_uuid
+from app.db.dao import CRUDDao
+from app.users.models import User
+
+
+def compile_sql(dao: CRUDDao, stream: bool) -> str:
+    query = dao.build_chunks_query({}, stream=stream)
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
+def test_defaults_to_load_options() -> None:
+    dao = CRUDDao(AuthToken, load_options=[joinedload(AuthToken.user)])
+    assert "JOIN users" in compile_sql(dao, stream=True)
+
+
+def test_streamed_scans_take_stream_load_options() -> None:
+    dao = CRUDDao(
+        AuthToken,
+        load_options=[joinedload(AuthToken.user)],
+        stream_load_options=[selectinload(AuthToken.user)],
+    )
+    assert "JOIN users" in compile_sql(dao, stream=False)
+    assert "JOIN users" not in compile_sql(dao, stream=True)
+
+
+@pytest.fixture
+def user(db: Session) -> Iterator[User]:
+    user = User(id=generate_uuid(), name="stream", email=f"{generate_uuid()}@x.io")
+    db.add(user)
+    db.add_all(
+        AuthToken(
+            access_token=generate_uuid(),
+            user_id=user.id,
+            token_type="password",
+            expires_at=datetime.utcnow() + timedelta(hours=1),
+            expires_in=3600,
+        )
+        for _ in range(3)
+    )
+    db.commit()
+    yield user
+    db.rollback()
+    db.execute(delete(AuthToken).where(AuthToken.user_id == user.id))
+    db.execute(delete(User).where(User.id == user.id))
+    db.commit()
+
+
+def test_server_side_cursor(db: Session, user: User) -> None:
+    dao = CRUDDao(
+        AuthToken,
+        load_options=[joinedload(AuthToken.user)],
+        stream_load_options=[selectinload(AuthToken.user)],
+    )
+    tokens = list(
+        dao.get_all_in_chunks(
+            db, filters={"user_id": user.id}, chunk=2, server_side_cursor=True
+        )
+    )
+    assert [token.user.name for token in tokens] == ["stream"] * 3
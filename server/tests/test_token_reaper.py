@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+from typing import Iterator, List
+
+import pytest
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.auth.cache import CachedToken, cache_token, token_cache
+from app.auth.models import AuthToken
+from app.auth.reaper import (
+    REAPER_LOCK_ID,
+    ReapStats,
+    build_reap_statement,
+    reap_grace,
+    reap_tokens,
+)
+from app.core.config import get_app_settings
+from app.db.base_class import generate_uuid
+from app.users.models import User
+
+NOW = datetime(2022, 6, 1)
+GRACE = timedelta(hours=1)
+
+
+def test_grace_defaults_to_the_refresh_window():
+    settings = get_app_settings().copy(
+        update={
+            "AUTH_TOKEN_REAPER_GRACE": None,
+            "ACCESS_TOKEN_EXPIRY_IN_SECONDS": 60,
+            "REFRESH_TOKEN_EXPIRY_IN_SECONDS": 600,
+        }
+    )
+
+    assert reap_grace(settings) == timedelta(seconds=540)
+    assert reap_grace(
+        settings.copy(update={"REFRESH_TOKEN_EXPIRY_IN_SECONDS": 30})
+    ) == timedelta(0)
+    assert reap_grace(
+        settings.copy(update={"AUTH_TOKEN_REAPER_GRACE": 5})
+    ) == timedelta(seconds=5)
+
+
+def test_reap_statement_pages_by_id():
+    first = build_reap_statement(NOW, None, 10).compile(dialect=postgresql.dialect())
+    after = build_reap_statement(NOW, "b", 10).compile(dialect=postgresql.dialect())
+
+    assert "ORDER BY auth_token.id" in str(first)
+    assert "RETURNING auth_token.id, auth_token.access_token" in str(first)
+    assert "auth_token.id >" not in str(first)
+    assert "auth_token.id >" in str(after) and "b" in after.params.values()
+
+
+@pytest.fixture
+def tokens(db: Session) -> Iterator[List[AuthToken]]:
+    user = User(id=generate_uuid(), name="reaper", email=f"{generate_uuid()}@x.io")
+    cutoff = NOW - GRACE
+    tokens = [
+        # Revoked, expired past the grace, expired within the grace, active
+        token(user, is_active=False, expires_at=NOW + GRACE),
+        token(user, expires_at=cutoff - timedelta(seconds=1)),
+        token(user, expires_at=cutoff - timedelta(days=1)),
+        token(user, expires_at=cutoff + timedelta(seconds=1)),
+        token(user, expires_at=NOW + GRACE),
+    ]
+    db.add_all(tokens)
+    db.commit()
+    yield tokens
+    db.rollback()
+    db.execute(delete(AuthToken).where(AuthToken.user_id == user.id))
+    db.execute(delete(User).where(User.id == user.id))
+    db.commit()
+
+
+def token(user: User, expires_at: datetime, is_active: bool = True) -> AuthToken:
+    return AuthToken(
+        id=generate_uuid(),
+        access_token=generate_uuid(),
+        user=user,
+        token_type="password",
+        is_active=is_active,
+        expires_at=expires_at,
+        expires_in=3600,
+    )
+
+
+def test_reaps_revoked_and_expired_tokens(db: Session, tokens: List[AuthToken]):
+    reaped = tokens[:3]
+    for reaped_token in reaped:
+        cache_token(
+            reaped_token.access_token,
+            CachedToken(
+                reaped_token.id,
+                reaped_token.user_id,
+                datetime.utcnow() + timedelta(hours=1),
+            ),
+        )
+    kept_ids = {kept.id for kept in tokens[3:]}
+
+    stats = reap_tokens(db.get_bind(), batch_size=1, grace=GRACE, now=NOW)
+
+    # Other tests' stale tokens may be reaped too
+    assert stats.deleted >= 3 and stats.batches == stats.deleted
+    left = db.scalars(
+        select(AuthToken.id).where(AuthToken.user_id == tokens[0].user_id)
+    ).all()
+    assert set(left) == kept_ids
+    assert all(token_cache.get(t.access_token) is None for t in reaped)
+
+
+def test_skips_while_another_worker_reaps(db: Session, tokens: List[AuthToken]):
+    with db.get_bind().connect() as conn:
+        assert conn.scalar(select(func.pg_try_advisory_lock(REAPER_LOCK_ID)))
+        try:
+            stats = reap_tokens(db.get_bind(), batch_size=10, grace=GRACE, now=NOW)
+        finally:
+            conn.scalar(select(func.pg_advisory_unlock(REAPER_LOCK_ID)))
+
+    assert stats == ReapStats(0, 0, 0.0)
+    assert db.scalar(
+        select(func.count()).where(AuthToken.user_id == tokens[0].user_id)
+    ) == len(tokens)
@@ -0,0 +1,84 @@
+from typing import List, Optional
+
+import pytest
+
+from app.db.pagination import Page
+from app.db.serializer import (
+    TrimHandler,
+    TrimmableBaseModel,
+    compile_field_pattern,
+    match_fields,
+)
+from app.exceptions.custom import HttpErrorException
+
+
+class Owner(TrimmableBaseModel):
+    id: str
+    name: str
+
+
+class Tag(TrimmableBaseModel):
+    label: str
+
+
+class Item(TrimmableBaseModel):
+    id: str
+    name: str
+    owner: Optional[Owner]
+    tags: List[Tag] = []
+
+
+FIELDS = ("id", "name", "owner.id", "owner.name", "tags[].label")
+
+
+def test_plain_patterns_are_not_compiled():
+    assert compile_field_pattern("owner") is None
+    assert compile_field_pattern("owner.*") is not None
+
+
+def test_invalid_pattern_is_a_bad_request():
+    with pytest.raises(HttpErrorException) as e:
+        compile_field_pattern("owner(")
+    assert e.value.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        ("owner", ["owner.id", "owner.name"]),
+        ("n", ["name"]),
+        ("owner.name", ["owner.name"]),
+        ("x", []),
+        (".*name", ["name", "owner.name"]),
+        ("tags\\[\\]", ["tags[].label"]),
+    ],
+)
+def test_match_fields(pattern, expected):
+    assert list(match_fields(FIELDS, pattern)) == expected
+
+
+def test_fields_to_return():
+    include = TrimHandler(Item, ["owner.n", "id"]).get_fields_to_return()
+
+    assert include == {"id": True, "owner": {"name": True}}
+
+
+def test_fields_to_return_of_pages():
+    include = TrimHandler(Page[Item], ["tags"]).get_fields_to_return()
+
+    assert include["items"] == {"__all__": {"tags": {"__all__": {"label": True}}}}
+    assert include["total"] is True
+
+
+def test_memoized_fields_to_return_are_read_only():
+    include = TrimHandler(Item, ["owner", "id"]).get_fields_to_return()
+
+    with pytest.raises(TypeError):
+        include["name"] = True
+    with pytest.raises(TypeError):
+        include["owner"]["id"] = False
+
+    assert TrimHandler(Item, ["id", "owner"]).get_fields_to_return() is include
+    assert Item(id="1", name="a", owner={"id": "2", "name": "b"}).dict(
+        include=include
+    ) == {"id": "1", "owner": {"id": "2", "name": "b"}}
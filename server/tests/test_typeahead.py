@@ -0,0 +1,77 @@
+from typing import Iterator, List
+
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.db.base_class import generate_uuid
+from app.db.typeahead import escape_like, normalize_prefix, typeahead_filter
+from app.users.models import User
+
+NAMES = ["Maria", "Mario", "Mar%co", "Mar_io", "Amaro", "Marta Lopez"]
+
+
+@pytest.mark.parametrize(
+    "value, escaped",
+    [("mar", "mar"), ("50%", "50\\%"), ("a_b", "a\\_b"), ("c:\\", "c:\\\\")],
+)
+def test_escape_like(value: str, escaped: str):
+    assert escape_like(value) == escaped
+
+
+def test_normalize_prefix():
+    assert normalize_prefix("  Mar   LO ") == "mar lo"
+
+
+@pytest.fixture
+def tag(db: Session) -> Iterator[str]:
+    tag = generate_uuid()
+    db.add_all(
+        User(id=generate_uuid(), name=name, email=f"{tag}-{i}@x.io")
+        for i, name in enumerate(NAMES)
+    )
+    db.commit()
+    yield tag
+    db.rollback()
+    db.execute(
+        delete(User)
+        .where(User.email.like(f"{tag}-%"))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def names(db: Session, tag: str, prefix: str, fuzzy: bool = False) -> List[str]:
+    where, order_by = typeahead_filter([User.name], prefix, fuzzy)
+    query = (
+        select(User.name).where(User.email.like(f"{tag}-%"), where).order_by(*order_by)
+    )
+    return db.scalars(query).all()
+
+
+def test_prefix_matches_are_sorted(db: Session, tag: str):
+    assert names(db, tag, "mar") == [
+        "Mar%co",
+        "Mar_io",
+        "Maria",
+        "Mario",
+        "Marta Lopez",
+    ]
+
+
+def test_wildcards_match_literally(db: Session, tag: str):
+    assert names(db, tag, "mar%") == ["Mar%co"]
+    assert names(db, tag, "mar_") == ["Mar_io"]
+
+
+def test_fuzzy_matches_typos_and_words(db: Session, tag: str):
+    assert names(db, tag, "mariia") == []
+    assert names(db, tag, "mariia", fuzzy=True) == ["Maria"]
+    assert names(db, tag, "lopes", fuzzy=True) == ["Marta Lopez"]
+
+
+def test_fuzzy_ranks_prefix_matches_first(db: Session, tag: str):
+    matches = names(db, tag, "mari", fuzzy=True)
+
+    assert matches[:2] == ["Maria", "Mario"]
+    assert set(matches[2:]) == {"Mar%co", "Mar_io", "Marta Lopez"}
@@ -0,0 +1,134 @@
+from typing import Iterator, List
+
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.db.base_class import generate_uuid
+from app.db.dao import (
+    CRUDDao,
+    build_upsert_statements,
+    reject_state_transitions,
+    upsert_changes,
+    upserted_columns,
+)
+from app.exceptions.custom import DaoException
+from app.users.models import User
+from app.users.serializer import UserCreateSerializer
+
+table = User.__table__
+
+
+def compile_sql(stmt: object) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))  # type: ignore [attr-defined]
+
+
+def test_upsert_statements_dedupe_conflict_keys() -> None:
+    rows = [
+        {"id": "1", "email": "a@x.io", "name": "first"},
+        {"id": "2", "email": "a@x.io", "name": "last"},
+    ]
+    [stmt] = build_upsert_statements(table, rows, conflict_target=["email"])
+
+    sql = compile_sql(stmt)
+    assert "ON CONFLICT (email) DO UPDATE SET" in sql
+    assert "name = excluded.name" in sql
+    assert "updated_at = " in sql
+    # The id and the conflict target are never overwritten
+    assert "id = excluded.id" not in sql
+    assert "email = excluded.email" not in sql
+    assert stmt.compile().params["name_m0"] == "last"
+
+
+def test_upsert_statements_chunks_and_update_fields() -> None:
+    rows = [{"id": str(i), "email": f"{i}@x.io", "name": "n"} for i in range(5)]
+    stmts = build_upsert_statements(
+        table, rows, conflict_target=["id"], update_fields=["email"], chunk_size=2
+    )
+
+    assert len(stmts) == 3
+    sql = compile_sql(stmts[0])
+    assert "email = excluded.email" in sql
+    assert "name = excluded.name" not in sql
+
+
+def test_upsert_statements_set_something() -> None:
+    # RETURNING only yields conflicting rows that were updated
+    [stmt] = build_upsert_statements(table, [{"id": "1"}], conflict_target=["id"])
+    assert "DO UPDATE SET id = excluded.id" in compile_sql(stmt)
+
+
+def test_upserted_columns() -> None:
+    rows = [{"id": "1", "name": "a"}, {"id": "2", "state": "s"}]
+    assert upserted_columns(rows, ["id"], None) == {"name", "state"}
+    assert upserted_columns(rows, ["id"], ["name"]) == {"name"}
+
+
+def test_reject_state_transitions() -> None:
+    dao = CRUDDao(User, state_transition_graph={"key": "state", "graph": {}})
+
+    reject_state_transitions(dao, ["name"], "upsert_many")
+    with pytest.raises(DaoException):
+        reject_state_transitions(dao, ["name", "state"], "upsert_many")
+    reject_state_transitions(CRUDDao(User), ["state"], "upsert_many")
+
+
+def test_upsert_changes() -> None:
+    db_obj = User(id="1", name="new", email="a@x.io")
+    changes = upsert_changes(
+        {("1",): db_obj, ("2",): User(id="2")},
+        {("1",): {"id": "1", "name": "old", "email": "a@x.io", "updated_at": None}},
+    )
+    assert changes == {"1": {"name": {"before": "old", "after": "new"}}}
+
+
+class UserIn(UserCreateSerializer):
+    id: str
+
+
+class PrefixedUserDao(CRUDDao[User, UserIn, UserIn]):
+    def on_pre_create(
+        self, db: Session, pk: str, values: dict, orig_values: dict
+    ) -> None:
+        values["name"] = f"pre {values['name']}"
+
+
+@pytest.fixture
+def emails(db: Session) -> Iterator[List[str]]:
+    emails = [f"{generate_uuid()}@x.io" for _ in range(2)]
+    yield emails
+    db.rollback()
+    db.execute(delete(User).where(User.email.in_(emails)))
+    db.commit()
+
+
+def test_upsert_many_runs_pre_create(db: Session, emails: List[str]) -> None:
+    dao = PrefixedUserDao(User)
+
+    ids = [generate_uuid() for _ in emails]
+
+    users = dao.upsert_many(
+        db,
+        objs_in=[
+            UserIn(id=id, name="a", email=email) for id, email in zip(ids, emails)
+        ],
+    )
+    assert [user.name for user in users] == ["pre a", "pre a"]
+
+    users = dao.upsert_many(db, objs_in=[UserIn(id=ids[0], name="b", email=emails[0])])
+    assert [user.id for user in users] == ids[:1]
+    assert users[0].name == "pre b"
+    assert users[0].updated_at is not None
+
+
+def test_update_where_sets_updated_at(db: Session, emails: List[str]) -> None:
+    dao = CRUDDao(User)
+    dao.create_many(
+        db, objs_in=[UserCreateSerializer(name="a", email=email) for email in emails]
+    )
+
+    assert dao.update_where(db, filters={"email__in": emails}, values={"name": "b"})
+    users = dao.get_all(db, filters={"email__in": emails})
+    assert [user.name for user in users] == ["b", "b"]
+    assert all(user.updated_at is not None for user in users)